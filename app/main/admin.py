@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Deck, Document, FlashCard
+from .models import Deck, Document, FlashCard, GenerationJob
 
 @admin.register(Deck)
 class DeckAdmin(admin.ModelAdmin):
@@ -27,3 +27,11 @@ class FlashCardAdmin(admin.ModelAdmin):
     def get_tags_display(self, obj):
         return ', '.join(obj.tags) if obj.tags else ''
     get_tags_display.short_description = 'Tags'
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('deck', 'status', 'attempts', 'created_count', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('deck__name',)
+    readonly_fields = ('created_at', 'updated_at', 'started_at', 'finished_at')
@@ -1,39 +1,399 @@
 import os
 import json
-from openai import OpenAI
-from typing import List, Dict
+import time
+import asyncio
+import hashlib
+import random
+import logging
+import threading
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+from typing import List, Dict, Iterable, Iterator, AsyncIterator, Optional
 from django.conf import settings
+from django.core.cache import caches
 import re
-       
+from .async_helpers import loop_local
 
-def call_openai(system_prompt: str, user_prompt: str) -> str:
+logger = logging.getLogger(__name__)
+
+# One client (and HTTP connection pool) per process, rebuilt in forked children
+_client = None
+_client_lock = threading.Lock()
+
+# One async client per event loop, see loop_local()
+_async_clients = {}
+
+# Retry on transient failures only: connection errors/timeouts, 429s and 5xxs
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+# Per-process call metrics, see openai_stats()
+_stats = {'calls': 0, 'retries': 0, 'errors': 0, 'total_latency': 0.0, 'cache_hits': 0, 'cache_misses': 0}
+_stats_lock = threading.Lock()
+
+def _reset_client_after_fork():
+    global _client, _client_lock
+    # The parent's sockets and lock state must not be shared with a gunicorn worker
+    _client = None
+    _client_lock = threading.Lock()
+    _async_clients.clear()
+
+os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+def get_openai_client() -> OpenAI:
+    """
+    Returns this process's shared OpenAI client, creating it on first use.
+
+    The client keeps a pool of keep-alive HTTPS connections so repeated calls
+    skip the TCP/TLS handshake. Retries are handled by _create_completion so they can
+    be counted, so the SDK's own retries are disabled.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                timeout = getattr(settings, 'OPENAI_TIMEOUT', 60)
+                _client = OpenAI(
+                    api_key=getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY'),
+                    timeout=timeout,
+                    max_retries=0,
+                    http_client=httpx.Client(
+                        timeout=timeout,
+                        limits=httpx.Limits(
+                            max_connections=getattr(settings, 'OPENAI_MAX_CONNECTIONS', 20),
+                            max_keepalive_connections=getattr(settings, 'OPENAI_MAX_CONNECTIONS', 20),
+                        ),
+                    ),
+                )
+    return _client
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Returns the shared AsyncOpenAI client for the running event loop, creating it on first use.
+
+    Under uvicorn each worker has one long-lived loop, so this is one
+    connection pool per process.
+    """
+    def create():
+        timeout = getattr(settings, 'OPENAI_TIMEOUT', 60)
+        return AsyncOpenAI(
+            api_key=getattr(settings, 'OPENAI_API_KEY', None) or os.getenv('OPENAI_API_KEY'),
+            timeout=timeout,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=getattr(settings, 'OPENAI_ASYNC_MAX_CONNECTIONS', 200),
+                    max_keepalive_connections=getattr(settings, 'OPENAI_MAX_CONNECTIONS', 20),
+                ),
+            ),
+        )
+    return loop_local(_async_clients, create)
+
+def openai_stats() -> Dict:
+    """
+    Returns call, retry, error, latency and response cache totals for this process.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['average_latency'] = stats['total_latency'] / stats['calls'] if stats['calls'] else 0.0
+    lookups = stats['cache_hits'] + stats['cache_misses']
+    stats['cache_hit_rate'] = stats['cache_hits'] / lookups if lookups else 0.0
+    return stats
+
+def _record_call(latency: float, retries: int, failed: bool):
+    with _stats_lock:
+        _stats['calls'] += 1
+        _stats['retries'] += retries
+        _stats['errors'] += int(failed)
+        _stats['total_latency'] += latency
+
+def response_cache_key(model: str, system_prompt: str, user_prompt: str, params: Optional[Dict] = None) -> str:
+    """
+    Returns a cache key addressing a completion by everything that determines it.
+    """
+    payload = json.dumps([model, system_prompt, user_prompt, params or {}], sort_keys=True)
+    return 'openai-response:' + hashlib.sha256(payload.encode()).hexdigest()
+
+def _record_cache_lookup(hit: bool):
+    with _stats_lock:
+        _stats['cache_hits' if hit else 'cache_misses'] += 1
+
+def _create_completion(model: str, system_prompt: str, user_prompt: str, params: Dict):
+    """
+    Creates a chat completion, retrying transient failures with exponential backoff and jitter.
+
+    With stream=True in params the retries cover opening the stream, not reading it.
+    """
+    max_retries = getattr(settings, 'OPENAI_MAX_RETRIES', 2)
+    backoff = getattr(settings, 'OPENAI_RETRY_BACKOFF', 0.5)
+    client = get_openai_client()
+
+    start = time.monotonic()
+    retries = 0
+    while True:
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "developer", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                **params
+            )
+            break
+        except RETRYABLE_ERRORS as e:
+            if retries >= max_retries:
+                latency = time.monotonic() - start
+                _record_call(latency, retries, failed=True)
+                logger.error(f"OpenAI {model} call failed after {latency:.2f}s and {retries} retries: {str(e)}")
+                raise
+            delay = backoff * 2 ** retries * (1 + random.random())
+            retries += 1
+            logger.warning(f"OpenAI {model} call failed ({type(e).__name__}), retry {retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+    latency = time.monotonic() - start
+    _record_call(latency, retries, failed=False)
+    logger.info(f"OpenAI {model} call took {latency:.2f}s with {retries} retries")
+    return response
+
+async def _acreate_completion(model: str, system_prompt: str, user_prompt: str, params: Dict):
+    """
+    Async _create_completion, waiting out the backoff without blocking the event loop.
+    """
+    max_retries = getattr(settings, 'OPENAI_MAX_RETRIES', 2)
+    backoff = getattr(settings, 'OPENAI_RETRY_BACKOFF', 0.5)
+    client = get_async_openai_client()
+
+    start = time.monotonic()
+    retries = 0
+    while True:
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "developer", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                **params
+            )
+            break
+        except RETRYABLE_ERRORS as e:
+            if retries >= max_retries:
+                latency = time.monotonic() - start
+                _record_call(latency, retries, failed=True)
+                logger.error(f"OpenAI {model} call failed after {latency:.2f}s and {retries} retries: {str(e)}")
+                raise
+            delay = backoff * 2 ** retries * (1 + random.random())
+            retries += 1
+            logger.warning(f"OpenAI {model} call failed ({type(e).__name__}), retry {retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    latency = time.monotonic() - start
+    _record_call(latency, retries, failed=False)
+    logger.info(f"OpenAI {model} call took {latency:.2f}s with {retries} retries")
+    return response
+
+def call_openai(system_prompt: str, user_prompt: str, model: Optional[str] = None,
+                params: Optional[Dict] = None, cache: bool = False, refresh: bool = False) -> str:
     """
     Sends a system prompt and user prompt to OpenAI and returns the response.
-    
+
+    Transient failures are retried up to OPENAI_MAX_RETRIES times with
+    exponential backoff and jitter, starting at OPENAI_RETRY_BACKOFF seconds.
+
     Parameters:
         system_prompt (str): The system-level instructions for the AI.
         user_prompt (str): The user's input or query.
-    
+        model (str, optional): The model to use, e.g. from the tutor's config. Defaults to OPENAI_MODEL.
+        params (dict, optional): Extra completion parameters such as temperature.
+        cache (bool, optional): Serve identical requests from the 'llm' cache for LLM_CACHE_TIMEOUT seconds.
+        refresh (bool, optional): With cache, skip the lookup and overwrite the cached response.
+
     Returns:
         str: The response from OpenAI.
-    
+
     Raises:
         Exception: If called during tests without being mocked.
     """
-    
-    # In test environment, this function must be mocked.  Playing it safe. 
+    model = model or getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
+    params = params or {}
+
+    cache_key = response_cache_key(model, system_prompt, user_prompt, params) if cache else None
+    if cache and not refresh:
+        cached = caches['llm'].get(cache_key)
+        _record_cache_lookup(cached is not None)
+        if cached is not None:
+            return cached
+
+    # In test environment, this function must be mocked.  Playing it safe.
     if getattr(settings, 'TESTING', False):
         raise Exception("THIS SHOULD BE MOCKED IN TESTS")
-    
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "developer", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-    )
-    return response.choices[0].message.content
+
+    response = _create_completion(model, system_prompt, user_prompt, params)
+    content = response.choices[0].message.content
+    if cache:
+        caches['llm'].set(cache_key, content, getattr(settings, 'LLM_CACHE_TIMEOUT', None))
+    return content
+
+def stream_openai(system_prompt: str, user_prompt: str, model: Optional[str] = None,
+                  params: Optional[Dict] = None) -> Iterator[str]:
+    """
+    Streams a completion from OpenAI, yielding text deltas as they arrive.
+
+    The upstream stream is only opened once the generator is first advanced,
+    and is closed when the generator is closed, e.g. when the client disconnects
+    mid-response, so an abandoned request stops consuming tokens.
+
+    Parameters:
+        system_prompt (str): The system-level instructions for the AI.
+        user_prompt (str): The user's input or query.
+        model (str, optional): The model to use. Defaults to OPENAI_MODEL.
+        params (dict, optional): Extra completion parameters such as temperature.
+
+    Yields:
+        str: Each non-empty piece of content from the response.
+
+    Raises:
+        Exception: If called during tests without being mocked.
+    """
+    # In test environment, this function must be mocked.  Playing it safe.
+    if getattr(settings, 'TESTING', False):
+        raise Exception("THIS SHOULD BE MOCKED IN TESTS")
+
+    model = model or getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
+    start = time.monotonic()
+    stream = _create_completion(model, system_prompt, user_prompt, {**(params or {}), 'stream': True})
+    first_token = None
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                if first_token is None:
+                    first_token = time.monotonic() - start
+                    logger.info(f"OpenAI {model} stream first token after {first_token:.2f}s")
+                yield content
+    finally:
+        stream.close()
+        logger.info(f"OpenAI {model} stream closed after {time.monotonic() - start:.2f}s")
+
+async def acall_openai(system_prompt: str, user_prompt: str, model: Optional[str] = None,
+                       params: Optional[Dict] = None, cache: bool = False, refresh: bool = False) -> str:
+    """
+    Async call_openai for async views, takes the same arguments.
+
+    The request is awaited on the event loop instead of holding a thread, so
+    one ASGI worker can have many calls in flight.
+    """
+    model = model or getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
+    params = params or {}
+
+    cache_key = response_cache_key(model, system_prompt, user_prompt, params) if cache else None
+    if cache and not refresh:
+        cached = await caches['llm'].aget(cache_key)
+        _record_cache_lookup(cached is not None)
+        if cached is not None:
+            return cached
+
+    # In test environment, this function must be mocked.  Playing it safe.
+    if getattr(settings, 'TESTING', False):
+        raise Exception("THIS SHOULD BE MOCKED IN TESTS")
+
+    response = await _acreate_completion(model, system_prompt, user_prompt, params)
+    content = response.choices[0].message.content
+    if cache:
+        await caches['llm'].aset(cache_key, content, getattr(settings, 'LLM_CACHE_TIMEOUT', None))
+    return content
+
+async def astream_openai(system_prompt: str, user_prompt: str, model: Optional[str] = None,
+                         params: Optional[Dict] = None) -> AsyncIterator[str]:
+    """
+    Async stream_openai, yields text deltas as they arrive and closes the
+    upstream stream when closed.
+    """
+    # In test environment, this function must be mocked.  Playing it safe.
+    if getattr(settings, 'TESTING', False):
+        raise Exception("THIS SHOULD BE MOCKED IN TESTS")
+
+    model = model or getattr(settings, 'OPENAI_MODEL', 'gpt-4o-mini')
+    start = time.monotonic()
+    stream = await _acreate_completion(model, system_prompt, user_prompt, {**(params or {}), 'stream': True})
+    first_token = None
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                if first_token is None:
+                    first_token = time.monotonic() - start
+                    logger.info(f"OpenAI {model} stream first token after {first_token:.2f}s")
+                yield content
+    finally:
+        await stream.close()
+        logger.info(f"OpenAI {model} stream closed after {time.monotonic() - start:.2f}s")
+
+def chunk_text(parts: List[str], max_tokens: int) -> List[str]:
+    """
+    Split content into chunks that fit within a token budget.
+
+    Each part (e.g. the deck content and each document) starts a new chunk, and
+    parts are split on paragraph boundaries. Consecutive paragraphs are packed
+    together until the budget is reached. A single paragraph over budget is
+    hard-split on lines, then characters.
+
+    Parameters:
+        parts (List[str]): The content sources, e.g. deck content and documents
+        max_tokens (int): The approximate token budget per chunk
+
+    Returns:
+        List[str]: Chunks of content, each within the budget
+    """
+    max_chars = max(1, max_tokens * 4)
+    chunks = []
+
+    for part in parts:
+        current = []
+        current_len = 0
+        for paragraph in _split_oversized(re.split(r'\n\s*\n', part.strip()), max_chars):
+            if current and current_len + len(paragraph) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current, current_len = [], 0
+            current.append(paragraph)
+            current_len += len(paragraph) + 2
+        if current:
+            chunks.append("\n\n".join(current))
+
+    return chunks
+
+def _split_oversized(paragraphs: List[str], max_chars: int) -> List[str]:
+    pieces = []
+    for paragraph in paragraphs:
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        line_chunk = ""
+        for line in paragraph.splitlines():
+            while len(line) > max_chars:
+                if line_chunk:
+                    pieces.append(line_chunk)
+                    line_chunk = ""
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+            if line_chunk and len(line_chunk) + len(line) + 1 > max_chars:
+                pieces.append(line_chunk)
+                line_chunk = line
+            else:
+                line_chunk = f"{line_chunk}\n{line}" if line_chunk else line
+        if line_chunk:
+            pieces.append(line_chunk)
+    return pieces
 
 def extract_json(text: str) -> List[Dict]:
     """
@@ -76,3 +436,105 @@ def extract_json(text: str) -> List[Dict]:
             continue
     
     return []
+
+class JSONObjectStream:
+    """
+    Incrementally extracts the objects of a JSON array from streamed text.
+
+    Like extract_json, it tolerates leading prose and ```json fences: anything
+    before the first '[' that opens an array of objects is skipped, as is
+    anything after that array closes. Each object is parsed as soon as its
+    closing brace arrives, and only the unfinished object is kept in memory.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._start = None
+        self._depth = 0
+        self._in_array = False
+        self._in_string = False
+        self._escape = False
+        self.done = False
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        Consume the next piece of text and return any objects it completed.
+        """
+        buffer = self._buffer + text
+        objects = []
+        i = self._pos
+        while i < len(buffer) and not self.done:
+            char = buffer[i]
+            if not self._in_array:
+                if char == '[':
+                    # Only an array of objects counts, so prose like "[1]" is skipped
+                    j = i + 1
+                    while j < len(buffer) and buffer[j].isspace():
+                        j += 1
+                    if j == len(buffer):
+                        break
+                    if buffer[j] == '{':
+                        self._in_array = True
+                        i = j
+                        continue
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif char in '}]':
+                if self._depth == 0:
+                    self.done = char == ']'
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        try:
+                            item = json.loads(buffer[self._start:i + 1])
+                            if isinstance(item, dict):
+                                objects.append(item)
+                        except json.JSONDecodeError:
+                            pass
+                        self._start = None
+            i += 1
+
+        # Drop everything before the object in progress
+        cut = i if self._start is None else self._start
+        self._buffer = buffer[cut:]
+        self._pos = i - cut
+        if self._start is not None:
+            self._start = 0
+        return objects
+
+def iter_json_objects(chunks: Iterable[str]) -> Iterator[Dict]:
+    """
+    Yield each object of a streamed JSON array as soon as it is complete.
+
+    Parameters:
+        chunks (Iterable[str]): Pieces of text, e.g. deltas from stream_openai
+
+    Yields:
+        Dict: Each complete object in the array
+    """
+    parser = JSONObjectStream()
+    try:
+        for chunk in chunks:
+            yield from parser.feed(chunk)
+            if parser.done:
+                return
+    finally:
+        # Stop a streamed completion once the array has closed
+        close = getattr(chunks, 'close', None)
+        if close:
+            close()
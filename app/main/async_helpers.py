@@ -0,0 +1,56 @@
+"""
+Helpers for plain async Django views standing in for DRF views.
+
+DRF views are sync only, so the LLM-bound endpoints are async function views
+that keep the same URLs and the same JSON responses.
+"""
+import json
+import asyncio
+from functools import wraps
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+
+
+def api_login_required(view):
+    """Async counterpart of DRF's IsAuthenticated with session auth, answers 403 in JSON"""
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+        return await view(request, *args, **kwargs)
+    return inner
+
+
+def request_data(request):
+    """The request body as a dict, from JSON or form data like DRF's request.data"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def is_asgi(request):
+    """Whether the request is being served by an ASGI server with its own event loop"""
+    return isinstance(request, ASGIRequest)
+
+
+def loop_local(clients, factory):
+    """The client in `clients` for the running event loop, made with factory() on first use.
+
+    Async HTTP clients hold connections bound to the loop that created them.
+    Under uvicorn that is one loop per worker. Async views served over WSGI
+    get a new loop per request, so they should use the sync clients instead
+    (see is_asgi), and any clients of closed loops are dropped here.
+    """
+    loop = asyncio.get_running_loop()
+    client = clients.get(loop)
+    if client is None:
+        for other in list(clients):
+            if other.is_closed():
+                clients.pop(other, None)
+        client = clients[loop] = factory()
+    return client
@@ -0,0 +1,95 @@
+"""
+Conditional GET support for pages and APIs whose content follows a deck's cards.
+
+Validators come from a single aggregate query rather than the rendered
+response, so a matching If-None-Match or If-Modified-Since is answered with a
+304 before anything is serialized or rendered.
+"""
+import hashlib
+from functools import wraps
+from typing import NamedTuple, Optional
+from datetime import datetime
+from django.contrib import messages
+from django.middleware.csrf import get_token
+from django.db.models import Count, Max, Q
+from django.templatetags.static import static
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from .tutor_registry import tutor_registry
+
+
+class Version(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def make_version(*parts, last_modified=None):
+    """A Version whose ETag changes whenever any of the parts do"""
+    digest = hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()[:32]
+    return Version(digest, last_modified)
+
+
+def flashcards_state(flashcards, tombstones=None):
+    """(count, last modified) for a set of cards in one aggregate query.
+
+    Cards becoming due change the rendered previews without a write, so the
+    most recent due time that has already passed counts as a modification.
+    Deletions are picked up from the tombstones.
+    """
+    now = timezone.now()
+    state = flashcards.order_by().aggregate(
+        count=Count('id'),
+        updated=Max('updated_at'),
+        front_due=Max('front_due_at', filter=Q(front_due_at__lte=now)),
+        back_due=Max('back_due_at', filter=Q(back_due_at__lte=now)),
+    )
+    times = [state['updated'], state['front_due'], state['back_due']]
+    if tombstones is not None:
+        times.append(tombstones.aggregate(deleted=Max('deleted_at'))['deleted'])
+    return state['count'], max(filter(None, times), default=None)
+
+
+def page_state(request):
+    """What the base template adds to every page, or None if it can't be cached"""
+    if len(messages.get_messages(request)):
+        # Flash messages are shown once, so the page must be rendered to consume them
+        return None
+    # Pages embed a CSRF token, which stops working once the secret rotates, e.g. on login
+    get_token(request)
+    csrf_secret = request.META.get('CSRF_COOKIE')
+    return (request.user.pk, csrf_secret, tutor_registry.version(), static('dist/js/index.js'), static('dist/css/index.css'))
+
+
+def conditional(version_func):
+    """Answer conditional GETs from `version_func(request, *args, **kwargs)`.
+
+    Like django's condition(), but the ETag and Last-Modified come from one
+    call, and the response is marked for revalidation so browsers don't reuse
+    it on a heuristic lifetime. Returning None disables the check. Works on
+    function views, and on DRF view methods through method_decorator.
+    """
+    def decorator(view):
+        def version(request, *args, **kwargs):
+            if not hasattr(request, '_conditional_version'):
+                request._conditional_version = version_func(request, *args, **kwargs)
+            return request._conditional_version
+
+        def etag(request, *args, **kwargs):
+            current = version(request, *args, **kwargs)
+            return current.etag if current else None
+
+        def last_modified(request, *args, **kwargs):
+            current = version(request, *args, **kwargs)
+            return current.last_modified if current else None
+
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
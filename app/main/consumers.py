@@ -0,0 +1,41 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from .models import Deck, GenerationJob
+from .progress import deck_group_name, job_payload
+
+
+class DeckConsumer(AsyncJsonWebsocketConsumer):
+    """Streams a deck's generation job state and newly generated cards to its page"""
+
+    async def connect(self):
+        self.deck_id = self.scope['url_route']['kwargs']['deck_id']
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated or not await self.owns_deck(user):
+            await self.close()
+            return
+
+        self.group_name = deck_group_name(self.deck_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        # Anything published before the socket joined is covered by the current state
+        job = await self.latest_job()
+        await self.send_json({'type': 'job', 'job': job_payload(job) if job else None})
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    @database_sync_to_async
+    def owns_deck(self, user):
+        return Deck.objects.filter(pk=self.deck_id, owner=user).exists()
+
+    @database_sync_to_async
+    def latest_job(self):
+        return GenerationJob.objects.filter(deck_id=self.deck_id).first()
+
+    async def generation_job(self, event):
+        await self.send_json({'type': 'job', 'job': event['job']})
+
+    async def flashcards_created(self, event):
+        await self.send_json({'type': 'flashcards', 'cards': event['cards']})
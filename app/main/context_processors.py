@@ -1,14 +1,22 @@
+from django.utils.functional import SimpleLazyObject
+from main.tutor_registry import tutor_registry
+
 class DefaultApplication:
     def __init__(self, name = None):
         self.title = name if name else 'FlashSpeak'  # Default title when no application is selected
 
+def navigation_tutors(request):
+    """All tutors for navigation, looked up once per request from the registry"""
+    if not hasattr(request, '_navigation_tutors'):
+        request._navigation_tutors = tutor_registry.all() if request.user.is_authenticated else []
+    return request._navigation_tutors
+
 def generic_context(request):
-    from main.models import Tutor
-    tutors = Tutor.objects.all() if request.user.is_authenticated else Tutor.objects.none()
+    # Lazy so partials that never use them cost nothing
     return {
         'project_name': 'Your Project Name',
         'current_user': request.user,
-        'application': getattr(request, 'tutor') or DefaultApplication(),  # Provides a default application object
+        'application': SimpleLazyObject(lambda: getattr(request, 'tutor', None) or DefaultApplication()),  # Provides a default application object
         'tutor': getattr(request, 'tutor', None),  # Get tutor from request if available
-        'tutors': tutors,  # All tutors for navigation.  Having tutor and tutors is odd!
-    }
\ No newline at end of file
+        'tutors': SimpleLazyObject(lambda: navigation_tutors(request)),  # All tutors for navigation.  Having tutor and tutors is odd!
+    }
@@ -0,0 +1,98 @@
+import { Controller } from "@hotwired/stimulus"
+
+export default class extends Controller {
+  static targets = ["status", "statusText"]
+  static values = {
+    generationJobUrl: String,
+    progressSocketUrl: String,
+    polling: Boolean,
+    pollInterval: { type: Number, default: 3000 }
+  }
+
+  connect() {
+    if (this.pollingValue) {
+      this.schedulePoll()
+    }
+    this.openProgressSocket()
+  }
+
+  disconnect() {
+    clearTimeout(this.pollTimer)
+    if (this.socket) {
+      this.socket.onclose = null
+      this.socket.close()
+    }
+  }
+
+  // Generation progress is pushed over a websocket when the server supports it, polling covers the rest.
+  // Polling only stops once a pushed job update arrives, an open socket alone doesn't prove pushes reach us.
+  openProgressSocket() {
+    if (!this.hasProgressSocketUrlValue || !window.WebSocket) return
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
+    this.socket = new WebSocket(`${protocol}//${window.location.host}${this.progressSocketUrlValue}`)
+    this.socket.onmessage = (event) => this.handleProgress(JSON.parse(event.data))
+    this.socket.onclose = () => {
+      this.socket = null
+      this.pushing = false
+      if (this.pollingValue) this.schedulePoll()
+    }
+  }
+
+  handleProgress(message) {
+    if (message.type === 'job') {
+      this.pushing = true
+      clearTimeout(this.pollTimer)
+      this.handleJob(message.job)
+    } else if (message.type === 'flashcards') {
+      this.dispatch('flashcards', { detail: { cards: message.cards } })
+    }
+  }
+
+  // Returns whether the job is still in progress
+  handleJob(job) {
+    this.pollingValue = !!job && (job.status === 'pending' || job.status === 'running')
+    if (!job) {
+      this.showStatus(null)
+    } else if (this.pollingValue) {
+      this.showStatus('Generating new questions...')
+    } else if (job.status === 'succeeded') {
+      this.showStatus(null)
+      this.dispatch('generated', { detail: job })
+    } else {
+      this.showStatus('Failed to generate questions')
+    }
+    return this.pollingValue
+  }
+
+  schedulePoll() {
+    clearTimeout(this.pollTimer)
+    this.pollTimer = setTimeout(() => this.pollGenerationJob(), this.pollIntervalValue)
+  }
+
+  async pollGenerationJob() {
+    try {
+      const response = await fetch(this.generationJobUrlValue, {
+        headers: { 'Accept': 'application/json' },
+        credentials: 'same-origin'
+      })
+      if (!response.ok) throw new Error('Failed to fetch generation status')
+
+      const { job } = await response.json()
+      if (this.handleJob(job) && !this.pushing) {
+        this.schedulePoll()
+      }
+    } catch (error) {
+      console.error('Error polling generation job:', error)
+      if (!this.pushing) this.schedulePoll()
+    }
+  }
+
+  showStatus(text) {
+    if (!this.hasStatusTarget) return
+    this.statusTarget.classList.toggle('d-none', !text)
+    if (text && this.hasStatusTextTarget) {
+      this.statusTextTarget.textContent = text
+    }
+  }
+}
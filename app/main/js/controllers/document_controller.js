@@ -151,24 +151,58 @@ export default class extends Controller {
       method: 'POST',
       headers: {
         "Content-Type": "application/json",
+        "Accept": "text/event-stream",
         "X-CSRFToken": document.querySelector("[name=csrfmiddlewaretoken]").value
       },
       body: JSON.stringify({
         developer_prompt: "Parse the following document to a markdown-formatted text representation with relevant sections grouped together. Remove email and phone number.",
-        user_prompt: documentText
+        user_prompt: documentText,
+        stream: true
+      })
+    }).then(response => {
+      if (!response.ok) throw new Error(`Request failed with status ${response.status}`)
+      // Show the text as it streams in rather than waiting for the whole document
+      let text = ""
+      return this.readEvents(response, (event, data) => {
+        if (event === "error") throw new Error(data.error)
+        if (data.delta) {
+          text += data.delta
+          this.displayDocumentResponse(text, fileName, textarea)
+        }
       })
-    }).then(response => response.json())
-    .then(data => {
-      this.displayDocumentResponse(data.response, fileName, textarea)
     })
+    .then(() => this.clearMessages())
     .catch(error => {
-        throw new Error(error)
+      this.showError("Error processing the document.")
+      console.error(error)
     }).finally(() => {
       this.hideSpinner()
-      this.clearMessages()
     })
   }
 
+  async readEvents(response, onEvent) {
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ""
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) return
+      buffer += decoder.decode(value, { stream: true })
+      const events = buffer.split("\n\n")
+      buffer = events.pop()
+      for (const raw of events) {
+        let event = "message"
+        let data = ""
+        for (const line of raw.split("\n")) {
+          if (line.startsWith("event: ")) event = line.slice(7)
+          else if (line.startsWith("data: ")) data += line.slice(6)
+        }
+        if (event === "done") return reader.cancel()
+        onEvent(event, JSON.parse(data || "{}"))
+      }
+    }
+  }
+
   displayDocumentResponse(text, fileName, textarea) {
     const editor = this.editors.get(textarea.id)
     if (editor) {
@@ -6,6 +6,10 @@ export default class extends Controller {
     apiUrl: String,
     nextReviewUrl: String,
     reviewUrlTemplate: String,
+    reviewBatchUrl: String,
+    syncUrl: String,
+    syncCursor: String,
+    nextPageCursor: String,
     deleteUrlTemplate: String,
     reviewSide: String,
     csrfToken: String
@@ -13,10 +17,63 @@ export default class extends Controller {
 
   editModal = null
   currentEditCard = null
+  flushing = false
 
   connect() {
     this.prompts = {}
     this.editModal = new bootstrap.Modal(document.getElementById('editFlashcardModal'))
+    // Send any reviews that were queued while offline
+    this.flushPendingReviews = this.flushPendingReviews.bind(this)
+    window.addEventListener('online', this.flushPendingReviews)
+    this.flushPendingReviews()
+  }
+
+  disconnect() {
+    window.removeEventListener('online', this.flushPendingReviews)
+  }
+
+  get pendingReviewsKey() {
+    return `pendingReviews:${this.reviewBatchUrlValue}`
+  }
+
+  queueReview(review) {
+    const pending = JSON.parse(localStorage.getItem(this.pendingReviewsKey) || '[]')
+    pending.push(review)
+    localStorage.setItem(this.pendingReviewsKey, JSON.stringify(pending))
+  }
+
+  async flushPendingReviews() {
+    // The online event and a queued review can both ask for a flush, only one batch may be in flight
+    if (!this.hasReviewBatchUrlValue || this.flushing) return
+    const pending = JSON.parse(localStorage.getItem(this.pendingReviewsKey) || '[]')
+    if (pending.length === 0) return
+
+    this.flushing = true
+    let sent = false
+    try {
+      const response = await this.postWithToken(`${this.reviewBatchUrlValue}?previews=true`, pending)
+      if (!response.ok) throw new Error('Failed to submit queued reviews')
+
+      // Only drop what was sent, reviews may have been queued while the request was in flight
+      const remaining = JSON.parse(localStorage.getItem(this.pendingReviewsKey) || '[]').slice(pending.length)
+      if (remaining.length) {
+        localStorage.setItem(this.pendingReviewsKey, JSON.stringify(remaining))
+      } else {
+        localStorage.removeItem(this.pendingReviewsKey)
+      }
+      sent = true
+
+      const data = await response.json()
+      Object.entries(data.previews || {}).forEach(([id, html]) => {
+        const existingCard = this.previewContainerTarget.querySelector(`.flashcard-preview[data-flashcard-id="${id}"]`)
+        this.updateCardContent(existingCard, html)
+      })
+    } catch (error) {
+      console.error('Error submitting queued reviews:', error)
+    } finally {
+      this.flushing = false
+    }
+    if (sent && localStorage.getItem(this.pendingReviewsKey)) this.flushPendingReviews()
   }
 
   handlePromptsAvailable(event) {
@@ -232,6 +289,96 @@ export default class extends Controller {
     })
   }
 
+  async refreshCards() {
+    if (!this.hasPreviewContainerTarget) return
+    if (!this.hasSyncUrlValue || !this.syncCursorValue) return this.reloadCards()
+
+    try {
+      // Patch in only what changed since the last sync, following pages until caught up
+      let hasMore = true
+      while (hasMore) {
+        const params = new URLSearchParams({ cursor: this.syncCursorValue, html: 'true' })
+        const response = await fetch(`${this.syncUrlValue}?${params}`, { credentials: 'same-origin' })
+        if (response.status === 410) return this.reloadCards()
+        if (!response.ok) throw new Error('Failed to sync flashcards')
+
+        const data = await response.json()
+        data.deleted.forEach(id => this.findPreview(id)?.remove())
+        this.patchPreviews(data.cards)
+        this.syncCursorValue = data.cursor
+        hasMore = data.has_more
+      }
+    } catch (error) {
+      console.error('Error syncing flashcards:', error)
+    }
+  }
+
+  // Cards pushed by the deck controller as generation saves them
+  addPreviews(event) {
+    if (!this.hasPreviewContainerTarget) return
+    this.patchPreviews(event.detail.cards)
+  }
+
+  patchPreviews(cards) {
+    cards.forEach(card => {
+      const existingCard = this.findPreview(card.id)
+      if (existingCard) {
+        this.updateCardContent(existingCard, card.html)
+      } else {
+        this.appendFlashcard(card)
+      }
+    })
+  }
+
+  async reloadCards() {
+    try {
+      const response = await fetch(this.apiUrlValue, { credentials: 'same-origin' })
+      if (!response.ok) throw new Error('Failed to fetch flashcards')
+
+      const data = await response.json()
+      this.previewContainerTarget.innerHTML = data.html
+      this.syncCursorValue = data.sync_cursor
+      this.nextPageCursorValue = data.next_cursor || ''
+    } catch (error) {
+      console.error('Error refreshing flashcards:', error)
+    }
+  }
+
+  loadMoreIfNearEnd() {
+    const container = this.previewContainerTarget
+    if (container.scrollTop + container.clientHeight >= container.scrollHeight - 200) {
+      this.loadNextPage()
+    }
+  }
+
+  async loadNextPage() {
+    if (!this.nextPageCursorValue || this.loadingPage) return
+    this.loadingPage = true
+
+    try {
+      const params = new URLSearchParams({ cursor: this.nextPageCursorValue })
+      const response = await fetch(`${this.apiUrlValue}?${params}`, { credentials: 'same-origin' })
+      if (!response.ok) throw new Error('Failed to fetch more flashcards')
+
+      const data = await response.json()
+      // Skip cards that sync already moved into view
+      const temp = document.createElement('div')
+      temp.innerHTML = data.html
+      Array.from(temp.children).forEach(card => {
+        if (!this.findPreview(card.dataset.flashcardId)) this.previewContainerTarget.appendChild(card)
+      })
+      this.nextPageCursorValue = data.next_cursor || ''
+    } catch (error) {
+      console.error('Error loading flashcards:', error)
+    } finally {
+      this.loadingPage = false
+    }
+  }
+
+  findPreview(id) {
+    return this.previewContainerTarget.querySelector(`.flashcard-preview[data-flashcard-id="${id}"]`)
+  }
+
   appendFlashcard(flashcard) {
     if (flashcard && this.hasPreviewContainerTarget) {
       // Prepend the new flashcards to the preview container
@@ -286,6 +433,8 @@ export default class extends Controller {
       return
     }
     
+    // Timed from when the card is shown until it is judged
+    this.reviewStartedAt = performance.now()
     const side = card.dataset.flashcardSide
     const front = card.dataset.flashcardFrontValue
     const back = card.dataset.flashcardBackValue
@@ -367,17 +516,24 @@ export default class extends Controller {
   async postJudgement(card, status, notes = null) {
     console.log('Posting judgment:', { status, notes, cardData: card?.dataset })
     console.log(this.reviewUrlTemplateValue)
+    const review = {
+      status: status,
+      side: card.dataset.flashcardSide,
+      notes: notes,
+      latency_ms: this.reviewStartedAt ? Math.round(performance.now() - this.reviewStartedAt) : null
+    }
     try {
-      const response = await this.postWithToken(
-        this.reviewUrlTemplateValue.replace(':id', card.dataset.flashcardId),
-        {
-          status: status,
-          side: card.dataset.flashcardSide,
-          notes: notes
-        }
-      )
+      let response
+      try {
+        response = await this.postWithToken(this.reviewUrlTemplateValue.replace(':id', card.dataset.flashcardId), review)
+      } catch (networkError) {
+        // Offline, keep the review and send it with the next batch
+        this.queueReview({ ...review, card_id: card.dataset.flashcardId, reviewed_at: new Date().toISOString() })
+        throw networkError
+      }
       
       if (!response.ok) throw new Error('Failed to update review')
+      this.flushPendingReviews()
       
       const data = await response.json()
 
@@ -97,6 +97,15 @@ export default class extends Controller {
     }
   }
 
+  // Ask the server to mint a session ahead of the click, at most every 30 seconds
+  prewarmSession() {
+    if (this.isConnected || Date.now() - (this.lastPrewarm || 0) < 30000) return;
+    this.lastPrewarm = Date.now();
+    const url = new URL(this.sessionUrlValue, window.location.origin);
+    url.searchParams.set('prewarm', 'true');
+    fetch(url, { credentials: 'same-origin' }).catch(() => {});
+  }
+
   async getSessionToken() {
     this.updateStatus('Getting session token...', 'info');
     const response = await fetch(this.sessionUrlValue, {
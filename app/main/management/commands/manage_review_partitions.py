@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from main.review_events import ensure_review_event_partitions
+
+class Command(BaseCommand):
+    help = 'Creates upcoming monthly partitions for the review event log (Postgres only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3, help='How many months past the current one to create')
+
+    def handle(self, *args, **options):
+        created = ensure_review_event_partitions(options['months_ahead'])
+        for name in created:
+            self.stdout.write(self.style.SUCCESS(f'Created partition {name}'))
+        if not created:
+            self.stdout.write('Review event partitions are up to date')
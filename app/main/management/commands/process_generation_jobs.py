@@ -0,0 +1,33 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from main.models import GenerationJob
+from main.review_events import ensure_review_event_partitions
+
+class Command(BaseCommand):
+    help = 'Processes queued flashcard generation jobs, and keeps the review event partitions ahead while it runs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Processing flashcard generation jobs'))
+        partitions_every = getattr(settings, 'REVIEW_PARTITION_CHECK_INTERVAL', 6 * 60 * 60)
+        partitions_checked = None
+        while True:
+            close_old_connections()
+            for job in GenerationJob.run_pending():
+                style = self.style.SUCCESS if job.status == GenerationJob.Status.SUCCEEDED else self.style.WARNING
+                self.stdout.write(style(f'{job} created {job.created_count} flashcards'))
+
+            if options['once']:
+                return
+
+            # This is the one long-running process in every deploy, so it also creates next months' partitions
+            if partitions_checked is None or time.monotonic() - partitions_checked >= partitions_every:
+                for name in ensure_review_event_partitions():
+                    self.stdout.write(self.style.SUCCESS(f'Created partition {name}'))
+                partitions_checked = time.monotonic()
+            time.sleep(options['interval'])
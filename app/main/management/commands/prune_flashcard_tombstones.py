@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from main.models import FlashCardTombstone
+
+class Command(BaseCommand):
+    help = 'Deletes flashcard tombstones older than FLASHCARD_TOMBSTONE_TTL days'
+
+    def handle(self, *args, **options):
+        deleted = FlashCardTombstone.prune()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} flashcard tombstones'))
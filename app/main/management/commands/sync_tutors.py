@@ -3,6 +3,7 @@ import yaml
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from main.models import Tutor
+from main.tutor_registry import tutor_registry
 
 class Command(BaseCommand):
     help = 'Syncs tutors from YAML config files'
@@ -46,3 +47,6 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.ERROR(f'Error processing {rel_path}: {str(e)}')
                 )
+
+        # Saves already invalidate the registry, but be explicit in case rows were changed in bulk
+        tutor_registry.invalidate()
@@ -1,27 +1,41 @@
-from django.urls import resolve
-from .models import Tutor
+from django.http import HttpRequest
+from django.urls import resolve, Resolver404
+from .tutor_registry import tutor_registry
+
+
+def get_tutor(request):
+    # Try to get tutor from URL
+    try:
+        url_path = resolve(request.path_info).kwargs.get('url_path')
+    except Resolver404:
+        url_path = None
+    if url_path:
+        # URL has a tutor path - try to get that specific tutor
+        return tutor_registry.get(url_path)
+    # No tutor path - check if we have exactly one tutor
+    return tutor_registry.only()
+
+
+class LazyTutor:
+    """`request.tutor`, looked up on first access and then stored on the request.
+
+    Unlike SimpleLazyObject this gives a real None when there is no tutor, so
+    `is None` checks and queries filtering on it behave.
+    """
+
+    def __get__(self, request, owner=None):
+        if request is None:
+            return self
+        tutor = request.__dict__['tutor'] = get_tutor(request)
+        return tutor
+
 
 class TutorMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        # Only look the tutor up when something uses it, so static and API calls skip it
+        HttpRequest.tutor = LazyTutor()
 
     def __call__(self, request):
-        # Try to get tutor from URL
-        url_name = resolve(request.path_info).url_name
-        url_path = resolve(request.path_info).kwargs.get('url_path')
-        if url_path:
-            # URL has a tutor path - try to get that specific tutor
-            try:
-                request.tutor = Tutor.objects.get(url_path=url_path)
-            except Tutor.DoesNotExist:
-                request.tutor = None
-        else:
-            # No tutor path - check if we have exactly one tutor
-            tutor_count = Tutor.objects.count()
-            if tutor_count == 1:
-                request.tutor = Tutor.objects.first()
-            else:
-                request.tutor = None
-
         response = self.get_response(request)
         return response
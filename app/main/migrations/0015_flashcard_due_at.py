@@ -0,0 +1,47 @@
+# Generated by Django 5.1.4 on 2026-10-17 06:00
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_due_at(apps, schema_editor):
+    FlashCard = apps.get_model('main', 'FlashCard')
+    for side in ('front', 'back'):
+        FlashCard.objects.filter(**{f'{side}_last_review__isnull': False}).update(**{
+            f'{side}_due_at': models.ExpressionWrapper(
+                models.F(f'{side}_last_review') + models.F(f'{side}_interval') * datetime.timedelta(minutes=1),
+                output_field=models.DateTimeField(),
+            )
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_remove_deck_documents_document_deck'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='back_due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='front_due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['user', 'front_due_at'], name='flashcard_user_front_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['user', 'back_due_at'], name='flashcard_user_back_due_idx'),
+        ),
+        migrations.RunPython(backfill_due_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.4 on 2026-10-17 06:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Postgres partitions by month on reviewed_at, so the primary key has to
+# include it. Other databases get a plain table.
+CREATE_PARTITIONED_TABLE = """
+CREATE TABLE "main_reviewevent" (
+    "id" bigint NOT NULL GENERATED BY DEFAULT AS IDENTITY,
+    "side" smallint NOT NULL CHECK ("side" >= 0),
+    "status" smallint NOT NULL CHECK ("status" >= 0),
+    "ef_before" smallint NOT NULL CHECK ("ef_before" >= 0),
+    "ef_after" smallint NOT NULL CHECK ("ef_after" >= 0),
+    "interval_before" integer NOT NULL,
+    "interval_after" integer NOT NULL,
+    "latency_ms" integer NULL CHECK ("latency_ms" >= 0),
+    "reviewed_at" timestamp with time zone NOT NULL,
+    "card_id" uuid NOT NULL REFERENCES "main_flashcard" ("id") DEFERRABLE INITIALLY DEFERRED,
+    "user_id" integer NOT NULL REFERENCES "{user_table}" ("id") DEFERRABLE INITIALLY DEFERRED,
+    PRIMARY KEY ("id", "reviewed_at")
+) PARTITION BY RANGE ("reviewed_at");
+CREATE TABLE "main_reviewevent_default" PARTITION OF "main_reviewevent" DEFAULT;
+"""
+
+
+def create_review_event_table(apps, schema_editor):
+    ReviewEvent = apps.get_model('main', 'ReviewEvent')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(ReviewEvent)
+        return
+    user_table = ReviewEvent._meta.get_field('user').related_model._meta.db_table
+    schema_editor.execute(CREATE_PARTITIONED_TABLE.format(user_table=user_table))
+    # Indexes on the parent cascade to every partition
+    for index in ReviewEvent._meta.indexes:
+        schema_editor.add_index(ReviewEvent, index)
+
+
+def drop_review_event_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('main', 'ReviewEvent'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_generationjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ReviewEvent',
+                    fields=[
+                        ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                        ('side', models.PositiveSmallIntegerField(choices=[(0, 'front'), (1, 'back')])),
+                        ('status', models.PositiveSmallIntegerField(choices=[(0, 'forgot'), (1, 'hard'), (2, 'easy')])),
+                        ('ef_before', models.PositiveSmallIntegerField(help_text='Easiness factor before the review, in hundredths')),
+                        ('ef_after', models.PositiveSmallIntegerField(help_text='Easiness factor after the review, in hundredths')),
+                        ('interval_before', models.IntegerField(help_text='Interval before the review, in minutes')),
+                        ('interval_after', models.IntegerField(help_text='Interval after the review, in minutes')),
+                        ('latency_ms', models.PositiveIntegerField(blank=True, help_text='Time from showing the card to answering it', null=True)),
+                        ('reviewed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('card', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='review_events', to='main.flashcard')),
+                        ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='review_events', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['card', 'reviewed_at'], name='reviewevent_card_time_idx'), models.Index(fields=['user', 'reviewed_at'], name='reviewevent_user_time_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_review_event_table, drop_review_event_table),
+    ]
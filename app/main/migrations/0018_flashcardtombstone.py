@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-17 06:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_reviewevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlashCardTombstone',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('card_id', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('deck', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='flashcard_tombstones', to='main.deck')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deck', 'deleted_at', 'id'], name='tombstone_deck_sync_idx'), models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx')],
+            },
+        ),
+    ]
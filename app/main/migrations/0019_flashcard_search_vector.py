@@ -0,0 +1,88 @@
+# Generated by Django 5.1.4 on 2026-10-17 06:58
+
+import logging
+import django.contrib.postgres.search
+from django.db import migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+# Keep in step with SEARCH_CONFIG and SEARCH_FIELDS in main/search.py
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce({row}front, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}back, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}front_notes, '') || ' ' || coalesce({row}back_notes, '')), 'C')
+"""
+
+# Only fires when the text changes, so review updates don't pay for it
+CREATE_TRIGGER = """
+CREATE FUNCTION main_flashcard_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {vector};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER main_flashcard_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF front, back, front_notes, back_notes ON main_flashcard
+    FOR EACH ROW EXECUTE FUNCTION main_flashcard_search_vector_update();
+
+UPDATE main_flashcard SET search_vector = {backfill};
+
+CREATE INDEX flashcard_search_vector_idx ON main_flashcard USING gin (search_vector);
+"""
+
+CREATE_TRIGRAM_INDEXES = """
+CREATE INDEX flashcard_front_trgm_idx ON main_flashcard USING gin (front gin_trgm_ops);
+CREATE INDEX flashcard_back_trgm_idx ON main_flashcard USING gin (back gin_trgm_ops);
+"""
+
+DROP_SEARCH = """
+DROP INDEX IF EXISTS flashcard_back_trgm_idx;
+DROP INDEX IF EXISTS flashcard_front_trgm_idx;
+DROP INDEX IF EXISTS flashcard_search_vector_idx;
+DROP TRIGGER IF EXISTS main_flashcard_search_vector_trigger ON main_flashcard;
+DROP FUNCTION IF EXISTS main_flashcard_search_vector_update();
+"""
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_TRIGGER.format(
+        vector=SEARCH_VECTOR.format(row='NEW.'),
+        backfill=SEARCH_VECTOR.format(row=''),
+    ))
+
+    # Fuzzy matching needs pg_trgm, which may be missing or need a superuser to install
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if not cursor.fetchone():
+            return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception as e:
+        logger.warning(f'Skipping trigram search indexes, pg_trgm could not be installed: {e}')
+        return
+    schema_editor.execute(CREATE_TRIGRAM_INDEXES)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_flashcardtombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+# jsonb_path_ops only supports containment, which is all tags__contains needs, and is smaller than the default opclass
+CREATE_TAGS_INDEX = 'CREATE INDEX flashcard_tags_idx ON main_flashcard USING gin (tags jsonb_path_ops);'
+
+DROP_TAGS_INDEX = 'DROP INDEX IF EXISTS flashcard_tags_idx;'
+
+
+def create_tags_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_TAGS_INDEX)
+
+
+def drop_tags_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TAGS_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_flashcard_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_tags_index, drop_tags_index),
+    ]
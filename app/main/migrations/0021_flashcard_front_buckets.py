@@ -0,0 +1,91 @@
+# Generated by Django 5.1.4 on 2026-10-17 07:04
+
+from django.conf import settings
+import re
+import random
+import hashlib
+from django.db import migrations, models
+
+
+# A frozen copy of main/near_duplicates.py as it was when this migration was
+# written, so later changes to the hashing don't change what it computes
+BANDS, ROWS = 20, 3
+
+STOP_WORDS = frozenset("""
+    a about an and are as at be been by can could describe did do does example explain for from give had has have
+    how i if in is it me my of on or please should tell that the this to was we were what when where which who
+    why will with would you your
+""".split())
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(BANDS * ROWS)]
+
+
+def _hash(text, signed=False):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big', signed=signed)
+
+
+def question_words(text):
+    words = [word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+             for word in re.findall(r'[^\W_]+', str(text).lower())]
+    content = {word for word in words if word not in STOP_WORDS}
+    return frozenset(content or words)
+
+
+def question_buckets(text):
+    words = question_words(text)
+    if not words:
+        return []
+    hashes = [_hash(word) for word in words]
+    signature = [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+    return [
+        _hash(f'{band}:' + ','.join(map(str, signature[band * ROWS:(band + 1) * ROWS])), signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def backfill_front_buckets(apps, schema_editor):
+    FlashCard = apps.get_model('main', 'FlashCard')
+    cards = []
+    for card in FlashCard.objects.only('id', 'front').iterator(chunk_size=1000):
+        card.front_buckets = question_buckets(card.front)
+        cards.append(card)
+        if len(cards) == 1000:
+            FlashCard.objects.bulk_update(cards, ['front_buckets'])
+            cards = []
+    FlashCard.objects.bulk_update(cards, ['front_buckets'])
+
+
+# Each bucket lookup is a containment check, so jsonb_path_ops serves them like the tags index
+CREATE_BUCKETS_INDEX = 'CREATE INDEX flashcard_front_buckets_idx ON main_flashcard USING gin (front_buckets jsonb_path_ops);'
+
+DROP_BUCKETS_INDEX = 'DROP INDEX IF EXISTS flashcard_front_buckets_idx;'
+
+
+def create_buckets_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_BUCKETS_INDEX)
+
+
+def drop_buckets_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_BUCKETS_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_flashcard_tags_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='front_buckets',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_front_buckets, migrations.RunPython.noop),
+        migrations.RunPython(create_buckets_index, drop_buckets_index),
+    ]
@@ -1,15 +1,25 @@
-from django.db import models
+from django.db import models, transaction, connections
+from django.contrib.postgres.search import SearchVectorField
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 from uuid import uuid4
+from collections import Counter
 from enum import Enum
-import yaml
 
 from .presenters.interview_coach_presenter import InterviewCoachPresenter
 from .utils import do_something_handy
 from string import Template
 import json
-from .ai_helpers import call_openai, extract_json
+import re
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from . import scheduling, progress
+from .search import search_flashcards
+from .near_duplicates import NearDuplicateIndex, question_buckets
+from .ai_helpers import stream_openai, iter_json_objects, chunk_text
+from .tutor_config import config_store, apply_overrides, get_cached_user_config, set_cached_user_config, user_config_cache_is_shared
 import inflect
 
 class Tutor(models.Model):
@@ -38,38 +48,47 @@ class Tutor(models.Model):
         return self._inflect_engine.plural(self.deck_name)
 
     def get_config(self, user=None):
-        """Get tutor config with optional user overrides"""
+        """Get tutor config with optional user overrides.
+
+        The base config is parsed once per file change and shared read-only
+        across requests; user overrides are layered on copy-on-write and the
+        merged result is cached per user. With a shared cache a hit costs no
+        queries, as override writes invalidate the entry through signals; with a
+        per-process cache a hit costs one aggregate query on the user's
+        overrides, so edits made through another worker are still seen.
+        """
         if not self.config_path:
             raise ValueError("No config path set for this tutor")
 
         # Load base config
-        with open(self.config_path, 'r') as f:
-            config = yaml.safe_load(f)
+        config = config_store.get(self.config_path)
 
         if user:
+            url_path = config.get('url-path')
+            user_overrides = user.prompt_overrides.filter(tutor_url_path=url_path)
+            version = (config_store.version(self.config_path), self.updated_at)
+            if not user_config_cache_is_shared():
+                # Another worker's signal can't reach this process's cache, so the
+                # overrides' version comes from the database
+                override_state = user_overrides.aggregate(count=models.Count('id'), updated=models.Max('updated_at'))
+                version += (override_state['count'], override_state['updated'])
+            cached = get_cached_user_config(url_path, user.pk, version)
+            if cached is not None:
+                return cached
+
             # Get whitelist of allowed override paths
             whitelist = config.get('prompt-override-whitelist', [])
 
             # Get user's overrides for this tutor, filtering by whitelist
             overrides = {
                 override.key: override.value
-                for override in user.prompt_overrides.filter(
-                    tutor_url_path=config.get('url-path')
-                )
+                for override in user_overrides
                 if override.key in whitelist
             }
 
             # Apply whitelisted overrides using dotted path notation
-            for key, value in overrides.items():
-                target = config
-                *path_parts, final_key = key.split('.')
-
-                # Navigate to the correct nested dictionary
-                for part in path_parts:
-                    if part not in target:
-                        target[part] = {}
-                    target = target[part]
-                target[final_key] = value
+            config = apply_overrides(config, overrides)
+            set_cached_user_config(url_path, user.pk, version, config)
 
         return config
 
@@ -141,14 +160,37 @@ class Deck(models.Model):
         ordering = ['-updated_at']
 
     def get_existing_flashcards(self):
-        """Get existing auto-generated flashcards to avoid duplicates"""
-        return [
-            {'front': card.front, 'back': card.back}
-            for card in self.flashcards.filter(tags__contains=['auto-generated']) # This is interesting/weird AI logic
-        ]
+        """Get the most recent auto-generated flashcards to steer the prompt away from repeats.
+
+        Only FLASHCARD_PROMPT_EXISTING_CARDS of them, so the prompt doesn't grow
+        with the deck. Repeats of older cards are caught by drop_near_duplicates.
+        """
+        limit = getattr(settings, 'FLASHCARD_PROMPT_EXISTING_CARDS', 50)
+        cards = self.flashcards.with_tags(['auto-generated']).only('front', 'back').order_by('-created_at')[:limit] # This is interesting/weird AI logic
+        return [{'front': card.front, 'back': card.back} for card in cards]
+
+    def drop_near_duplicates(self, cards, index=None):
+        """Drop generated cards whose question nearly repeats a card in the deck or an earlier card.
 
-    def generate_flashcards(self):
-        """Generate new flashcards without saving them"""
+        The deck's candidates come from one query on the LSH buckets of all the
+        questions, so the cost follows the number of near matches, not the
+        deck size. Pass the same `index` across calls to dedupe a stream.
+        """
+        index = NearDuplicateIndex() if index is None else index
+        buckets = sorted({bucket for card in cards for bucket in question_buckets(card['question'])})
+        if buckets:
+            for front in self.flashcards.sharing_buckets(buckets).values_list('front', flat=True):
+                index.add(front)
+
+        kept = []
+        for card in cards:
+            if index.find(card['question']) is None:
+                index.add(card['question'])
+                kept.append(card)
+        return kept
+
+    def flashcard_generation_prompts(self):
+        """Return the tutor's generation prompts and a user prompt for each content chunk"""
         existing_cards = self.get_existing_flashcards()
 
         # Combine all available content sources
@@ -157,7 +199,7 @@ class Deck(models.Model):
             content_parts.append(self.content)
         if self.documents.exists():
             content_parts.extend(doc.content for doc in self.documents.all() if doc.content.strip())
-        combined_content = "\n\n".join(content_parts)
+        chunks = chunk_text(content_parts, getattr(settings, 'FLASHCARD_GENERATION_CHUNK_TOKENS', 6000)) or [""]
 
         # Get the tutor's prompt configuration
         config = self.tutor.get_config(self.owner)
@@ -165,45 +207,261 @@ class Deck(models.Model):
         if not prompts or 'system' not in prompts or 'user' not in prompts:
             raise ValueError(f"Tutor {self.tutor.name} does not have the required generate_flashcards prompts configured")
 
-        # Format the user prompt with our variables
         existing_card_text = "\n" + json.dumps([q['front'] for q in existing_cards]) if existing_cards else ""
-        user_prompt = Template(prompts['user']).safe_substitute(
-            content=combined_content,
-            existing_flashcards=existing_card_text
-        )
 
-        # Call OpenAI using the helper
-        response = call_openai(prompts['system'], user_prompt)
-        return extract_json(response)
+        # Format the user prompt with our variables
+        user_prompts = [
+            Template(prompts['user']).safe_substitute(content=chunk, existing_flashcards=existing_card_text)
+            for chunk in chunks
+        ]
+        return prompts, user_prompts
 
-    def save_flashcards(self, cards):
-        """Save the generated flashcards"""
-        created_cards = []
+    def stream_flashcards(self):
+        """Yield new flashcards one at a time as the completions stream in.
+
+        Each content chunk streams from OpenAI on its own thread, up to
+        FLASHCARD_GENERATION_CONCURRENCY at once, and a card is yielded as soon
+        as its JSON object is complete, skipping cards that nearly repeat an
+        earlier question or a card in the deck. Raises the first chunk error,
+        or TimeoutError once FLASHCARD_GENERATION_TIMEOUT has passed. Nothing
+        is saved.
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        prompts, user_prompts = self.flashcard_generation_prompts()
+        results = queue.Queue()
+
+        def stream_chunk(user_prompt):
+            try:
+                deltas = stream_openai(prompts['system'], user_prompt, model=prompts.get('model'))
+                for card in iter_json_objects(deltas):
+                    results.put(('card', card))
+                results.put(('done', None))
+            except Exception as e:
+                results.put(('error', e))
+
+        concurrency = max(1, min(getattr(settings, 'FLASHCARD_GENERATION_CONCURRENCY', 4), len(user_prompts)))
+        deadline = time.monotonic() + getattr(settings, 'FLASHCARD_GENERATION_TIMEOUT', 120)
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for user_prompt in user_prompts:
+                pool.submit(stream_chunk, user_prompt)
+            seen, index, remaining = set(), NearDuplicateIndex(), len(user_prompts)
+            while remaining:
+                try:
+                    kind, value = results.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    raise TimeoutError(f"{remaining} of {len(user_prompts)} chunks for deck {self.id} timed out")
+                if kind == 'error':
+                    logger.error(f"Error generating flashcards for a chunk of deck {self.id}: {value}")
+                    raise value
+                if kind == 'done':
+                    remaining -= 1
+                    continue
+                merged = self.drop_near_duplicates(self.merge_generated_cards([value], seen), index)
+                if merged:
+                    yield merged[0]
+        finally:
+            # Don't block on chunks that are still streaming
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def merge_generated_cards(cards, seen=None):
+        """Drop malformed cards and cards whose question duplicates an earlier one"""
+        seen = set() if seen is None else seen
+        merged = []
         for card in cards:
-            flashcard = FlashCard.objects.create(
+            if not isinstance(card, dict) or not card.get('question'):
+                continue
+            key = re.sub(r'[^\w\s]', '', str(card['question']).lower())
+            key = ' '.join(key.split())
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(card)
+        return merged
+
+    def save_flashcards(self, cards):
+        """Save the generated flashcards in one batch"""
+        flashcards = [
+            FlashCard(
                 user=self.owner,
                 front=card['question'],
                 back=card['suggested_answer'],
                 tags=[card['category'], 'auto-generated'] # TODO: This auto-generated things is AI thinking, I dunno if I like it.
             )
-            flashcard.decks.add(self)
-            created_cards.append(flashcard)
-        return created_cards
+            for card in cards
+        ]
+        return FlashCard.objects.bulk_create_with_decks(flashcards, [[self]] * len(flashcards))
 
-    def generate_and_save_flashcards(self):
-        """Generate and save new flashcards from documents and content"""
-        # Check if we have any content to generate from
+    def has_generation_content(self):
+        """Whether the deck has any content or documents to generate flashcards from"""
         has_content = bool(self.content and self.content.strip())
         has_documents = self.documents.exists() and any(doc.content.strip() for doc in self.documents.all())
+        return has_content or has_documents
+
+class GenerationJob(models.Model):
+    """A queued request to generate flashcards for a deck, processed by `manage.py process_generation_jobs`"""
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        SUCCEEDED = 'succeeded', 'Succeeded'
+        FAILED = 'failed', 'Failed'
 
-        if not (has_content or has_documents):
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"No content provided for deck {self.name} (id: {self.id}). Skipping flashcard generation.")
-            return []
+    ACTIVE_STATUSES = [Status.PENDING, Status.RUNNING]
 
-        cards = self.generate_flashcards()
-        return self.save_flashcards(cards)
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    deck = models.ForeignKey(Deck, on_delete=models.CASCADE, related_name='generation_jobs')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now, help_text='Earliest time the job may be picked up')
+    error = models.TextField(blank=True, default='')
+    created_count = models.IntegerField(default=0, help_text='Number of flashcards created by the job')
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='generationjob_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"GenerationJob {self.id} for {self.deck_id} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    @classmethod
+    def enqueue(cls, deck):
+        """Queue generation for a deck, reusing any job that hasn't started yet.
+
+        Call this inside the transaction that saves the deck so the worker only
+        sees the job once the deck and its documents are committed.
+        """
+        job = cls.objects.filter(deck=deck, status=cls.Status.PENDING).first()
+        if job:
+            return job
+        job = cls.objects.create(
+            deck=deck,
+            max_attempts=getattr(settings, 'GENERATION_JOB_MAX_ATTEMPTS', 3),
+        )
+        progress.publish_job(job)
+        return job
+
+    @classmethod
+    def claim_next(cls):
+        """Atomically claim the next runnable job, or return None.
+
+        Jobs left running longer than GENERATION_JOB_TIMEOUT (e.g. a killed
+        worker) are reclaimed, unless they have used all their attempts, in
+        which case they are failed so a job that kills its worker isn't
+        retried forever.
+        """
+        now = timezone.now()
+        stale = now - timezone.timedelta(seconds=getattr(settings, 'GENERATION_JOB_TIMEOUT', 600))
+        with transaction.atomic():
+            exhausted = cls.objects.select_for_update(skip_locked=True).filter(
+                status=cls.Status.RUNNING, started_at__lt=stale, attempts__gte=models.F('max_attempts'),
+            )
+            for job in exhausted:
+                job.status = cls.Status.FAILED
+                job.error = job.error or f"Timed out after {job.attempts} attempts"
+                job.finished_at = now
+                job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+                progress.publish_job(job)
+
+            job = cls.objects.select_for_update(skip_locked=True).filter(
+                models.Q(status=cls.Status.PENDING, run_after__lte=now) |
+                models.Q(status=cls.Status.RUNNING, started_at__lt=stale, attempts__lt=models.F('max_attempts'))
+            ).order_by('run_after').first()
+            if job is None:
+                return None
+            job.status = cls.Status.RUNNING
+            job.attempts += 1
+            job.started_at = now
+            job.save(update_fields=['status', 'attempts', 'started_at', 'updated_at'])
+            progress.publish_job(job)
+        return job
+
+    def run(self):
+        """Generate flashcards for the claimed job, saving and pushing each as it streams in.
+
+        The LLM calls happen outside any transaction. Each card is committed
+        on its own, and only if this worker still owns the attempt, so a
+        reclaimed attempt stops saving. Cards saved before a failure are kept,
+        and the retry skips questions that repeat them.
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        attempt = self.attempts
+        try:
+            deck = self.deck
+            cards = deck.stream_flashcards() if deck.has_generation_content() else []
+            for card in cards:
+                with transaction.atomic():
+                    job = self._lock_attempt(attempt)
+                    if job is None:
+                        logger.warning(f"{self} was reclaimed, discarding attempt {attempt}")
+                        return GenerationJob.objects.get(pk=self.pk)
+                    created = deck.save_flashcards([card])
+                    job.created_count += len(created)
+                    job.save(update_fields=['created_count', 'updated_at'])
+                    progress.publish_flashcards(deck.pk, created)
+
+            with transaction.atomic():
+                job = self._lock_attempt(attempt)
+                if job is None:
+                    logger.warning(f"{self} was reclaimed, discarding attempt {attempt}")
+                    return GenerationJob.objects.get(pk=self.pk)
+                job.status = self.Status.SUCCEEDED
+                job.error = ''
+                job.finished_at = timezone.now()
+                job.save()
+                progress.publish_job(job)
+            return job
+        except Exception as e:
+            logger.error(f"Error generating flashcards for {self}: {str(e)}")
+            return self._record_failure(attempt, e)
+
+    def _lock_attempt(self, attempt):
+        """The locked job if this worker still owns `attempt`, otherwise None"""
+        job = GenerationJob.objects.select_for_update().get(pk=self.pk)
+        if job.status != self.Status.RUNNING or job.attempts != attempt:
+            return None
+        return job
+
+    def _record_failure(self, attempt, error):
+        with transaction.atomic():
+            job = GenerationJob.objects.select_for_update().get(pk=self.pk)
+            if job.status != self.Status.RUNNING or job.attempts != attempt:
+                return job
+            job.error = str(error)
+            if job.attempts < job.max_attempts:
+                delay = getattr(settings, 'GENERATION_JOB_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+                job.status = self.Status.PENDING
+                job.run_after = timezone.now() + timezone.timedelta(seconds=delay)
+            else:
+                job.status = self.Status.FAILED
+                job.finished_at = timezone.now()
+            job.save()
+            progress.publish_job(job)
+        return job
+
+    @classmethod
+    def run_pending(cls, limit=None):
+        """Claim and run jobs until the queue is empty (or `limit` is reached). Returns the jobs run."""
+        jobs = []
+        while limit is None or len(jobs) < limit:
+            job = cls.claim_next()
+            if job is None:
+                break
+            jobs.append(job.run())
+        return jobs
 
 class Document(models.Model):
     class DocumentType(models.TextChoices):
@@ -263,6 +521,193 @@ class Invitation(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+class FlashCardQuerySet(models.QuerySet):
+    def search(self, text):
+        """Cards matching a search, annotated with `rank` and ordered best first"""
+        return search_flashcards(self, text, alias=self.db)
+
+    def with_tags(self, tags):
+        """Cards that have every one of `tags`, one jsonb containment check served by the tags GIN index"""
+        tags = [tag for tag in tags if tag]
+        return self.filter(tags__contains=tags) if tags else self
+
+    def sharing_buckets(self, buckets):
+        """Cards whose question is in any of the near-duplicate `buckets`.
+
+        On Postgres this is one jsonb containment check per bucket, each served
+        by the front_buckets GIN index. Other databases compare them in Python.
+        """
+        buckets = set(buckets)
+        if not buckets:
+            return self.none()
+        if connections[self.db].vendor != 'postgresql':
+            card_buckets = self.order_by().values_list('id', 'front_buckets')
+            return self.filter(id__in=[card_id for card_id, front_buckets in card_buckets if buckets.intersection(front_buckets or ())])
+
+        condition = models.Q()
+        for bucket in sorted(buckets):
+            condition |= models.Q(front_buckets__contains=[bucket])
+        return self.filter(condition)
+
+    def tag_counts(self):
+        """How many of these cards have each tag, most used first, as a list of (tag, count).
+
+        On Postgres the tags are unnested and counted in a single aggregate
+        query. Other databases count them in Python.
+        """
+        cards = self.order_by().values('id', 'tags')
+        if connections[self.db].vendor != 'postgresql':
+            counts = Counter(tag for tags in cards.values_list('tags', flat=True) if isinstance(tags, list) for tag in set(tags))
+            return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+        sql, params = cards.query.sql_with_params()
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(f"""
+                SELECT tag, COUNT(DISTINCT cards.id) FROM ({sql}) AS cards
+                CROSS JOIN LATERAL jsonb_array_elements_text(
+                    CASE WHEN jsonb_typeof(cards.tags) = 'array' THEN cards.tags ELSE '[]'::jsonb END
+                ) AS tag
+                GROUP BY tag
+                ORDER BY COUNT(DISTINCT cards.id) DESC, tag
+            """, params)
+            return [(tag, count) for tag, count in cursor.fetchall()]
+
+    def bulk_create_with_decks(self, flashcards, decks):
+        """Insert flashcards and their deck links with one INSERT each, in a single transaction.
+
+        `decks` is parallel to `flashcards`: decks[i] is the decks flashcards[i] belongs to.
+        Returns the created flashcards.
+        """
+        for flashcard in flashcards:
+            flashcard.sync_due_at()
+            flashcard.sync_front_buckets()
+        Through = self.model.decks.through
+        with transaction.atomic():
+            created = self.bulk_create(flashcards)
+            Through.objects.bulk_create([
+                Through(flashcard_id=flashcard.pk, deck_id=deck_id)
+                for flashcard, card_decks in zip(created, decks)
+                # A deck listed twice for one card would break the through table's unique constraint
+                for deck_id in dict.fromkeys(deck.pk for deck in card_decks)
+            ])
+        return created
+
+    def in_preview_order(self):
+        """Most recently reviewed first, then newest, with id making the order unique for keyset paging"""
+        return self.order_by(
+            models.F('front_last_review').desc(nulls_last=True),
+            models.F('back_last_review').desc(nulls_last=True),
+            models.F('created_at').desc(),
+            models.F('id').desc(),
+        )
+
+    def next_due(self, sides=('front', 'back'), now=None):
+        """Return the next due card with `review_side` and `due_at` annotated, or None.
+
+        Overdue sides come first (most overdue first), then never-reviewed sides.
+        Ties are broken by the card's random UUID so new cards come out in no
+        particular order. Each side is one indexed branch of a single UNION query.
+        """
+        now = now or timezone.now()
+        branches = [
+            self.order_by().filter(
+                models.Q(**{f'{side}_due_at__lte': now}) | models.Q(**{f'{side}_due_at__isnull': True})
+            ).annotate(
+                review_side=models.Value(side, output_field=models.CharField()),
+                due_at=models.F(f'{side}_due_at'),
+            )
+            for side in sides
+        ]
+        if not branches:
+            return None
+        queryset = branches[0].union(*branches[1:], all=True) if len(branches) > 1 else branches[0]
+        return queryset.order_by(models.F('due_at').asc(nulls_last=True), 'id').first()
+
+    def sync_due_at(self, sides=('front', 'back')):
+        """Recompute the stored due times in one UPDATE, e.g. after an update() that skipped save()"""
+        return self.update(updated_at=timezone.now(), **{
+            f'{side}_due_at': models.ExpressionWrapper(
+                models.F(f'{side}_last_review') + models.F(f'{side}_interval') * timezone.timedelta(minutes=1),
+                output_field=models.DateTimeField(),
+            )
+            for side in sides
+        })
+
+    def apply_review_batch(self, reviews):
+        """Apply many reviews with one SELECT and one bulk UPDATE.
+
+        `reviews` is a list of dicts with card_id, side, status and optionally
+        notes and reviewed_at. They are applied in reviewed_at order, so a queue
+        of offline reviews schedules the same as if each had been sent live.
+        Reviews for cards outside this queryset are skipped, as are stale
+        reviews no newer than the side's last review, e.g. a queued review
+        resent or arriving after a fresher one from another device.
+
+        Returns a tuple of (updated cards, unsaved ReviewEvents, missing card ids,
+        stale card ids).
+        """
+        now = timezone.now()
+        cards = self.in_bulk({review['card_id'] for review in reviews})
+        ordered = sorted(reviews, key=lambda review: min(review.get('reviewed_at') or now, now))
+
+        events, fields, updated, missing, stale = [], {'updated_at', 'front_due_at', 'back_due_at'}, {}, [], []
+        for review in ordered:
+            card = cards.get(review['card_id'])
+            if card is None:
+                missing.append(review['card_id'])
+                continue
+            reviewed_at = min(review.get('reviewed_at') or now, now)
+            last_review = getattr(card, f"{review['side']}_last_review")
+            if last_review and reviewed_at <= last_review:
+                stale.append(review['card_id'])
+                continue
+            event, update_fields = card.apply_review(review['status'], review['side'], review.get('notes'), reviewed_at)
+            event.latency_ms = review.get('latency_ms')
+            events.append(event)
+            fields.update(update_fields)
+            updated[card.pk] = card
+
+        for card in updated.values():
+            card.updated_at = now
+            card.sync_due_at()
+        if updated:
+            self.model.objects.bulk_update(updated.values(), sorted(fields))
+        return list(updated.values()), events, missing, stale
+
+    def reset_schedule(self, sides=('front', 'back'), params=scheduling.DEFAULT_PARAMS):
+        """Forget all review progress for the given sides in one UPDATE"""
+        ef, reps, interval = scheduling.initial_state(params)
+        fields = {'updated_at': timezone.now()}
+        for side in sides:
+            fields.update({
+                f'{side}_easiness_factor': ef,
+                f'{side}_repetitions': reps,
+                f'{side}_interval': interval,
+                f'{side}_review_count': 0,
+                f'{side}_last_review': None,
+                f'{side}_due_at': None,
+            })
+        return self.update(**fields)
+
+    def replay_schedule(self, histories, side='front', params=scheduling.DEFAULT_PARAMS):
+        """Rebuild one side's schedule from review history, e.g. after changing SM-2 parameters.
+
+        `histories` maps card id to that side's review statuses, oldest first.
+        Cards in this queryset without history are reset. The schedules are
+        computed with NumPy and written back in a single bulk UPDATE.
+        Returns the number of cards updated.
+        """
+        cards = list(self.only('id', f'{side}_last_review'))
+        ef, reps, interval = scheduling.replay([histories.get(card.pk, []) for card in cards], params)
+        now = timezone.now()
+        for card, card_ef, card_reps, card_interval in zip(cards, ef.tolist(), reps.tolist(), interval.tolist()):
+            card.set_side_state(side, scheduling.SideState(card_ef, card_reps, card_interval))
+            card.updated_at = now
+            card.sync_due_at(sides=[side])
+        fields = [*FlashCard.side_fields(side), f'{side}_due_at', 'updated_at']
+        return self.model.objects.bulk_update(cards, fields, batch_size=1000)
+
+
 class FlashCard(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     front = models.TextField()
@@ -275,6 +720,8 @@ class FlashCard(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='flashcards')
     decks = models.ManyToManyField(Deck, related_name='flashcards', blank=True)
 
+    objects = FlashCardQuerySet.as_manager()
+
     # Front review fields
     front_last_review = models.DateTimeField(null=True, blank=True)
     front_interval = models.IntegerField(default=1)  # in minutes
@@ -289,12 +736,51 @@ class FlashCard(models.Model):
     back_easiness_factor = models.FloatField(default=2.5)
     back_repetitions = models.IntegerField(default=0)
 
+    # Precomputed due times (last_review + interval), null until the side is first reviewed
+    front_due_at = models.DateTimeField(null=True, blank=True)
+    back_due_at = models.DateTimeField(null=True, blank=True)
+
+    # Weighted tsvector of the card's text, maintained by a database trigger on Postgres (see main/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # LSH buckets of the question for finding near-duplicates, GIN indexed on Postgres (see main/near_duplicates.py)
+    front_buckets = models.JSONField(default=list, blank=True, editable=False)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'front_due_at'], name='flashcard_user_front_due_idx'),
+            models.Index(fields=['user', 'back_due_at'], name='flashcard_user_back_due_idx'),
+        ]
 
     def __str__(self):
         return f"FlashCard {self.id}: {self.front[:30]}..."
 
+    def save(self, *args, **kwargs):
+        self.sync_due_at()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'front' in update_fields:
+            # Reviews save only their own fields, so they skip rehashing the question
+            self.sync_front_buckets()
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'front_due_at', 'back_due_at'}
+            if 'front' in update_fields:
+                update_fields.add('front_buckets')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+    def sync_front_buckets(self):
+        """Recompute the question's near-duplicate buckets"""
+        self.front_buckets = question_buckets(self.front)
+
+    def sync_due_at(self, sides=('front', 'back')):
+        """Recompute the stored due times from each side's last review and interval"""
+        for side in sides:
+            last_review = getattr(self, f'{side}_last_review')
+            interval = getattr(self, f'{side}_interval')
+            due_at = last_review + timezone.timedelta(minutes=interval) if last_review else None
+            setattr(self, f'{side}_due_at', due_at)
+
     def is_due_for_review(self, side=None):
         """Check if the card is due for review. If side is specified, checks only that side.
         Otherwise checks both sides and returns True if either side is due."""
@@ -308,52 +794,151 @@ class FlashCard(models.Model):
             # Check both sides
             return self.is_due_for_review('front') or self.is_due_for_review('back')
 
+    @staticmethod
+    def side_fields(side):
+        """The easiness factor, repetitions and interval field names for one side"""
+        return (f'{side}_easiness_factor', f'{side}_repetitions', f'{side}_interval')
+
+    def side_state(self, side):
+        return scheduling.SideState(*(getattr(self, field) for field in self.side_fields(side)))
+
+    def set_side_state(self, side, state):
+        for field, value in zip(self.side_fields(side), state):
+            setattr(self, field, value)
+
     def update_review(self, status: ReviewStatus, side='front', notes=None):
         """Update review status and schedule next review using SM-2 algorithm
 
+        Only this side's review columns, its due time and updated_at are written.
+
         Args:
             status (ReviewStatus): The review status (FORGOT, HARD, or EASY)
             side (str, optional): Which side of the card to update ('front' or 'back'). Defaults to 'front'.
             notes (str, optional): Notes to store for this side of the card. Defaults to None.
+
+        Returns:
+            ReviewEvent: An unsaved record of this review for the event log
         """
-        now = timezone.now()
+        event, update_fields = self.apply_review(status, side, notes)
+        self.save(update_fields=update_fields)
+        return event
+
+    def apply_review(self, status: ReviewStatus, side='front', notes=None, reviewed_at=None):
+        """Apply a review to this card in memory without saving it.
 
-        # Get current values
-        ef = getattr(self, f'{side}_easiness_factor')
-        reps = getattr(self, f'{side}_repetitions')
-        interval = getattr(self, f'{side}_interval')
-        review_count = getattr(self, f'{side}_review_count')
+        Args:
+            status (ReviewStatus): The review status (FORGOT, HARD, or EASY)
+            side (str, optional): Which side of the card was reviewed. Defaults to 'front'.
+            notes (str, optional): Notes to store for this side of the card. Defaults to None.
+            reviewed_at (datetime, optional): When the review happened. Defaults to now.
+
+        Returns:
+            Tuple of the unsaved ReviewEvent and the fields that changed
+        """
+        if side not in ('front', 'back'):
+            raise ValueError(f"Invalid side {side!r}, must be 'front' or 'back'")
+        before = self.side_state(side)
+        reviewed_at = reviewed_at or timezone.now()
 
         # Update review count
-        setattr(self, f'{side}_review_count', review_count + 1)
-        setattr(self, f'{side}_last_review', now)
+        setattr(self, f'{side}_review_count', getattr(self, f'{side}_review_count') + 1)
+        setattr(self, f'{side}_last_review', reviewed_at)
+        update_fields = [*self.side_fields(side), f'{side}_review_count', f'{side}_last_review', 'updated_at']
 
         # Update notes if provided
         if notes is not None:
             setattr(self, f'{side}_notes', notes)
+            update_fields.append(f'{side}_notes')
 
         # Apply SM-2 algorithm
-        if status == ReviewStatus.FORGOT:
-            reps = 0
-            interval = 1
-            ef = max(1.3, ef - 0.3)
-        else:
-            reps += 1
-            if status == ReviewStatus.HARD:
-                ef = max(1.3, ef - 0.15)
-            elif status == ReviewStatus.EASY:
-                ef = min(2.5, ef + 0.15)
-
-            if reps == 1:
-                interval = 1
-            elif reps == 2:
-                interval = 6
-            else:
-                interval = round(interval * ef)
+        after = scheduling.review(before, status)
+        self.set_side_state(side, after)
+
+        event = ReviewEvent.for_review(self, side, status, before, after, reviewed_at)
+        return event, update_fields
+
 
-        # Update values
-        setattr(self, f'{side}_easiness_factor', ef)
-        setattr(self, f'{side}_repetitions', reps)
-        setattr(self, f'{side}_interval', interval)
+class FlashCardTombstone(models.Model):
+    """Marks a card that left a deck, deleted or just removed, so delta sync can report it"""
+    id = models.BigAutoField(primary_key=True)
+    deck = models.ForeignKey(Deck, on_delete=models.CASCADE, related_name='flashcard_tombstones', db_index=False)
+    card_id = models.UUIDField()
+    deleted_at = models.DateTimeField(default=timezone.now)
 
-        self.save()
+    class Meta:
+        indexes = [
+            models.Index(fields=['deck', 'deleted_at', 'id'], name='tombstone_deck_sync_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"FlashCardTombstone {self.card_id} from deck {self.deck_id}"
+
+    @classmethod
+    def record(cls, pairs):
+        """Create tombstones for (deck_id, card_id) pairs in one INSERT"""
+        now = timezone.now()
+        cls.objects.bulk_create([cls(deck_id=deck_id, card_id=card_id, deleted_at=now) for deck_id, card_id in pairs])
+
+    @classmethod
+    def prune(cls, older_than=None):
+        """Delete tombstones older than FLASHCARD_TOMBSTONE_TTL days, clients that far behind resync from scratch"""
+        older_than = older_than or timezone.now() - timezone.timedelta(days=getattr(settings, 'FLASHCARD_TOMBSTONE_TTL', 30))
+        return cls.objects.filter(deleted_at__lt=older_than).delete()[0]
+
+
+class ReviewEvent(models.Model):
+    """One review of one side of a card, appended and never updated.
+
+    Columns are small integer codes so the table stays compact at millions of
+    rows. On Postgres the table is range-partitioned by month on reviewed_at,
+    see migration 0017 and the manage_review_partitions command. Easiness
+    factors are stored in hundredths.
+    """
+
+    class Side(models.IntegerChoices):
+        FRONT = 0, 'front'
+        BACK = 1, 'back'
+
+    class Status(models.IntegerChoices):
+        # Matches the grades in main.scheduling
+        FORGOT = scheduling.FORGOT, 'forgot'
+        HARD = scheduling.HARD, 'hard'
+        EASY = scheduling.EASY, 'easy'
+
+    id = models.BigAutoField(primary_key=True)
+    # Covered by the (card, reviewed_at) and (user, reviewed_at) indexes
+    card = models.ForeignKey(FlashCard, on_delete=models.CASCADE, related_name='review_events', db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_events', db_index=False)
+    side = models.PositiveSmallIntegerField(choices=Side.choices)
+    status = models.PositiveSmallIntegerField(choices=Status.choices)
+    ef_before = models.PositiveSmallIntegerField(help_text='Easiness factor before the review, in hundredths')
+    ef_after = models.PositiveSmallIntegerField(help_text='Easiness factor after the review, in hundredths')
+    interval_before = models.IntegerField(help_text='Interval before the review, in minutes')
+    interval_after = models.IntegerField(help_text='Interval after the review, in minutes')
+    latency_ms = models.PositiveIntegerField(null=True, blank=True, help_text='Time from showing the card to answering it')
+    reviewed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['card', 'reviewed_at'], name='reviewevent_card_time_idx'),
+            models.Index(fields=['user', 'reviewed_at'], name='reviewevent_user_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"ReviewEvent {self.id}: {self.get_side_display()} {self.get_status_display()}"
+
+    @classmethod
+    def for_review(cls, card, side, status, before, after, reviewed_at, latency_ms=None):
+        return cls(
+            card=card,
+            user_id=card.user_id,
+            side=cls.Side[side.upper()],
+            status=cls.Status[str(status).upper()],
+            ef_before=round(before.easiness_factor * 100),
+            ef_after=round(after.easiness_factor * 100),
+            interval_before=before.interval,
+            interval_after=after.interval,
+            latency_ms=latency_ms,
+            reviewed_at=reviewed_at,
+        )
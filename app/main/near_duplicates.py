@@ -0,0 +1,95 @@
+"""
+Near-duplicate detection for flashcard questions.
+
+A question is reduced to its set of content words, and a MinHash signature
+of that set is split into LSH bands. Each band hashes to a bucket, and a
+card's buckets are stored on it (`FlashCard.front_buckets`, GIN indexed on
+Postgres, see migration 0021). Questions sharing a bucket are candidates,
+which are then compared exactly, so a lookup only reads the few cards that
+could match rather than the whole deck.
+
+With 20 bands of 3 rows, questions whose word sets have a Jaccard
+similarity of 0.6 share a bucket over 99% of the time, and 0.3 about 40%.
+
+The hashing is seeded so buckets are stable across processes. Changing the
+stop words, bands or rows changes every bucket, so add a migration that
+recomputes them.
+"""
+import re
+import random
+import hashlib
+from collections import defaultdict
+from django.conf import settings
+
+BANDS, ROWS = 20, 3
+
+# Question phrasing that says nothing about what is being asked
+STOP_WORDS = frozenset("""
+    a about an and are as at be been by can could describe did do does example explain for from give had has have
+    how i if in is it me my of on or please should tell that the this to was we were what when where which who
+    why will with would you your
+""".split())
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(BANDS * ROWS)]
+
+
+def _hash(text, signed=False):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big', signed=signed)
+
+
+def question_words(text):
+    """The normalized content words of a question, plural 's' dropped"""
+    words = [word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+             for word in re.findall(r'[^\W_]+', str(text).lower())]
+    content = {word for word in words if word not in STOP_WORDS}
+    return frozenset(content or words)
+
+
+def similarity(words, other):
+    """Jaccard similarity of two word sets"""
+    if not words or not other:
+        return 0.0
+    return len(words & other) / len(words | other)
+
+
+def question_buckets(text):
+    """The LSH buckets of a question, as signed 64 bit ints"""
+    words = question_words(text)
+    if not words:
+        return []
+    hashes = [_hash(word) for word in words]
+    signature = [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+    return [
+        _hash(f'{band}:' + ','.join(map(str, signature[band * ROWS:(band + 1) * ROWS])), signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def duplicate_threshold():
+    return getattr(settings, 'FLASHCARD_DUPLICATE_THRESHOLD', 0.6)
+
+
+class NearDuplicateIndex:
+    """An in-memory LSH index of questions, for checking a batch against itself and its candidates"""
+
+    def __init__(self, threshold=None):
+        self.threshold = duplicate_threshold() if threshold is None else threshold
+        self._buckets = defaultdict(list)
+
+    def add(self, text):
+        words = question_words(text)
+        for bucket in question_buckets(text):
+            self._buckets[bucket].append((text, words))
+
+    def find(self, text):
+        """The most similar indexed question at or above the threshold, or None"""
+        words = question_words(text)
+        best, best_score = None, self.threshold
+        for bucket in question_buckets(text):
+            for other_text, other_words in self._buckets.get(bucket, ()):
+                score = similarity(words, other_words)
+                if score >= best_score:
+                    best, best_score = other_text, score
+        return best
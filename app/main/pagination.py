@@ -0,0 +1,75 @@
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from .sync import encode_cursor, decode_cursor, InvalidCursor
+
+
+def _ordering_columns(queryset):
+    """(field name, descending, nulls last) for each column in the queryset's ordering"""
+    columns = []
+    for order in queryset.query.order_by:
+        if isinstance(order, str):
+            descending = order.startswith('-')
+            order = F(order.lstrip('-')).desc() if descending else F(order).asc()
+        if not isinstance(order, OrderBy) or not isinstance(order.expression, F):
+            raise ValueError(f'Keyset pagination needs plain field ordering, got {order!r}')
+        # Postgres puts nulls last ascending and first descending unless told otherwise
+        nulls_last = bool(order.nulls_last) or (not order.nulls_first and not order.descending)
+        columns.append((order.expression.name, order.descending, nulls_last))
+    return columns
+
+
+def _after_q(name, value, descending, nulls_last):
+    """Rows that sort strictly after `value` in one column, or None if nothing can"""
+    if value is None:
+        return None if nulls_last else Q(**{f'{name}__isnull': False})
+    after = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+    return after | Q(**{f'{name}__isnull': True}) if nulls_last else after
+
+
+def _equal_q(name, value):
+    return Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+
+
+def keyset_page(queryset, page_size, cursor=None):
+    """Return one page of an ordered queryset and a cursor for the next page.
+
+    The queryset's ordering must end in a unique column, e.g. 'id', and may use
+    nullable columns with explicit nulls_first/nulls_last. Each page is a
+    WHERE on the last row's values plus LIMIT, so the cost of page N doesn't
+    grow with N the way OFFSET does.
+
+    Returns (items, next_cursor), next_cursor is None on the last page.
+    Raises InvalidCursor for a cursor that doesn't decode.
+    """
+    columns = _ordering_columns(queryset)
+    model = queryset.model
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursor(f'Invalid cursor: {cursor}')
+        try:
+            values = [
+                None if value is None else model._meta.get_field(name).to_python(value)
+                for (name, _, _), value in zip(columns, values)
+            ]
+        except Exception as e:
+            raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+        # Lexicographic "after": equal on every earlier column and after on this one
+        condition = Q(pk__in=[])
+        for i, (name, descending, nulls_last) in enumerate(columns):
+            after = _after_q(name, values[i], descending, nulls_last)
+            if after is None:
+                continue
+            for j in range(i):
+                after &= _equal_q(columns[j][0], values[j])
+            condition |= after
+        queryset = queryset.filter(condition)
+
+    items = list(queryset[:page_size + 1])
+    if len(items) <= page_size:
+        return items, None
+    items = items[:page_size]
+    last = items[-1]
+    return items, encode_cursor([getattr(last, name) for name, _, _ in columns])
@@ -0,0 +1,93 @@
+"""
+Fragment cache for the rendered `_flashcard_preview.html` partial.
+
+Each card has one cache entry holding (variant, html). The variant is made of
+everything the partial's output depends on besides the card's fields, so a
+stale entry is simply re-rendered rather than served:
+
+- updated_at, which every write to the card's fields bumps
+- whether the card is due, which flips as time passes without a write
+- the "time since last review" text and the active timezone
+"""
+import logging
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.timesince import timesince
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_TEMPLATE = 'main/_flashcard_preview.html'
+
+# Per-process lookup metrics, see preview_cache_stats()
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches['fragments']
+
+
+def preview_cache_key(card_id):
+    return f'flashcard-preview:{card_id}'
+
+
+def preview_variant(card):
+    """Everything besides the card's fields that changes the rendered preview"""
+    last_review = card.front_last_review or card.back_last_review
+    return (
+        card.updated_at.isoformat() if card.updated_at else None,
+        card.is_due_for_review(),
+        timesince(last_review) if last_review else None,
+        timezone.get_current_timezone_name(),
+    )
+
+
+def render_previews(cards):
+    """Render the preview for each card, reading unchanged cards from the cache with one lookup"""
+    cards = list(cards)
+    if not cards:
+        return []
+    variants = {card.pk: preview_variant(card) for card in cards}
+    cached = _cache().get_many([preview_cache_key(card.pk) for card in cards])
+
+    html, missed = [], {}
+    for card in cards:
+        entry = cached.get(preview_cache_key(card.pk))
+        if entry and entry[0] == variants[card.pk]:
+            html.append(entry[1])
+            continue
+        rendered = render_to_string(PREVIEW_TEMPLATE, {'flashcard': card})
+        missed[preview_cache_key(card.pk)] = (variants[card.pk], rendered)
+        html.append(rendered)
+
+    if missed:
+        _cache().set_many(missed, getattr(settings, 'FLASHCARD_PREVIEW_CACHE_TIMEOUT', None))
+    with _stats_lock:
+        _stats['hits'] += len(cards) - len(missed)
+        _stats['misses'] += len(missed)
+    return html
+
+
+def render_preview(card):
+    return render_previews([card])[0]
+
+
+def invalidate_previews(card_ids):
+    _cache().delete_many([preview_cache_key(card_id) for card_id in card_ids])
+
+
+def preview_cache_stats():
+    """Returns hit and miss totals and the hit rate for this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def reset_preview_cache_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
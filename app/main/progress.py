@@ -0,0 +1,76 @@
+"""
+Push deck generation progress to open deck pages over Channels.
+
+Each deck has a channel layer group that `DeckConsumer` websockets join. The
+generation worker publishes job state changes and the previews of the cards
+it saved once the transaction that wrote them commits. Pushing is best
+effort: pages that miss a message, or can't open a websocket, fall back to
+polling the generation job endpoint. Pages are only offered the websocket
+when pushes can reach them (see `push_available`).
+"""
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from .preview_cache import render_previews
+
+logger = logging.getLogger(__name__)
+
+
+def deck_group_name(deck_id):
+    return f'deck-{deck_id}'
+
+
+def push_available():
+    """Whether the generation worker's pushes reach deck pages.
+
+    That needs websockets, so ASGI mode, and a channel layer shared between
+    processes. The in-memory layer only reaches consumers in the worker
+    process itself, so pages would wait for messages that never come.
+    """
+    backend = getattr(settings, 'CHANNEL_LAYERS', {}).get('default', {}).get('BACKEND', '')
+    return getattr(settings, 'SERVER_MODE', 'wsgi') == 'asgi' and not backend.endswith('InMemoryChannelLayer')
+
+
+def job_payload(job):
+    """The fields of GenerationJobSerializer the page needs, without importing serializers into models"""
+    return {
+        'id': str(job.id),
+        'deck': str(job.deck_id),
+        'status': job.status,
+        'attempts': job.attempts,
+        'error': job.error,
+        'created_count': job.created_count,
+    }
+
+
+def _send(deck_id, message):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(deck_group_name(deck_id), message)
+    except Exception as e:
+        logger.warning(f'Could not push {message["type"]} to deck {deck_id}: {str(e)}')
+
+
+def publish_job(job):
+    """Send the job's state to its deck's page once the current transaction commits"""
+    payload = job_payload(job)
+    transaction.on_commit(lambda: _send(job.deck_id, {'type': 'generation.job', 'job': payload}))
+
+
+def publish_flashcards(deck_id, flashcards):
+    """Send each card's rendered preview to the deck's page once the current transaction commits"""
+    flashcards = list(flashcards)
+    if not flashcards:
+        return
+
+    def send():
+        cards = [
+            {'id': str(card.id), 'html': html}
+            for card, html in zip(flashcards, render_previews(flashcards))
+        ]
+        _send(deck_id, {'type': 'flashcards.created', 'cards': cards})
+    transaction.on_commit(send)
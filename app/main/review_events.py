@@ -0,0 +1,185 @@
+import os
+import atexit
+import logging
+import threading
+from datetime import timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewEventWriter:
+    """Buffers review events in memory and writes them in batches from a background thread.
+
+    Recording an event is a list append, so the review request never waits on
+    the event log. The buffer is flushed every REVIEW_EVENT_FLUSH_INTERVAL
+    seconds, as soon as it holds REVIEW_EVENT_BATCH_SIZE events, and at exit.
+    Events still buffered when a worker is killed are lost, which is acceptable
+    for analytics. With REVIEW_EVENT_ASYNC off, each event is written immediately.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, event):
+        self.record_many([event])
+
+    def record_many(self, events):
+        if not getattr(settings, 'REVIEW_EVENT_ASYNC', True):
+            self._write(list(events))
+            return
+
+        max_buffer = getattr(settings, 'REVIEW_EVENT_MAX_BUFFER', 10000)
+        with self._lock:
+            self._buffer.extend(events)
+            overflow = len(self._buffer) - max_buffer
+            if overflow > 0:
+                # The database is not keeping up, shed the oldest events rather than grow without bound
+                del self._buffer[:overflow]
+                self.dropped += overflow
+            pending = len(self._buffer)
+
+        self._ensure_thread()
+        if pending >= getattr(settings, 'REVIEW_EVENT_BATCH_SIZE', 200):
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Write everything buffered so far, returns the number of events written"""
+        with self._lock:
+            events, self._buffer = self._buffer, []
+        return self._write(events)
+
+    def _write(self, events):
+        from .models import ReviewEvent
+        if not events:
+            return 0
+        try:
+            ReviewEvent.objects.bulk_create(events, batch_size=getattr(settings, 'REVIEW_EVENT_BATCH_SIZE', 200))
+        except Exception as e:
+            with self._lock:
+                self.dropped += len(events)
+            logger.error(f"Failed to write {len(events)} review events: {str(e)}")
+            return 0
+        with self._lock:
+            self.written += len(events)
+        return len(events)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='review-event-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        interval = getattr(settings, 'REVIEW_EVENT_FLUSH_INTERVAL', 5)
+        try:
+            while not self._stopping.is_set():
+                self._wakeup.wait(interval)
+                self._wakeup.clear()
+                close_old_connections()
+                self.flush()
+        finally:
+            self.flush()
+            connection.close()
+
+    def stop(self):
+        """Stop the background thread after a final flush"""
+        thread = self._thread
+        if thread is None:
+            self.flush()
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        thread.join()
+        self._thread = None
+
+    def _reset_after_fork(self):
+        # Threads don't survive a fork, and the parent still owns its buffer
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+
+review_event_writer = ReviewEventWriter()
+atexit.register(review_event_writer.stop)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=review_event_writer._reset_after_fork)
+
+
+def month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(moment):
+    return month_start(moment.replace(day=28) + timezone.timedelta(days=4))
+
+
+DEFAULT_PARTITION = 'main_reviewevent_default'
+
+
+def _create_partition(cursor, name, start, end):
+    """Create one monthly partition, moving in any of its events that landed in the default partition.
+
+    Postgres refuses to create a partition whose range matches rows in the
+    default partition, so in that case the default is detached while the
+    partition is created and its rows moved, then attached again.
+    """
+    bounds = [start.isoformat(), end.isoformat()]
+    create = f'CREATE TABLE "{name}" PARTITION OF "main_reviewevent" FOR VALUES FROM (%s) TO (%s)'
+    in_range = 'WHERE "reviewed_at" >= %s AND "reviewed_at" < %s'
+    cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" {in_range})', bounds)
+    if not cursor.fetchone()[0]:
+        cursor.execute(create, bounds)
+        return
+    cursor.execute(f'ALTER TABLE "main_reviewevent" DETACH PARTITION "{DEFAULT_PARTITION}"')
+    cursor.execute(create, bounds)
+    cursor.execute(f'INSERT INTO "main_reviewevent" SELECT * FROM "{DEFAULT_PARTITION}" {in_range}', bounds)
+    cursor.execute(f'DELETE FROM "{DEFAULT_PARTITION}" {in_range}', bounds)
+    cursor.execute(f'ALTER TABLE "main_reviewevent" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+    logger.warning(f'Moved stranded review events from {DEFAULT_PARTITION} into {name}')
+
+
+def ensure_review_event_partitions(months_ahead=3, now=None):
+    """Create monthly Postgres partitions for the review event log up to months_ahead.
+
+    Returns the names of the partitions created. Events outside every monthly
+    partition land in the default partition, so a missed run never loses data,
+    and the next run moves them into their month. A partition that can't be
+    created is logged and skipped rather than failing the caller.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+
+    created = []
+    start = month_start(now or timezone.now().astimezone(dt_timezone.utc))
+    with connection.cursor() as cursor:
+        for _ in range(months_ahead + 1):
+            end = next_month(start)
+            name = f'main_reviewevent_p{start:%Y%m}'
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            if cursor.fetchone()[0] is None:
+                try:
+                    with transaction.atomic():
+                        _create_partition(cursor, name, start, end)
+                except Exception as e:
+                    logger.error(f'Could not create review event partition {name}: {str(e)}')
+                else:
+                    created.append(name)
+                    logger.info(f'Created review event partition {name}')
+            start = end
+    return created
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/decks/<uuid:deck_id>/', consumers.DeckConsumer.as_asgi(), name='deck-progress'),
+]
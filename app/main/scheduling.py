@@ -0,0 +1,139 @@
+"""
+SM-2 spaced repetition scheduling.
+
+`review` schedules one side of one card. `review_many` and `replay` apply the
+same rules to NumPy arrays of (easiness factor, repetitions, interval) so bulk
+operations like rescheduling a deck under new parameters don't loop in Python.
+"""
+from typing import NamedTuple, Sequence
+import numpy as np
+
+
+class SM2Params(NamedTuple):
+    min_easiness_factor: float = 1.3
+    max_easiness_factor: float = 2.5
+    initial_easiness_factor: float = 2.5
+    forgot_penalty: float = 0.3
+    hard_penalty: float = 0.15
+    easy_bonus: float = 0.15
+    first_interval: int = 1  # in minutes, also used after forgetting
+    second_interval: int = 6
+
+
+class SideState(NamedTuple):
+    easiness_factor: float
+    repetitions: int
+    interval: int
+
+
+DEFAULT_PARAMS = SM2Params()
+
+# Integer grades for the array functions, NO_REVIEW leaves a card unchanged
+NO_REVIEW, FORGOT, HARD, EASY = -1, 0, 1, 2
+GRADES = {'forgot': FORGOT, 'hard': HARD, 'easy': EASY}
+
+
+def initial_state(params: SM2Params = DEFAULT_PARAMS) -> SideState:
+    return SideState(params.initial_easiness_factor, 0, params.first_interval)
+
+
+def review(state: SideState, status: str, params: SM2Params = DEFAULT_PARAMS) -> SideState:
+    """
+    Returns the new schedule for one side after a review.
+
+    Parameters:
+        state (SideState): The side's current easiness factor, repetitions and interval
+        status (str): 'forgot', 'hard' or 'easy', e.g. a ReviewStatus
+        params (SM2Params, optional): The algorithm parameters
+
+    Returns:
+        SideState: The updated schedule
+    """
+    ef, reps, interval = state
+    if status == 'forgot':
+        return SideState(max(params.min_easiness_factor, ef - params.forgot_penalty), 0, params.first_interval)
+
+    reps += 1
+    if status == 'hard':
+        ef = max(params.min_easiness_factor, ef - params.hard_penalty)
+    elif status == 'easy':
+        ef = min(params.max_easiness_factor, ef + params.easy_bonus)
+
+    if reps == 1:
+        interval = params.first_interval
+    elif reps == 2:
+        interval = params.second_interval
+    else:
+        interval = round(interval * ef)
+    return SideState(ef, reps, interval)
+
+
+def review_many(ef, reps, interval, grades, params: SM2Params = DEFAULT_PARAMS):
+    """
+    Vectorized `review` over arrays of card sides.
+
+    Parameters:
+        ef, reps, interval (array-like): Current state of each side
+        grades (array-like): One of FORGOT, HARD, EASY or NO_REVIEW per side
+        params (SM2Params, optional): The algorithm parameters
+
+    Returns:
+        Tuple of (ef, reps, interval) arrays
+    """
+    ef = np.asarray(ef, dtype=float)
+    reps = np.asarray(reps, dtype=np.int64)
+    interval = np.asarray(interval, dtype=np.int64)
+    grades = np.asarray(grades, dtype=np.int64)
+
+    forgot = grades == FORGOT
+    new_ef = np.select(
+        [forgot, grades == HARD, grades == EASY],
+        [
+            np.maximum(params.min_easiness_factor, ef - params.forgot_penalty),
+            np.maximum(params.min_easiness_factor, ef - params.hard_penalty),
+            np.minimum(params.max_easiness_factor, ef + params.easy_bonus),
+        ],
+        ef,
+    )
+    new_reps = np.where(forgot, 0, reps + 1)
+    new_interval = np.select(
+        [forgot, new_reps == 1, new_reps == 2],
+        [params.first_interval, params.first_interval, params.second_interval],
+        np.round(interval * new_ef),
+    ).astype(np.int64)
+
+    reviewed = grades != NO_REVIEW
+    return (
+        np.where(reviewed, new_ef, ef),
+        np.where(reviewed, new_reps, reps),
+        np.where(reviewed, new_interval, interval),
+    )
+
+
+def replay(histories: Sequence[Sequence[str]], params: SM2Params = DEFAULT_PARAMS):
+    """
+    Rebuild each side's schedule from scratch by replaying its reviews in order.
+
+    Sides are processed together, one review step at a time, so the cost is
+    proportional to the longest history rather than the number of sides.
+
+    Parameters:
+        histories (Sequence[Sequence[str]]): Review statuses per side, oldest first
+        params (SM2Params, optional): The algorithm parameters to replay under
+
+    Returns:
+        Tuple of (ef, reps, interval) arrays, one entry per side
+    """
+    count = len(histories)
+    steps = max((len(history) for history in histories), default=0)
+    grades = np.full((count, steps), NO_REVIEW, dtype=np.int64)
+    for row, history in enumerate(histories):
+        grades[row, :len(history)] = [GRADES[str(status)] for status in history]
+
+    ef, reps, interval = initial_state(params)
+    ef = np.full(count, ef, dtype=float)
+    reps = np.full(count, reps, dtype=np.int64)
+    interval = np.full(count, interval, dtype=np.int64)
+    for step in range(steps):
+        ef, reps, interval = review_many(ef, reps, interval, grades[:, step], params)
+    return ef, reps, interval
@@ -0,0 +1,76 @@
+"""
+Flashcard search.
+
+On Postgres each card has a stored `search_vector` kept up to date by a
+trigger (see migration 0019) and a GIN index, so matching is an index
+lookup rather than a scan. Words are matched as prefixes so results show up
+while the user is still typing. When the pg_trgm extension is installed,
+trigram word similarity on front and back also catches typos.
+
+Other databases, e.g. SQLite in tests, fall back to icontains.
+"""
+import re
+import logging
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'
+
+# Fields in the search vector, with the weights the trigger gives them
+SEARCH_FIELDS = {'front': 'A', 'back': 'B', 'front_notes': 'C', 'back_notes': 'C'}
+
+POSTGRES, POSTGRES_TRIGRAM, BASIC = 'postgres', 'postgres_trigram', 'basic'
+
+_backends = {}
+
+
+def search_backend(alias='default'):
+    """Which kind of search the database supports, looked up once per process"""
+    if alias not in _backends:
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            _backends[alias] = BASIC
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _backends[alias] = POSTGRES_TRIGRAM if cursor.fetchone() else POSTGRES
+            logger.info(f'Flashcard search on {alias} uses {_backends[alias]}')
+    return _backends[alias]
+
+
+def search_terms(text):
+    """The words in a search, which is all that reaches the tsquery"""
+    return re.findall(r'[^\W_]+', text)
+
+
+def prefix_query(terms):
+    """A tsquery matching cards that have a word starting with each term"""
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_flashcards(queryset, text, alias='default'):
+    """Filter a FlashCard queryset to cards matching `text`, annotated with a `rank`, best first"""
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+
+    backend = search_backend(alias)
+    if backend == BASIC:
+        matches = Q()
+        for term in terms:
+            matches &= Q(*(Q(**{f'{field}__icontains': term}) for field in SEARCH_FIELDS), _connector=Q.OR)
+        rank = Case(When(front__icontains=terms[0], then=Value(1.0)), default=Value(0.5), output_field=FloatField())
+        return queryset.filter(matches).annotate(rank=rank).order_by('-rank', '-created_at', 'id')
+
+    query = prefix_query(terms)
+    matches = Q(search_vector=query)
+    rank = SearchRank(F('search_vector'), query)
+    if backend == POSTGRES_TRIGRAM:
+        phrase = ' '.join(terms)
+        matches |= Q(front__trigram_word_similar=phrase) | Q(back__trigram_word_similar=phrase)
+        rank = rank + Greatest(TrigramWordSimilarity(phrase, 'front'), TrigramWordSimilarity(phrase, 'back'))
+    return queryset.filter(matches).annotate(rank=rank).order_by('-rank', '-created_at', 'id')
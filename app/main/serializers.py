@@ -1,9 +1,21 @@
 from rest_framework import serializers
-from .models import FlashCard
+from .models import FlashCard, GenerationJob, ReviewStatus
+
+class FlashCardListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        """Create all cards and their deck links in one batch rather than per card"""
+        flashcards = []
+        decks = []
+        for attrs in validated_data:
+            attrs = dict(attrs)
+            decks.append(attrs.pop('decks', []))
+            flashcards.append(FlashCard(**attrs))
+        return FlashCard.objects.bulk_create_with_decks(flashcards, decks)
 
 class FlashCardSerializer(serializers.ModelSerializer):
     class Meta:
         model = FlashCard
+        list_serializer_class = FlashCardListSerializer
         fields = [
             'id', 'front', 'back', 'front_notes', 'back_notes', 'tags', 'decks', 'created_at', 'updated_at',
             'front_last_review', 'front_interval', 'front_review_count', 'front_easiness_factor', 'front_repetitions',
@@ -13,3 +25,22 @@ class FlashCardSerializer(serializers.ModelSerializer):
             'id', 'created_at', 'updated_at', 'front_review_count', 'back_review_count', 
             'front_easiness_factor', 'back_easiness_factor'
         ]
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GenerationJob
+        fields = [
+            'id', 'deck', 'status', 'attempts', 'max_attempts', 'error', 'created_count',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class ReviewBatchItemSerializer(serializers.Serializer):
+    card_id = serializers.UUIDField()
+    side = serializers.ChoiceField(choices=['front', 'back'])
+    status = serializers.ChoiceField(choices=ReviewStatus.choices)
+    notes = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    reviewed_at = serializers.DateTimeField(required=False)
+    latency_ms = serializers.IntegerField(required=False, allow_null=True, min_value=0)
@@ -1,11 +1,15 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.utils import timezone
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.contrib.auth.signals import user_logged_in
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
-from .models import Deck
+from .models import Deck, FlashCard, FlashCardTombstone, Tutor, TutorPromptOverride
+from .tutor_config import invalidate_user_config
+from .tutor_registry import tutor_registry
+from .preview_cache import invalidate_previews
 
 @receiver(post_save, sender=User)
 def create_user_deck(sender, instance, created, **kwargs):
@@ -21,4 +25,46 @@ def create_user_deck(sender, instance, created, **kwargs):
         
 @receiver(user_logged_in, sender=User)
 def something_useful_on_login(sender, request, user, **kwargs):
-    pass
\ No newline at end of file
+    pass
+
+@receiver([post_save, post_delete], sender=TutorPromptOverride)
+def invalidate_tutor_config(sender, instance, **kwargs):
+    invalidate_user_config(instance.tutor_url_path, instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Tutor)
+def invalidate_tutor_registry(sender, instance, **kwargs):
+    tutor_registry.invalidate()
+
+
+@receiver([post_save, post_delete], sender=FlashCard)
+def invalidate_flashcard_preview(sender, instance, **kwargs):
+    # Bulk writes skip this but bump updated_at, which also retires the cached preview
+    invalidate_previews([instance.pk])
+
+
+@receiver(pre_delete, sender=FlashCard)
+def tombstone_deleted_flashcard(sender, instance, **kwargs):
+    FlashCardTombstone.record((deck_id, instance.pk) for deck_id in instance.decks.values_list('id', flat=True))
+
+@receiver(m2m_changed, sender=FlashCard.decks.through)
+def track_flashcard_deck_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep delta sync accurate when cards move between decks.
+
+    Removed cards get a tombstone in the deck they left. Added cards get a new
+    updated_at so they show up as changes in the deck they joined.
+    """
+    if action == 'pre_clear':
+        # pk_set is empty for clear, so note what is about to go
+        related = instance.flashcards if reverse else instance.decks
+        instance._cleared_pks = set(related.values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        action, pk_set = 'post_remove', getattr(instance, '_cleared_pks', set())
+
+    if action == 'post_remove' and pk_set:
+        pairs = [(instance.pk, card_id) for card_id in pk_set] if reverse else [(deck_id, instance.pk) for deck_id in pk_set]
+        FlashCardTombstone.record(pairs)
+    elif action == 'post_add' and pk_set:
+        card_ids = pk_set if reverse else [instance.pk]
+        FlashCard.objects.filter(pk__in=card_ids).update(updated_at=timezone.now())
@@ -0,0 +1,121 @@
+import json
+import base64
+from uuid import UUID
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+ZERO_UUID = UUID(int=0)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def encode_cursor(data):
+    """Pack a dict of positions into an opaque URL-safe string"""
+    return base64.urlsafe_b64encode(json.dumps(data, default=str).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+def _position(values, id_type):
+    """Decode a (timestamp, id) position from a cursor"""
+    try:
+        moment, pk = values
+        moment = parse_datetime(moment)
+        if moment is None:
+            raise ValueError(values)
+        return moment, id_type(pk)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor position: {values}') from e
+
+
+def _after(queryset, field, position):
+    """Rows strictly after a (timestamp, id) position, in keyset order"""
+    moment, pk = position
+    return queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'pk__gt': pk}))
+
+
+def sync_cursor_at(moment):
+    """A cursor from which sync returns everything changed at or after moment"""
+    return encode_cursor({'cards': [moment.isoformat(), str(ZERO_UUID)], 'deleted': [moment.isoformat(), 0]})
+
+
+def snapshot_cursor():
+    """A cursor for a page rendered from the database now.
+
+    It starts FLASHCARD_SYNC_LAG seconds back, so a change that was still
+    uncommitted when the page was read is sent again rather than missed.
+    """
+    return sync_cursor_at(timezone.now() - timezone.timedelta(seconds=getattr(settings, 'FLASHCARD_SYNC_LAG', 2)))
+
+
+def deck_changes(cards, tombstones, cursor=None, limit=None):
+    """Return what changed in a deck since a cursor.
+
+    `cards` is the deck's card queryset and `tombstones` its tombstones. Without
+    a cursor every card is returned. Results are paged by (updated_at, id) and
+    (deleted_at, id) keysets, and the returned cursor resumes after the last
+    row. Only changes older than FLASHCARD_SYNC_LAG seconds are returned so a
+    transaction that commits late can't slip behind a cursor already handed out.
+
+    Clients should apply `deleted` before `cards`, since a card removed and then
+    re-added shows up in both.
+
+    Returns a dict of cards, deleted card ids, the next cursor and has_more.
+    """
+    now = timezone.now()
+    until = now - timezone.timedelta(seconds=getattr(settings, 'FLASHCARD_SYNC_LAG', 2))
+    limit = limit or getattr(settings, 'FLASHCARD_SYNC_PAGE_SIZE', 500)
+
+    if cursor:
+        positions = decode_cursor(cursor)
+        if not isinstance(positions, dict):
+            raise InvalidCursor(f'Invalid cursor: {cursor}')
+        card_position = _position(positions.get('cards'), UUID)
+        deleted_position = _position(positions.get('deleted'), int)
+        ttl = timezone.timedelta(days=getattr(settings, 'FLASHCARD_TOMBSTONE_TTL', 30))
+        if deleted_position[0] < now - ttl:
+            raise CursorExpired('Cursor is older than the tombstone history, sync from scratch')
+        cards = _after(cards, 'updated_at', card_position)
+        tombstones = _after(tombstones, 'deleted_at', deleted_position)
+        deleted_rows = list(tombstones.filter(deleted_at__lt=until).order_by('deleted_at', 'id')[:limit + 1])
+    else:
+        # A full snapshot has nothing to delete, later syncs pick up from here
+        deleted_position = (until, 0)
+        deleted_rows = []
+
+    changed = list(cards.filter(updated_at__lt=until).order_by('updated_at', 'id')[:limit + 1])
+    has_more = len(changed) > limit or len(deleted_rows) > limit
+    changed, deleted_rows = changed[:limit], deleted_rows[:limit]
+
+    # Jump straight to `until` once a stream is exhausted so the next sync doesn't rescan
+    if len(changed) == limit:
+        card_position = (changed[-1].updated_at, changed[-1].pk)
+    else:
+        card_position = (until, ZERO_UUID)
+    if len(deleted_rows) == limit:
+        deleted_position = (deleted_rows[-1].deleted_at, deleted_rows[-1].pk)
+    elif cursor:
+        deleted_position = (until, 0)
+
+    return {
+        'cards': changed,
+        'deleted': list(dict.fromkeys(row.card_id for row in deleted_rows)),
+        'cursor': encode_cursor({
+            'cards': [card_position[0].isoformat(), str(card_position[1])],
+            'deleted': [deleted_position[0].isoformat(), deleted_position[1]],
+        }),
+        'has_more': has_more,
+    }
@@ -1,4 +1,6 @@
 from django import template
+from django.utils.safestring import mark_safe
+from main.preview_cache import render_previews
 
 register = template.Library()
 
@@ -9,3 +11,11 @@ def get_item(dictionary, key):
     Usage: {{ dictionary|get_item:key }}
     """
     return dictionary.get(key, '')
+
+@register.simple_tag
+def flashcard_previews(flashcards):
+    """
+    Render the sidebar preview of each flashcard through the fragment cache.
+    Usage: {% flashcard_previews flashcards %}
+    """
+    return mark_safe(''.join(render_previews(flashcards)))
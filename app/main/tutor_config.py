@@ -0,0 +1,135 @@
+import os
+import logging
+import threading
+import yaml
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+
+class FrozenDict(dict):
+    """A dict that refuses in-place mutation so the cached base config can be shared safely.
+
+    It is still a dict, so it serialises to JSON and pickles like one.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Tutor config is read-only, build a new dict instead")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value):
+    """Recursively convert parsed YAML into FrozenDicts and tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def apply_overrides(config, overrides):
+    """Return a new config with dotted-path overrides applied.
+
+    Only the dicts along each overridden path are copied, the rest of the
+    tree is shared with `config`, which is never modified.
+    """
+    for key, value in overrides.items():
+        *path_parts, final_key = key.split('.')
+        config = _set_path(config, path_parts, final_key, value)
+    return config
+
+
+def _set_path(node, path_parts, final_key, value):
+    if not isinstance(node, dict):
+        node = {}
+    if not path_parts:
+        return FrozenDict({**node, final_key: value})
+    part, *rest = path_parts
+    return FrozenDict({**node, part: _set_path(node.get(part), rest, final_key, value)})
+
+
+class TutorConfigStore:
+    """Process-wide cache of parsed tutor YAML files, keyed by path and mtime"""
+
+    def __init__(self):
+        self._configs = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, path):
+        """The file's mtime, which changes whenever the YAML is edited"""
+        return os.stat(path).st_mtime_ns
+
+    def get(self, path):
+        mtime = self.version(path)
+        cached = self._configs.get(path)
+        if cached and cached[0] == mtime:
+            self.hits += 1
+            return cached[1]
+
+        with self._lock:
+            cached = self._configs.get(path)
+            if cached and cached[0] == mtime:
+                self.hits += 1
+                return cached[1]
+            with open(path, 'r') as f:
+                config = freeze(yaml.safe_load(f))
+            self._configs[path] = (mtime, config)
+            self.misses += 1
+            logger.info(f'Parsed tutor config {path} (hits={self.hits}, misses={self.misses})')
+            return config
+
+    def clear(self):
+        with self._lock:
+            self._configs.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._configs)}
+
+
+config_store = TutorConfigStore()
+
+
+def user_config_cache_key(url_path, user_id):
+    return f'tutor-config:{url_path}:{user_id}'
+
+
+def user_config_cache_is_shared():
+    """True when every worker reads the same cache, so a signal's invalidation is seen by all of them"""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def get_cached_user_config(url_path, user_id, version):
+    """Return the cached merged config for a user, or None if missing or built from an older version"""
+    cached = cache.get(user_config_cache_key(url_path, user_id))
+    if cached and cached[0] == version:
+        return cached[1]
+    return None
+
+
+def set_cached_user_config(url_path, user_id, version, config):
+    cache.set(
+        user_config_cache_key(url_path, user_id),
+        (version, config),
+        getattr(settings, 'TUTOR_CONFIG_CACHE_TIMEOUT', None),
+    )
+
+
+def invalidate_user_config(url_path, user_id):
+    cache.delete(user_config_cache_key(url_path, user_id))
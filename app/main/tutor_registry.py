@@ -0,0 +1,91 @@
+import time
+import logging
+import threading
+from django.conf import settings
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+
+class TutorRegistry:
+    """Per-process map of url_path to Tutor, loaded once and reloaded when the tutors change.
+
+    Each worker keeps its own copy. The tutors' version (their count and
+    latest updated_at) is read from the database at most every
+    TUTOR_REGISTRY_CHECK_INTERVAL seconds, so a change made by any worker or
+    by sync_tutors reaches every worker within that interval, and straight
+    away in the process that made it. The Tutor instances are shared between
+    requests, so treat them as read-only.
+    """
+
+    def __init__(self):
+        self._tutors = {}
+        self._version = None
+        self._db_version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    @staticmethod
+    def _make_version(count, updated):
+        return f"{count}:{updated.isoformat() if updated else ''}"
+
+    def _current_version(self):
+        interval = getattr(settings, 'TUTOR_REGISTRY_CHECK_INTERVAL', 5)
+        now = time.monotonic()
+        version = self._db_version
+        if version is None or now - self._checked_at >= interval:
+            from .models import Tutor
+            state = Tutor.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+            version = self._make_version(state['count'], state['updated'])
+            self._db_version, self._checked_at = version, now
+        return version
+
+    def _load(self):
+        if self._db_version is None:
+            # Nothing loaded yet, so the tutors themselves give the version without another query
+            version = None
+        else:
+            version = self._current_version()
+            if version == self._version:
+                return self._tutors
+        with self._lock:
+            if version is None or version != self._version:
+                from .models import Tutor
+                tutors = list(Tutor.objects.all())
+                loaded = self._make_version(len(tutors), max((tutor.updated_at for tutor in tutors), default=None))
+                self._tutors = {tutor.url_path: tutor for tutor in tutors}
+                self._version = self._db_version = loaded
+                self._checked_at = time.monotonic()
+                self.loads += 1
+                logger.info(f'Loaded {len(self._tutors)} tutors into the registry (loads={self.loads})')
+            return self._tutors
+
+    def get(self, url_path):
+        """The tutor at url_path, or None"""
+        return self._load().get(url_path)
+
+    def only(self):
+        """The tutor if exactly one is configured, otherwise None"""
+        tutors = self._load()
+        return next(iter(tutors.values())) if len(tutors) == 1 else None
+
+    def all(self):
+        return list(self._load().values())
+
+    def version(self):
+        """The tutors' version in the database, changes whenever any tutor is saved or deleted"""
+        return self._current_version()
+
+    def invalidate(self):
+        """Reload on the next lookup in this process, others notice on their next version check"""
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._tutors = {}
+            self._version = None
+            self._db_version = None
+
+
+tutor_registry = TutorRegistry()
@@ -16,12 +16,12 @@ api_router = DefaultRouter()
 api_router.register(r'decks/(?P<deck_pk>[^/.]+)/flashcards', flashcard_views.FlashCardViewSet, basename='api-flashcard')
 api_router.register(r'tutors/(?P<url_path>[^/.]+)/decks', deck_views.DeckViewSet, basename='api-deck')
 api_router.register(r'documents', document_views.DocumentViewSet, basename='api-document')
-api_router.register(r'text-ai-response', view_text_ai_response.TextAIResponseViewSet, basename='text-ai-response')
-# Voice chat endpoints handled separately below
+# Async endpoints waiting on OpenAI are plain Django views, see below
 
 api_patterns = [
     path('api/', include(api_router.urls)),
-    path('api/tutors/<str:tutor_path>/voice-chat/session/', voice_chat_views.VoiceChatViewSet.as_view({'get': 'session'}), name='api-voice-chat-session'),
+    path('api/text-ai-response/', view_text_ai_response.text_ai_response, name='text-ai-response-list'),
+    path('api/tutors/<str:tutor_path>/voice-chat/session/', voice_chat_views.voice_chat_session, name='api-voice-chat-session'),
 ]
 
 # View Routes
@@ -1,18 +1,76 @@
-from rest_framework.viewsets import ViewSet
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.response import Response
-from django.contrib.auth.decorators import login_required
-from .ai_helpers import call_openai
+import json
+import logging
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
+from .ai_helpers import call_openai, acall_openai, stream_openai, astream_openai
+from .async_helpers import api_login_required, request_data, is_asgi
 from http import HTTPStatus
 
+logger = logging.getLogger(__name__)
 
-class TextAIResponseViewSet(ViewSet):
-    permission_classes = [IsAuthenticated]
-    def create(self, request):
-      
-      developer_prompt = request.data.get('developer_prompt')
-      user_prompt = request.data.get('user_prompt')
-      
-      if not developer_prompt or not user_prompt:
-          return Response({'error': 'Both developer_prompt and user_prompt are required'}, status=HTTPStatus.UNPROCESSABLE_CONTENT)
-      return Response({'response': call_openai(developer_prompt, user_prompt)}, status=HTTPStatus.CREATED)
+
+def sse_event(data, event=None):
+    """Format a payload as a Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def stream_events(developer_prompt, user_prompt):
+    """Relay completion deltas as SSE, ending with a done or error event.
+
+    The WSGI/ASGI server pulls one event at a time, so a slow client is never
+    buffered ahead of. When the client goes away the server closes this
+    generator, which closes the upstream OpenAI stream with it.
+    """
+    try:
+        for delta in stream_openai(developer_prompt, user_prompt):
+            yield sse_event({'delta': delta})
+    except Exception as e:
+        logger.error(f"Streaming text AI response failed: {str(e)}")
+        yield sse_event({'error': 'Failed to generate a response'}, event='error')
+        return
+    yield sse_event({}, event='done')
+
+
+async def astream_events(developer_prompt, user_prompt):
+    """stream_events for ASGI, each delta is awaited on the event loop"""
+    try:
+        async for delta in astream_openai(developer_prompt, user_prompt):
+            yield sse_event({'delta': delta})
+    except Exception as e:
+        logger.error(f"Streaming text AI response failed: {str(e)}")
+        yield sse_event({'error': 'Failed to generate a response'}, event='error')
+        return
+    yield sse_event({}, event='done')
+
+
+@require_POST
+@api_login_required
+async def text_ai_response(request):
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid JSON'}, status=HTTPStatus.BAD_REQUEST)
+
+    developer_prompt = data.get('developer_prompt')
+    user_prompt = data.get('user_prompt')
+
+    if not developer_prompt or not user_prompt:
+        return JsonResponse({'error': 'Both developer_prompt and user_prompt are required'}, status=HTTPStatus.UNPROCESSABLE_ENTITY)
+
+    # Stream tokens as Server-Sent Events so the first words show up straight away
+    if str(data.get('stream', '')).lower() in ('1', 'true'):
+        # A WSGI server can only send a sync iterator without buffering the whole response
+        events = astream_events(developer_prompt, user_prompt) if is_asgi(request) else stream_events(developer_prompt, user_prompt)
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    # Callers opt in to reusing an identical earlier response, or force a fresh one with refresh
+    cache = str(data.get('cache', '')).lower() in ('1', 'true')
+    refresh = str(data.get('refresh', '')).lower() in ('1', 'true')
+    # Under WSGI each request gets a new event loop, so the async client couldn't reuse connections
+    complete = acall_openai if is_asgi(request) else sync_to_async(call_openai)
+    response = await complete(developer_prompt, user_prompt, cache=cache, refresh=refresh)
+    return JsonResponse({'response': response}, status=HTTPStatus.CREATED)
@@ -1,9 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from main.models import Deck, FlashCard, Tutor, Document
+from main.models import Deck, FlashCard, FlashCardTombstone, Tutor, Document, GenerationJob
+from main.serializers import GenerationJobSerializer
+from main.sync import snapshot_cursor
+from main.pagination import keyset_page
+from main import progress
+from main.conditional import conditional, make_version, flashcards_state, page_state
 from main.forms import DeckForm, DocumentForm
 from django.contrib import messages
 from django.db import transaction
+from django.conf import settings
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -48,13 +54,12 @@ class DeckViewSet(viewsets.ModelViewSet):
                                     deck=deck
                                 )
 
-                    # Generate interview questions
-                    try:
-                        created_cards = deck.generate_and_save_flashcards()
-                        messages.success(request, f"Deck created successfully with {len(created_cards)} interview questions!")
-                    except Exception as e:
-                        logger.error(f"Error generating questions: {str(e)}")
-                        messages.warning(request, "Deck created, but there was an error generating interview questions.")
+                    # Queue interview question generation, the worker picks it up once this commits
+                    if deck.has_generation_content():
+                        GenerationJob.enqueue(deck)
+                        messages.success(request, "Deck created successfully! Interview questions are being generated.")
+                    else:
+                        messages.success(request, "Deck created successfully!")
 
                 return redirect('main:deck_detail', url_path=request.tutor.url_path, pk=deck.pk)
             except Exception as e:
@@ -117,10 +122,10 @@ class DeckViewSet(viewsets.ModelViewSet):
                     # Delete documents that were not in the form
                     Document.objects.filter(deck=deck).exclude(id__in=processed_docs).delete()
 
-                    # Generate and save flashcards
-                    created_cards = deck.generate_and_save_flashcards()
-                    if created_cards:
-                        messages.success(request, f"Deck updated with {len(created_cards)} new flashcards!")
+                    # Queue flashcard generation, the worker picks it up once this commits
+                    if deck.has_generation_content():
+                        GenerationJob.enqueue(deck)
+                        messages.success(request, "Deck updated! New flashcards are being generated.")
                     else:
                         messages.warning(request, "Deck updated, but no content was provided for flashcard generation.")
 
@@ -140,22 +145,23 @@ class DeckViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def generate_questions(self, request, pk=None, url_path=None):
-        """Generate interview questions for a deck."""
+        """Queue interview question generation for a deck."""
         deck = self.get_object()
-        message = None
-
-        try:
-            cards = deck.generate_and_save_flashcards()
-            message = f'Generated {len(cards)} new questions!'
-        except Exception as e:
-            logger.error(f'Error generating questions: {str(e)}')
-            message = 'Failed to generate questions'
+        job = GenerationJob.enqueue(deck)
+        message = 'Generating new questions...'
 
         if 'text/html' in request.headers.get('Accept', ''):
-            messages.success(request, message) if 'Generated' in message else messages.error(request, message)
+            messages.info(request, message)
             return redirect('main:deck_detail', url_path=url_path, pk=deck.pk)
 
-        return Response({'message': message}, status=status.HTTP_200_OK if 'Generated' in message else status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'message': message, 'job': GenerationJobSerializer(job).data}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def generation_job(self, request, pk=None, url_path=None):
+        """Poll the status of the deck's most recent generation job."""
+        deck = self.get_object()
+        job = deck.generation_jobs.first()
+        return Response({'job': GenerationJobSerializer(job).data if job else None})
 
 @login_required
 def deck_list(request, url_path):
@@ -164,13 +170,35 @@ def deck_list(request, url_path):
         return redirect('main:deck_create', url_path=url_path)
     return render(request, 'main/deck_list.html', {'decks': decks, 'tutor': request.tutor})
 
+def deck_detail_version(request, url_path, pk):
+    """Validators for the deck page from the deck, its cards and its latest generation job"""
+    page = page_state(request)
+    deck_updated_at = Deck.objects.filter(pk=pk, owner=request.user, tutor=request.tutor).values_list('updated_at', flat=True).first()
+    if page is None or deck_updated_at is None:
+        return None
+    count, cards_modified = flashcards_state(
+        FlashCard.objects.filter(decks__id=pk),
+        FlashCardTombstone.objects.filter(deck_id=pk),
+    )
+    job = GenerationJob.objects.filter(deck_id=pk).values_list('id', 'status', 'updated_at').first()
+    last_modified = max(filter(None, [deck_updated_at, cards_modified, job and job[2]]))
+    return make_version(page, pk, deck_updated_at, count, cards_modified, job, progress.push_available(), last_modified=last_modified)
+
 @login_required
+@conditional(deck_detail_version)
 def deck_detail(request, url_path, pk):
     deck = get_object_or_404(Deck, pk=pk, owner=request.user, tutor=request.tutor)
-    flashcards = deck.flashcards.all()
+    # Taken before the cards are read so sync picks up anything that changes while rendering
+    sync_cursor = snapshot_cursor()
+    # Only the first page is rendered, the sidebar fetches the rest as it scrolls
+    flashcards, next_page_cursor = keyset_page(deck.flashcards.in_preview_order(), getattr(settings, 'FLASHCARD_PAGE_SIZE', 50))
     return render(request, 'main/deck_detail.html', {
         'deck': deck,
         'flashcards': flashcards,
+        'next_page_cursor': next_page_cursor or '',
+        'sync_cursor': sync_cursor,
+        'generation_job': deck.generation_jobs.first(),
+        'progress_socket': progress.push_available(),
         'tutor': request.tutor
     })
 
@@ -202,13 +230,12 @@ def deck_create(request, url_path):
                                     deck=deck
                                 )
 
-                    # Generate interview questions
-                    try:
-                        created_cards = deck.generate_and_save_flashcards()
-                        messages.success(request, f"Deck created successfully with {len(created_cards)} interview questions!")
-                    except Exception as e:
-                        logger.error(f"Error generating questions: {str(e)}")
-                        messages.warning(request, "Deck created, but there was an error generating interview questions.")
+                    # Queue interview question generation, the worker picks it up once this commits
+                    if deck.has_generation_content():
+                        GenerationJob.enqueue(deck)
+                        messages.success(request, "Deck created successfully! Interview questions are being generated.")
+                    else:
+                        messages.success(request, "Deck created successfully!")
 
                 return redirect('main:deck_detail', url_path=request.tutor.url_path, pk=deck.pk)
             except Exception as e:
@@ -258,17 +285,18 @@ def deck_edit(request, url_path, pk):
                                     deck=deck
                                 )
 
-                    # Generate and save flashcards
-                    created_cards = deck.generate_and_save_flashcards()
-                    if created_cards:
-                        messages.success(request, f"Deck updated with {len(created_cards)} new flashcards!")
+                    # Queue flashcard generation, the worker picks it up once this commits
+                    if deck.has_generation_content():
+                        GenerationJob.enqueue(deck)
+                        messages.success(request, "Deck updated! New flashcards are being generated.")
                     else:
                         messages.warning(request, "Deck updated, but no content was provided for flashcard generation.")
                 return redirect('main:deck_detail', url_path=url_path, pk=deck.pk)
 
             except Exception as e:
-                error_msg = f"Error generating questions: {str(e)}"
-                messages.error(request, "Failed to generate interview questions. Please try again.")
+                error_msg = f"Error updating deck: {str(e)}"
+                logger.error(error_msg)
+                messages.error(request, "There was an error updating your deck. Please try again.")
                 return render(request, 'main/deck_form.html', {
                     'form': form,  # Contains the user's POST data
                     'deck': deck,
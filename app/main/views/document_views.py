@@ -12,6 +12,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from ..models import Document, Deck
 from ..forms import DocumentForm
+from ..conditional import conditional, make_version, page_state
+from django.db.models import Count, Max
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +55,18 @@ class DocumentViewSet(viewsets.ModelViewSet):
         
         return Response({'status': 'success', 'url': document.url})
 
+def document_list_version(request):
+    """Validators for the document list from the user's documents and decks, whatever the filters"""
+    page = page_state(request)
+    if page is None:
+        return None
+    documents = Document.objects.filter(owner=request.user).aggregate(count=Count('id'), updated=Max('updated_at'))
+    decks = Deck.objects.filter(owner=request.user).aggregate(count=Count('id'), updated=Max('updated_at'))
+    last_modified = max(filter(None, [documents['updated'], decks['updated']]), default=None)
+    return make_version(page, documents, decks, last_modified=last_modified)
+
 @login_required
+@conditional(document_list_version)
 def document_list(request):
     documents = Document.objects.filter(owner=request.user)
     
@@ -121,7 +134,15 @@ def document_create(request, deck_id=None):
         'deck': deck
     })
 
+def document_detail_version(request, pk):
+    page = page_state(request)
+    updated_at = Document.objects.filter(id=pk, owner=request.user).values_list('updated_at', flat=True).first()
+    if page is None or updated_at is None:
+        return None
+    return make_version(page, pk, updated_at, last_modified=updated_at)
+
 @login_required
+@conditional(document_detail_version)
 def document_detail(request, pk):
     document = get_object_or_404(Document, id=pk, owner=request.user)
     return render(request, 'main/document_detail.html', {
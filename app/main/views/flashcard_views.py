@@ -6,9 +6,29 @@ from django.urls import reverse
 from django.db.models import Q, F
 from django.utils import timezone
 from django.db import models
-from random import choice
-from main.models import FlashCard, ReviewStatus
-from main.serializers import FlashCardSerializer
+from main.models import FlashCard, FlashCardTombstone, ReviewStatus
+from main.sync import deck_changes, snapshot_cursor, InvalidCursor, CursorExpired
+from main.pagination import keyset_page
+from django.conf import settings
+from main.serializers import FlashCardSerializer, ReviewBatchItemSerializer
+from main.review_events import review_event_writer
+from main.preview_cache import render_preview, render_previews
+from main.conditional import conditional, make_version, flashcards_state
+from django.utils.decorators import method_decorator
+
+MAX_PAGE_SIZE = 200
+
+def flashcard_list_version(request, deck_pk=None):
+    """Validators for a deck's card list, changes whenever a card is written, deleted or falls due"""
+    count, last_modified = flashcards_state(
+        FlashCard.objects.filter(user=request.user, decks__id=deck_pk),
+        FlashCardTombstone.objects.filter(deck_id=deck_pk, deck__owner=request.user),
+    )
+    return make_version(request.user.pk, deck_pk, count, last_modified, last_modified=last_modified)
+
+def requested_tags(request):
+    """Tags from ?tag=, which may be repeated to require several"""
+    return [tag.strip() for tag in request.query_params.getlist('tag') if tag.strip()]
 
 class FlashCardViewSet(viewsets.GenericViewSet,
                      viewsets.mixins.ListModelMixin,
@@ -23,11 +43,7 @@ class FlashCardViewSet(viewsets.GenericViewSet,
         return FlashCard.objects.filter(
             user=self.request.user,
             decks__id=deck_id  # Filter by specific deck
-        ).order_by(
-            models.F('front_last_review').desc(nulls_last=True),
-            models.F('back_last_review').desc(nulls_last=True),
-            '-created_at'
-        )
+        ).in_preview_order()
 
     def update(self, request, pk=None, deck_pk=None):
         """Custom update that handles both user edits and AI updates"""
@@ -45,7 +61,7 @@ class FlashCardViewSet(viewsets.GenericViewSet,
             show_both = request.query_params.get('show_both') == 'true'
             
             # Always render preview HTML
-            preview_html = render_to_string('main/_flashcard_preview.html', {'flashcard': card})
+            preview_html = render_preview(card)
             
             # Render review HTML only if we have review_side
             review_html = None
@@ -65,15 +81,28 @@ class FlashCardViewSet(viewsets.GenericViewSet,
         except FlashCard.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
     
+    @method_decorator(conditional(flashcard_list_version))
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        html = render_to_string('main/_flashcard_preview.html', {
-            'flashcards': queryset
-        })
+        """One page of the deck's cards, continue with ?cursor=<next_cursor>, filter with ?tag="""
+        sync_cursor = snapshot_cursor()
+        try:
+            page_size = min(int(request.query_params.get('page_size', getattr(settings, 'FLASHCARD_PAGE_SIZE', 50))), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'page_size must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            flashcards, next_cursor = keyset_page(
+                self.get_queryset().with_tags(requested_tags(request)), max(page_size, 1), request.query_params.get('cursor')
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(flashcards, many=True)
+        html = ''.join(render_previews(flashcards))
         return Response({
             'data': serializer.data,
-            'html': html
+            'html': html,
+            'next_cursor': next_cursor,  # None on the last page
+            'sync_cursor': sync_cursor  # Pass to sync to fetch only later changes
         })
 
     def perform_create(self, serializer):
@@ -88,21 +117,11 @@ class FlashCardViewSet(viewsets.GenericViewSet,
         serializer = self.get_serializer(data=request.data, many=isinstance(request.data, list))
         serializer.is_valid(raise_exception=True)
 
-        serializer.save(user=self.request.user)
-        
-        # Handle both single item and list cases for getting IDs
-        if isinstance(serializer.data, list):
-            flashcard_ids = [item['id'] for item in serializer.data]
-        else:
-            flashcard_ids = [serializer.data['id']]
-
-        # Get the flashcards and render the preview
-        flashcards = FlashCard.objects.filter(id__in=flashcard_ids)
-        html_parts = []
-        for flashcard in flashcards:
-            html_part = render_to_string('main/_flashcard_preview.html', {'flashcard': flashcard})
-            html_parts.append(html_part)
-        html = ''.join(html_parts)
+        created = serializer.save(user=self.request.user)
+
+        # Render the preview from the created cards, list creates come back from one bulk insert
+        flashcards = created if isinstance(created, list) else [created]
+        html = ''.join(render_previews(flashcards))
         response_data = {
             'data': serializer.data,
             'html': html
@@ -113,38 +132,14 @@ class FlashCardViewSet(viewsets.GenericViewSet,
 
     @action(detail=False, methods=['get'], url_path='next_review')
     def next_review(self, request, deck_pk=None):
-        """Get the next card due for review"""
-        now = timezone.now()
-        queryset = self.get_queryset()  # get_queryset already filters by deck_pk
-
+        """Get the next card due for review, only from cards with every ?tag= if given"""
         # Get the side to review
         side = request.query_params.get('reviewSide', 'either')
-        
-        # Get cards that need review (either never reviewed or due)
-        review_needed = []
-        unreviewed = []
-
-        for card in queryset:
-            # Check front side
-            if side in ['front', 'either'] and card.is_due_for_review('front'):
-                if not card.front_last_review:
-                    unreviewed.append((card, 'front'))
-                else:
-                    review_needed.append((card, 'front'))
-
-            # Check back side
-            if side in ['back', 'either'] and card.is_due_for_review('back'):
-                if not card.back_last_review:
-                    unreviewed.append((card, 'back'))
-                else:
-                    review_needed.append((card, 'back'))
-
-        # Prioritize cards that need review over unreviewed cards
-        if review_needed:
-            card, side = choice(review_needed)
-        elif unreviewed:
-            card, side = choice(unreviewed)
-        else:
+        sides = ('front', 'back') if side == 'either' else tuple(s for s in ('front', 'back') if s == side)
+
+        # Overdue sides are prioritised over never-reviewed sides in the query itself
+        card = self.get_queryset().with_tags(requested_tags(request)).next_due(sides)
+        if card is None:
             return Response({
                 'html': render_to_string('main/_flashcard_review.html', {'card': None})
             })
@@ -155,33 +150,130 @@ class FlashCardViewSet(viewsets.GenericViewSet,
         # Render the review template
         html = render_to_string('main/_flashcard_review.html', {
             'card': card,
-            'side': side,
+            'side': card.review_side,
             'show_both': show_both
         })
 
         return Response({'html': html})
 
+    @action(detail=False, methods=['get'])
+    def tags(self, request, deck_pk=None):
+        """How many of the deck's cards have each tag, most used first
+
+        With ?tag= the counts are within the cards that have those tags, for drilling down.
+        """
+        counts = self.get_queryset().with_tags(requested_tags(request)).tag_counts()
+        return Response({'tags': [{'tag': tag, 'count': count} for tag, count in counts]})
+
+    @action(detail=False, methods=['get'])
+    def search(self, request, deck_pk=None):
+        """Ranked search over the deck's cards, or all the user's cards with ?scope=all
+
+        Takes ?q=, ?page= (from 1) and ?page_size=. Returns the matching cards,
+        their rendered previews and the next page number, None on the last page.
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', getattr(settings, 'FLASHCARD_PAGE_SIZE', 50))), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'page and page_size must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('scope') == 'all':
+            queryset = FlashCard.objects.filter(user=request.user)
+        else:
+            queryset = self.get_queryset()
+        offset = (page - 1) * page_size
+        flashcards = list(queryset.search(text)[offset:offset + page_size + 1])
+        has_more = len(flashcards) > page_size
+        flashcards = flashcards[:page_size]
+
+        return Response({
+            'data': self.get_serializer(flashcards, many=True).data,
+            'html': ''.join(render_previews(flashcards)),
+            'next_page': page + 1 if has_more else None,
+        })
 
+    @action(detail=False, methods=['get'])
+    def sync(self, request, deck_pk=None):
+        """Return cards changed and deleted since ?cursor=, with a cursor for the next call
+
+        Without a cursor every card is returned. With ?html=true each card
+        includes its rendered preview so the sidebar can patch itself.
+        """
+        try:
+            changes = deck_changes(
+                self.get_queryset(),
+                FlashCardTombstone.objects.filter(deck_id=deck_pk, deck__owner=request.user),
+                request.query_params.get('cursor'),
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired as e:
+            return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+
+        cards = self.get_serializer(changes['cards'], many=True).data
+        if request.query_params.get('html') == 'true':
+            for card, html in zip(cards, render_previews(changes['cards'])):
+                card['html'] = html
+        return Response({
+            'cards': cards,
+            'deleted': [str(card_id) for card_id in changes['deleted']],
+            'cursor': changes['cursor'],
+            'has_more': changes['has_more'],
+        })
+
+    @action(detail=False, methods=['post'], url_path='reviews/batch', url_name='review-batch')
+    def review_batch(self, request, deck_pk=None):
+        """Apply an ordered list of reviews, e.g. a queue built up while offline
+
+        Returns the IDs of the cards that changed, the IDs that weren't found,
+        the IDs with reviews skipped as older than the card's last review, and
+        with ?previews=true each changed card's rendered preview.
+        """
+        serializer = ReviewBatchItemSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        cards, events, missing, stale = self.get_queryset().apply_review_batch(serializer.validated_data)
+        review_event_writer.record_many(events)
+
+        data = {
+            'updated_card_ids': [str(card.id) for card in cards],
+            'missing_card_ids': [str(card_id) for card_id in missing],
+            'stale_card_ids': [str(card_id) for card_id in stale],
+        }
+        if request.query_params.get('previews') == 'true':
+            data['previews'] = {str(card.id): html for card, html in zip(cards, render_previews(cards))}
+        return Response(data)
 
     @action(detail=True, methods=['post'], url_path='review')
     def review(self, request, pk=None, deck_pk=None):
         """Update review status for a card"""
         card = self.get_object()
-        status = request.data.get('status')
+        review_status = request.data.get('status')
         side = request.data.get('side', 'front')
         notes = request.data.get('notes')
 
-        if status not in [s.value for s in ReviewStatus]:
+        if review_status not in [s.value for s in ReviewStatus]:
             return Response(
                 {'error': f'Invalid status. Must be one of: {[s.value for s in ReviewStatus]}'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if side not in ('front', 'back'):
+            return Response({'error': 'Invalid side. Must be one of: front, back'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Update the review status
-        card.update_review(ReviewStatus(status), side, notes)
+        # Update the review status and log it without waiting on the write
+        event = card.update_review(ReviewStatus(review_status), side, notes)
+        try:
+            event.latency_ms = max(0, int(request.data.get('latency_ms')))
+        except (TypeError, ValueError):
+            pass
+        review_event_writer.record(event)
 
         # Get the updated preview of the judged card
-        updated_preview = render_to_string('main/_flashcard_preview.html', {'flashcard': card})
+        updated_preview = render_preview(card)
 
         # Get the next card
         show_both = request.query_params.get('show_both') == 'true'
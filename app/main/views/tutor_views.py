@@ -3,13 +3,14 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from ..models import Tutor, TutorPromptOverride
+from ..context_processors import navigation_tutors
 
 @login_required
 def tutor_list(request):
-    tutors = Tutor.objects.all()
-    if tutors.count() == 1:
+    tutors = navigation_tutors(request)
+    if len(tutors) == 1:
         # Single tutor - redirect to their deck list
-        return redirect('main:deck_list', url_path=tutors.first().url_path)
+        return redirect('main:deck_list', url_path=tutors[0].url_path)
     return render(request, 'main/tutor_list.html', {'tutors': tutors})
 
 @login_required
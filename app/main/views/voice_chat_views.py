@@ -1,70 +1,65 @@
 import os
 import json
 import logging
+import httpx
 import requests
-from rest_framework.response import Response
-from rest_framework import status, permissions, viewsets
-from rest_framework.decorators import action
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.shortcuts import get_object_or_404
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 from ..models import Tutor
+from ..async_helpers import api_login_required, is_asgi
+from ..voice_sessions import voice_session_broker
 
 logger = logging.getLogger(__name__)
 
-class VoiceChatViewSet(viewsets.ViewSet):
-    permission_classes = [permissions.IsAuthenticated]
-    lookup_field = 'tutor_path'  # Use tutor's url_path for lookup
-    
-    @action(detail=True, methods=['get'])
-    def session(self, request, tutor_path=None):
-        """Get voice chat session for a specific tutor"""
-        logger.debug(f'Session request received for tutor: {tutor_path}')
-        api_key = settings.OPENAI_API_KEY
-        if not api_key:
-            error_msg = "Invalid API key. Please set your OpenAI API key in Django settings."
-            logger.error(error_msg)
-            return Response({"error": error_msg}, status=status.HTTP_401_UNAUTHORIZED)
+@require_GET
+@api_login_required
+async def voice_chat_session(request, tutor_path):
+    """Get voice chat session for a specific tutor"""
+    logger.debug(f'Session request received for tutor: {tutor_path}')
+    api_key = settings.OPENAI_API_KEY
+    if not api_key:
+        error_msg = "Invalid API key. Please set your OpenAI API key in Django settings."
+        logger.error(error_msg)
+        return JsonResponse({"error": error_msg}, status=401)
 
+    try:
+        # Get tutor by url_path, the config reads the database and cache so it runs in the sync thread
+        tutor = await Tutor.objects.aget(url_path=tutor_path)
+        config = await sync_to_async(tutor.get_config)(await request.auser())
+
+        # A hint that the user is about to connect, mint a session now so it is ready
+        if request.GET.get('prewarm') == 'true':
+            started = getattr(settings, 'VOICE_SESSION_PREWARM', False) and voice_session_broker.prewarm(tutor.url_path, config['session'])
+            return JsonResponse({'prewarming': bool(started)}, status=202)
+
+        # Under WSGI each request gets a new event loop, so only the sync client keeps its connections
+        get_session = voice_session_broker.aget if is_asgi(request) else sync_to_async(voice_session_broker.get)
+        response_data = dict(await get_session(tutor.url_path, config['session']))
+        logger.debug('Session response received')
+
+        if 'client_secret' in response_data:
+            # Merge OpenAI response with our config
+            response_data.update({
+                'tools': config['tools'],
+                'prompts': config['prompts'],
+                'client_secret': response_data['client_secret']['value']
+            })
+            return JsonResponse(response_data)
+        else:
+            return JsonResponse({"error": "No client secret in response"}, status=500)
+
+    except Tutor.DoesNotExist:
+        return JsonResponse({"error": "Tutor not found"}, status=404)
+    except (httpx.HTTPStatusError, requests.HTTPError) as e:
         try:
-            # Get tutor by url_path
-            tutor = get_object_or_404(Tutor, url_path=tutor_path)
-            config = tutor.get_config(request.user)
-            
-            headers = {
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            url = 'https://api.openai.com/v1/realtime/sessions'
-            
-            logger.debug(f'Making request to {url}')
-            response = requests.post(url, headers=headers, json=config['session'])
-            response.raise_for_status()
-            
-            # Get OpenAI response and merge with our config
-            response_data = response.json()
-            logger.debug('Session response received')
-            
-            if 'client_secret' in response_data:
-                # Merge OpenAI response with our config
-                response_data.update({
-                    'tools': config['tools'],
-                    'prompts': config['prompts'],
-                    'client_secret': response_data['client_secret']['value']
-                })
-                return Response(response_data)
-            else:
-                return Response({"error": "No client secret in response"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
-        except requests.exceptions.RequestException as e:
-            if e.response:
-                error_data = e.response.json()
-                error_msg = error_data.get('error', str(error_data))
-            else:
-                error_msg = str(e)
-            logger.error(f'Session error: {error_msg}')
-            return Response({"error": error_msg}, 
-                          status=e.response.status_code if e.response else status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except Exception as e:
-            logger.error(f'Unexpected error: {str(e)}')
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            error_data = e.response.json()
+            error_msg = error_data.get('error', str(error_data))
+        except ValueError:
+            error_msg = str(e)
+        logger.error(f'Session error: {error_msg}')
+        return JsonResponse({"error": error_msg}, status=e.response.status_code)
+    except Exception as e:
+        logger.error(f'Unexpected error: {str(e)}')
+        return JsonResponse({"error": str(e)}, status=500)
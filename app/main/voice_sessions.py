@@ -0,0 +1,202 @@
+"""
+Realtime voice session broker.
+
+Minting a realtime session is a round trip to OpenAI that the user waits on
+before they can talk. The broker keeps one pooled, keep-alive HTTP session per
+process with timeouts, and can mint a session in the background just before
+it is needed, e.g. when the pointer moves onto the talk button. Minted
+sessions wait in a small pool keyed by (tutor, session config hash) until
+they are used or their client secret gets close to expiring.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from .async_helpers import loop_local
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSIONS_URL = 'https://api.openai.com/v1/realtime/sessions'
+
+
+def session_config_key(url_path, session_config):
+    """Pool key for a tutor's resolved session config, user overrides included"""
+    payload = json.dumps(session_config, sort_keys=True, default=str)
+    return f"{url_path}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]}"
+
+
+class VoiceSessionBroker:
+    """Mints realtime sessions over a shared HTTP session and pools pre-minted ones"""
+
+    def __init__(self):
+        self._http = None
+        self._async_http = {}  # event loop -> httpx.AsyncClient
+        self._executor = None
+        self._pool = {}  # key -> list of session responses, oldest first
+        self._warming = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.minted = 0
+
+    def _reset_after_fork(self):
+        # Connections and worker threads must not be shared with a gunicorn worker
+        self._http = None
+        self._async_http = {}
+        self._executor = None
+        self._warming = set()
+        self._lock = threading.Lock()
+
+    def http(self):
+        """This process's requests.Session, keeping connections to OpenAI alive between mints"""
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    http = requests.Session()
+                    # Only connection failures are retried, a POST that reached OpenAI may have minted a session
+                    retries = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2)
+                    size = getattr(settings, 'VOICE_SESSION_MAX_CONNECTIONS', 10)
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retries)
+                    http.mount('https://', adapter)
+                    http.mount('http://', adapter)
+                    self._http = http
+        return self._http
+
+    def async_http(self):
+        """The httpx.AsyncClient for the running event loop, for async views"""
+        size = getattr(settings, 'VOICE_SESSION_MAX_CONNECTIONS', 10)
+        return loop_local(self._async_http, lambda: httpx.AsyncClient(
+            # Like the sync session, only connection failures are retried
+            transport=httpx.AsyncHTTPTransport(retries=2, limits=httpx.Limits(max_connections=size, max_keepalive_connections=size)),
+            timeout=httpx.Timeout(getattr(settings, 'VOICE_SESSION_TIMEOUT', 15.0), connect=getattr(settings, 'VOICE_SESSION_CONNECT_TIMEOUT', 3.0)),
+        ))
+
+    def _request(self, session_config):
+        return {
+            'url': getattr(settings, 'OPENAI_REALTIME_SESSIONS_URL', DEFAULT_SESSIONS_URL),
+            'headers': {'Authorization': f'Bearer {settings.OPENAI_API_KEY}'},
+            'json': session_config,
+        }
+
+    def mint(self, session_config):
+        """Create a realtime session, raises requests.RequestException on failure"""
+        response = self.http().post(
+            **self._request(session_config),
+            timeout=(
+                getattr(settings, 'VOICE_SESSION_CONNECT_TIMEOUT', 3.0),
+                getattr(settings, 'VOICE_SESSION_TIMEOUT', 15.0),
+            ),
+        )
+        response.raise_for_status()
+        with self._lock:
+            self.minted += 1
+        return response.json()
+
+    async def amint(self, session_config):
+        """Async mint, raises httpx.HTTPError on failure"""
+        response = await self.async_http().post(**self._request(session_config))
+        response.raise_for_status()
+        with self._lock:
+            self.minted += 1
+        return response.json()
+
+    def _is_fresh(self, session, now):
+        """Whether the client secret will still be valid by the time the browser uses it"""
+        expires_at = (session.get('client_secret') or {}).get('expires_at')
+        if not expires_at:
+            return False
+        return expires_at - now > getattr(settings, 'VOICE_SESSION_MIN_TTL', 15)
+
+    def _prune(self, now):
+        """Drop sessions that are too close to expiring to hand out, call with the lock held"""
+        for key, sessions in list(self._pool.items()):
+            sessions = [session for session in sessions if self._is_fresh(session, now)]
+            if sessions:
+                self._pool[key] = sessions
+            else:
+                del self._pool[key]
+
+    def _take(self, key):
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            sessions = self._pool.get(key)
+            session = sessions.pop(0) if sessions else None
+            if sessions == []:
+                del self._pool[key]
+            if session:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return session
+
+    def get(self, url_path, session_config):
+        """A pre-minted session for this config if one is fresh, otherwise a newly minted one"""
+        session = self._take(session_config_key(url_path, session_config))
+        if session is not None:
+            logger.debug(f'Serving pre-minted voice session for {url_path}')
+            return session
+        return self.mint(session_config)
+
+    async def aget(self, url_path, session_config):
+        """Async get, only the mint itself is awaited"""
+        session = self._take(session_config_key(url_path, session_config))
+        if session is not None:
+            logger.debug(f'Serving pre-minted voice session for {url_path}')
+            return session
+        return await self.amint(session_config)
+
+    def prewarm(self, url_path, session_config):
+        """Mint a session in the background unless the pool already has enough for this config
+
+        Returns True if a mint was started.
+        """
+        key = session_config_key(url_path, session_config)
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            if key in self._warming or len(self._pool.get(key, [])) >= getattr(settings, 'VOICE_SESSION_POOL_SIZE', 1):
+                return False
+            self._warming.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='voice-session')
+            executor = self._executor
+        executor.submit(self._warm, key, session_config)
+        return True
+
+    def _warm(self, key, session_config):
+        try:
+            session = self.mint(session_config)
+        except Exception as e:
+            logger.warning(f'Pre-minting voice session failed: {str(e)}')
+            session = None
+        with self._lock:
+            self._warming.discard(key)
+            if session is not None:
+                self._pool.setdefault(key, []).append(session)
+
+    def clear(self):
+        with self._lock:
+            self._pool.clear()
+            self.hits = self.misses = self.minted = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'minted': self.minted,
+                'pooled': sum(len(sessions) for sessions in self._pool.values()),
+            }
+
+
+voice_session_broker = VoiceSessionBroker()
+os.register_at_fork(after_in_child=voice_session_broker._reset_after_fork)
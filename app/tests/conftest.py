@@ -2,9 +2,13 @@
 import pytest
 from playwright.sync_api import sync_playwright
 from django.conf import settings
+from django.core.cache import caches
+from main.tutor_registry import tutor_registry
 
 # Set TESTING flag for the test environment
 settings.TESTING = True
+# Write review events immediately so they are part of each test's transaction
+settings.REVIEW_EVENT_ASYNC = False
 
 @pytest.fixture(scope="session")
 def django_db_setup(django_db_setup, django_db_blocker):
@@ -12,6 +16,17 @@ def django_db_setup(django_db_setup, django_db_blocker):
         # Optional: Load initial data or perform setup
         pass
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Caches and the tutor registry outlive the per-test database rollback, so start each test empty."""
+    for cache in caches.all():
+        cache.clear()
+    tutor_registry.clear()
+    yield
+    for cache in caches.all():
+        cache.clear()
+    tutor_registry.clear()
+
 # Remove pytest_addoption to avoid conflict
 @pytest.fixture(scope="session")
 def browser_context(request):
@@ -1,5 +1,11 @@
 import pytest
-from main.ai_helpers import extract_json
+import httpx
+import openai
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from asgiref.sync import async_to_sync
+from main import ai_helpers
+from main.ai_helpers import extract_json, chunk_text, iter_json_objects, JSONObjectStream
 
 def test_extract_json_direct():
     """Test extracting direct JSON string"""
@@ -90,3 +96,194 @@ def test_extract_json_complex():
     assert "key_points" in result[0]["suggested_answer"]
     assert "format" in result[0]["suggested_answer"]
     assert "examples" in result[0]["suggested_answer"]
+
+def test_chunk_text_respects_document_boundaries():
+    """Test that each content source starts a new chunk"""
+    chunks = chunk_text(["Resume paragraph", "Job description"], max_tokens=1000)
+    assert chunks == ["Resume paragraph", "Job description"]
+
+def test_chunk_text_packs_paragraphs_within_budget():
+    """Test that paragraphs are packed together without exceeding the budget"""
+    paragraphs = [f"Paragraph {i} " + "x" * 30 for i in range(10)]
+    chunks = chunk_text(["\n\n".join(paragraphs)], max_tokens=25)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    # Nothing is lost or reordered
+    assert "\n\n".join(chunks) == "\n\n".join(paragraphs)
+
+def test_chunk_text_splits_oversized_paragraph():
+    """Test that a single paragraph larger than the budget is hard-split"""
+    chunks = chunk_text(["y" * 250], max_tokens=25)
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+
+@pytest.fixture
+def live_openai(settings):
+    """Let call_openai run against a fake client instead of refusing in tests"""
+    settings.TESTING = False
+    settings.OPENAI_RETRY_BACKOFF = 0
+
+def fake_completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def test_openai_client_is_shared_until_fork(settings):
+    settings.OPENAI_API_KEY = 'test-key'
+    client = ai_helpers.get_openai_client()
+    assert ai_helpers.get_openai_client() is client
+
+    # A forked worker must build its own connection pool
+    ai_helpers._reset_client_after_fork()
+    assert ai_helpers.get_openai_client() is not client
+
+def test_call_openai_retries_transient_errors(live_openai, settings):
+    settings.OPENAI_MAX_RETRIES = 2
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [
+        openai.APIConnectionError(request=httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')),
+        fake_completion('Hello'),
+    ]
+    before = ai_helpers.openai_stats()
+
+    with patch('main.ai_helpers.get_openai_client', return_value=client):
+        assert ai_helpers.call_openai('system', 'user', model='tutor-model') == 'Hello'
+
+    assert client.chat.completions.create.call_args.kwargs['model'] == 'tutor-model'
+    stats = ai_helpers.openai_stats()
+    assert stats['calls'] == before['calls'] + 1
+    assert stats['retries'] == before['retries'] + 1
+
+def test_call_openai_gives_up_after_max_retries(live_openai, settings):
+    settings.OPENAI_MAX_RETRIES = 1
+    client = MagicMock()
+    client.chat.completions.create.side_effect = openai.APIConnectionError(
+        request=httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+    )
+
+    with patch('main.ai_helpers.get_openai_client', return_value=client):
+        with pytest.raises(openai.APIConnectionError):
+            ai_helpers.call_openai('system', 'user')
+
+    assert client.chat.completions.create.call_count == 2
+    assert client.chat.completions.create.call_args.kwargs['model'] == settings.OPENAI_MODEL
+
+def test_call_openai_serves_identical_requests_from_cache(live_openai):
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [fake_completion('First'), fake_completion('Second')]
+    before = ai_helpers.openai_stats()
+
+    with patch('main.ai_helpers.get_openai_client', return_value=client):
+        assert ai_helpers.call_openai('system', 'user', cache=True) == 'First'
+        assert ai_helpers.call_openai('system', 'user', cache=True) == 'First'
+
+    assert client.chat.completions.create.call_count == 1
+    stats = ai_helpers.openai_stats()
+    assert stats['cache_hits'] == before['cache_hits'] + 1
+    assert stats['cache_misses'] == before['cache_misses'] + 1
+    assert 0 < stats['cache_hit_rate'] < 1
+
+def test_call_openai_cache_key_covers_model_and_params(live_openai):
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [fake_completion('A'), fake_completion('B'), fake_completion('C')]
+
+    with patch('main.ai_helpers.get_openai_client', return_value=client):
+        assert ai_helpers.call_openai('system', 'user', cache=True) == 'A'
+        assert ai_helpers.call_openai('system', 'user', model='other-model', cache=True) == 'B'
+        assert ai_helpers.call_openai('system', 'user', params={'temperature': 0}, cache=True) == 'C'
+
+    assert client.chat.completions.create.call_args.kwargs['temperature'] == 0
+
+def test_call_openai_refresh_and_uncached_calls_skip_lookup(live_openai):
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [fake_completion('Old'), fake_completion('New'), fake_completion('Live')]
+
+    with patch('main.ai_helpers.get_openai_client', return_value=client):
+        ai_helpers.call_openai('system', 'user', cache=True)
+        assert ai_helpers.call_openai('system', 'user', cache=True, refresh=True) == 'New'
+        assert ai_helpers.call_openai('system', 'user') == 'Live'
+        # Refresh overwrote the stored response
+        assert ai_helpers.call_openai('system', 'user', cache=True) == 'New'
+
+    assert client.chat.completions.create.call_count == 3
+
+def test_acall_openai_retries_and_caches_without_blocking(live_openai, settings):
+    settings.OPENAI_MAX_RETRIES = 2
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=[
+        openai.APIConnectionError(request=httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')),
+        fake_completion('Hello'),
+    ])
+
+    async def calls():
+        return [await ai_helpers.acall_openai('system', 'user', cache=True) for _ in range(2)]
+
+    with patch('main.ai_helpers.get_async_openai_client', return_value=client):
+        with patch('main.ai_helpers.time.sleep', side_effect=AssertionError('Blocked the event loop')):
+            assert async_to_sync(calls)() == ['Hello', 'Hello']
+
+    assert client.chat.completions.create.call_count == 2
+
+def test_async_openai_client_is_shared_per_event_loop(settings):
+    settings.OPENAI_API_KEY = 'test-key'
+
+    async def clients():
+        return ai_helpers.get_async_openai_client(), ai_helpers.get_async_openai_client()
+
+    first, same = async_to_sync(clients)()
+    assert first is same
+    # Another loop, e.g. the next async view served over WSGI, can't reuse its connections
+    assert async_to_sync(clients)()[0] is not first
+
+def fake_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+def test_stream_openai_yields_deltas(live_openai):
+    client = MagicMock()
+    stream = MagicMock()
+    stream.__iter__.return_value = iter([fake_chunk(None), fake_chunk('Hel'), fake_chunk('lo')])
+    client.chat.completions.create.return_value = stream
+
+    with patch('main.ai_helpers.get_openai_client', return_value=client):
+        assert list(ai_helpers.stream_openai('system', 'user')) == ['Hel', 'lo']
+
+    assert client.chat.completions.create.call_args.kwargs['stream'] is True
+    stream.close.assert_called_once()
+
+def test_stream_openai_closes_upstream_when_abandoned(live_openai):
+    client = MagicMock()
+    stream = MagicMock()
+    stream.__iter__.return_value = iter([fake_chunk('Hel'), fake_chunk('lo')])
+    client.chat.completions.create.return_value = stream
+
+    with patch('main.ai_helpers.get_openai_client', return_value=client):
+        deltas = ai_helpers.stream_openai('system', 'user')
+        assert next(deltas) == 'Hel'
+        # The server closes the response generator when the client disconnects
+        deltas.close()
+
+    stream.close.assert_called_once()
+
+def test_json_object_stream_yields_each_object_when_complete():
+    """Test that objects come out as soon as their closing brace arrives"""
+    parser = JSONObjectStream()
+    assert parser.feed('Here you go [1]:\n```json\n[{"question": "A?", ') == []
+    assert parser.feed('"tags": ["x", "}"]}, {"question": "B') == [{"question": "A?", "tags": ["x", "}"]}]
+    assert parser.feed('\\"?"}') == [{"question": 'B"?'}]
+    assert parser.feed(']\n```\nMore prose {"ignored": true}') == []
+    assert parser.done
+
+def test_iter_json_objects_matches_extract_json():
+    """Test that streaming one character at a time gives the same cards as extract_json"""
+    text = '''
+    Here are the cards:
+    ```json
+    [
+        {"question": "What is Python?", "suggested_answer": {"key_points": ["[typed]", "{dynamic}"]}},
+        {"question": "Why?", "suggested_answer": "Because"}
+    ]
+    ```
+    '''
+    assert list(iter_json_objects(iter(text))) == extract_json(text)
+
+def test_iter_json_objects_skips_malformed_objects():
+    """Test that a broken object is dropped without losing the rest"""
+    assert list(iter_json_objects(['[{"question": }, {"question": "Ok?"}]'])) == [{"question": "Ok?"}]
@@ -0,0 +1,37 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+from main.context_processors import generic_context, DefaultApplication
+from .factories import UserFactory, TutorFactory
+
+pytestmark = pytest.mark.django_db
+
+def make_request(user):
+    request = RequestFactory().get('/')
+    request.user = user
+    request.tutor = None
+    return request
+
+def test_tutors_are_not_loaded_until_used(django_assert_num_queries):
+    TutorFactory()
+    request = make_request(UserFactory())
+
+    # A partial that never touches tutors issues no query
+    with django_assert_num_queries(0):
+        generic_context(request)
+
+    with django_assert_num_queries(1):
+        assert len(generic_context(request)['tutors']) == 1
+
+    # Later partials in the same request reuse the list
+    with django_assert_num_queries(0):
+        for _ in range(3):
+            assert len(generic_context(request)['tutors']) == 1
+
+def test_tutors_hidden_from_anonymous_users(django_assert_num_queries):
+    TutorFactory()
+
+    with django_assert_num_queries(0):
+        context = generic_context(make_request(AnonymousUser()))
+        assert list(context['tutors']) == []
+        assert context['application'].title == DefaultApplication().title
@@ -0,0 +1,91 @@
+import json
+import pytest
+from unittest.mock import patch
+from django.urls import reverse
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from asgiref.testing import ApplicationCommunicator
+from .factories import UserFactory, DeckFactory
+from .test_decks import streamed, tutor_config
+from main.models import GenerationJob, Tutor
+from main.routing import websocket_urlpatterns
+
+# Consumers reach the database from other threads, so the data has to be committed
+pytestmark = pytest.mark.django_db(transaction=True)
+
+CARDS = [{"question": "What is a queue?", "category": "Technical", "suggested_answer": "FIFO"}]
+
+class Socket(ApplicationCommunicator):
+    """A websocket client for a consumer, like channels.testing's, which needs daphne"""
+
+    def __init__(self, deck, user):
+        path = f'/ws/decks/{deck.pk}/'
+        super().__init__(URLRouter(websocket_urlpatterns), {
+            'type': 'websocket', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'headers': [], 'subprotocols': [], 'user': user,
+        })
+
+    async def connect(self):
+        await self.send_input({'type': 'websocket.connect'})
+        return (await self.receive_output())['type'] == 'websocket.accept'
+
+    async def receive_json_from(self):
+        return json.loads((await self.receive_output())['text'])
+
+    async def disconnect(self):
+        await self.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.wait()
+
+def test_deck_page_receives_job_state_and_new_cards():
+    deck = DeckFactory(owner=UserFactory(), content="MY RESUME")
+
+    def run_job():
+        GenerationJob.enqueue(deck)
+        with patch.object(Tutor, 'get_config', return_value=tutor_config()):
+            with patch('main.models.stream_openai', side_effect=streamed(CARDS)):
+                return GenerationJob.run_pending()
+
+    async def scenario():
+        socket = Socket(deck, deck.owner)
+        assert await socket.connect()
+        # The current state arrives first, so nothing published earlier is missed
+        assert await socket.receive_json_from() == {'type': 'job', 'job': None}
+
+        await database_sync_to_async(run_job)()
+        messages = [await socket.receive_json_from() for _ in range(4)]
+        await socket.disconnect()
+        return messages
+
+    pending, running, cards, succeeded = async_to_sync(scenario)()
+
+    assert [pending['job']['status'], running['job']['status']] == ['pending', 'running']
+    assert cards['type'] == 'flashcards'
+    card = deck.flashcards.get()
+    assert cards['cards'][0]['id'] == str(card.id)
+    assert 'What is a queue?' in cards['cards'][0]['html']
+    assert succeeded['job'] == dict(succeeded['job'], status='succeeded', created_count=1)
+
+def test_other_users_cannot_follow_a_deck():
+    deck = DeckFactory(owner=UserFactory())
+    other = UserFactory()
+
+    async def connect():
+        return await Socket(deck, other).connect()
+
+    assert not async_to_sync(connect)()
+
+def test_deck_page_only_offers_the_socket_when_pushes_can_arrive(client, settings):
+    deck = DeckFactory(owner=UserFactory())
+    client.force_login(deck.owner)
+    url = reverse('main:deck_detail', kwargs={'url_path': deck.tutor.url_path, 'pk': deck.pk})
+
+    # The in-memory layer doesn't reach the generation worker's process
+    settings.SERVER_MODE = 'asgi'
+    assert b'data-deck-progress-socket-url-value' not in client.get(url).content
+
+    settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels_redis.core.RedisChannelLayer'}}
+    assert f'data-deck-progress-socket-url-value="/ws/decks/{deck.pk}/"'.encode() in client.get(url).content
+
+    settings.SERVER_MODE = 'wsgi'
+    assert b'data-deck-progress-socket-url-value' not in client.get(url).content
@@ -5,7 +5,7 @@ from django.contrib.messages import get_messages
 from unittest.mock import patch
 from .factories import UserFactory, DeckFactory, TutorFactory
 from .test_base import BaseTestCase
-from main.models import Deck, User, FlashCard, Tutor, Document
+from main.models import Deck, User, FlashCard, Tutor, Document, GenerationJob
 import json
 
 pytestmark = pytest.mark.django_db
@@ -81,6 +81,10 @@ def mock_openai_response():
         }
     ]
 
+def streamed(cards):
+    """A stream_openai stand-in that streams `cards` as JSON for every chunk"""
+    return lambda *args, **kwargs: iter([json.dumps(cards)])
+
 def tutor_config():
     return {
         'prompts': {
@@ -102,7 +106,7 @@ def test_deck_create_view_with_questions(authenticated_client, user, tutor, mock
 
     # Mock the OpenAI call
     with patch.object(Tutor, 'get_config', return_value=tutor_config()):
-        with patch('main.models.call_openai', return_value=json.dumps(mock_openai_response)):
+        with patch('main.models.stream_openai', side_effect=streamed(mock_openai_response)):
             before_count = Deck.objects.count()
             response = authenticated_client.post(reverse('main:deck_create', kwargs={'url_path': tutor.url_path}), data)
 
@@ -113,6 +117,11 @@ def test_deck_create_view_with_questions(authenticated_client, user, tutor, mock
             assert deck.tutor == tutor
             assert deck.name == data['name']
 
+            # Generation is queued rather than run in the request
+            assert deck.flashcards.count() == 0
+            assert deck.generation_jobs.get().status == GenerationJob.Status.PENDING
+            GenerationJob.run_pending()
+
             # Check flashcards were created
             flashcards = deck.flashcards.all()
             assert flashcards.count() == 2
@@ -148,9 +157,10 @@ def test_deck_create_view_openai_error(authenticated_client, user, tutor):
 
     # Mock OpenAI call to raise an exception
     with patch.object(Tutor, 'get_config', return_value=tutor_config()):
-        with patch('main.models.call_openai', side_effect=Exception("OpenAI API error")):
+        with patch('main.models.stream_openai', side_effect=Exception("OpenAI API error")):
             before_count = Deck.objects.count()
             response = authenticated_client.post(reverse('main:deck_create', kwargs={'url_path': tutor.url_path}), data)
+            GenerationJob.run_pending()
             # Check deck was still created despite the error
             assert Deck.objects.count() == before_count + 1
             deck = Deck.objects.first()
@@ -183,7 +193,7 @@ def test_deck_edit_view_with_questions(authenticated_client, user, tutor, mock_o
 
     # Mock OpenAI call
     with patch.object(Tutor, 'get_config', return_value=tutor_config()):
-        with patch('main.models.call_openai', return_value=json.dumps(mock_openai_response)):
+        with patch('main.models.stream_openai', side_effect=streamed(mock_openai_response)):
             response = authenticated_client.post(
                 reverse('main:deck_edit', kwargs={'url_path': tutor.url_path, 'pk': deck.pk}),
                 data
@@ -191,6 +201,9 @@ def test_deck_edit_view_with_questions(authenticated_client, user, tutor, mock_o
 
             deck.refresh_from_db()
             assert deck.name == data['name']
+            assert response.status_code == 302
+
+            GenerationJob.run_pending()
 
             # Check new flashcards were added
             flashcards = deck.flashcards.all()
@@ -223,44 +236,31 @@ class TestDeckViews(BaseTestCase):
             'content': "MY RESUME",
         }
 
-        original_name = deck.name
         error_message = "OpenAI API error"
 
         # Mock OpenAI call to raise an exception
         with patch.object(Tutor, 'get_config', return_value=tutor_config()):
-            with patch('main.models.call_openai', side_effect=Exception(error_message)):
+            with patch('main.models.stream_openai', side_effect=Exception(error_message)) as mock_openai:
                     response = self.client.post(
                         reverse('main:deck_edit', kwargs={'url_path': tutor.url_path, 'pk': deck.pk}),
                         data
                     )
 
-                    # Check that we're re-rendering the form
-                    self.assertEqual(response.status_code, 200)
-                    self.assertIn('main/deck_form.html', [t.name for t in response.templates])
-
-                    # Check that error message is in the response
-                    messages = self.get_messages_list(response)
-
-                    self.assertEqual(len(messages), 1)
-                    message = messages[0]
-                    self.assertEqual(message.tags, 'error')
-                    self.assertIn('Failed to generate interview questions', str(message))
-
-                    # Check that form contains the submitted data
-                    self.assertIn(data['name'], str(response.content))
-
-                    # Check that we have the retry flag
-                    self.assertTrue(response.context['is_retry'])
-
-                    # Check that error message is in the context
-                    self.assertEqual(
-                        response.context['error_message'],
-                        f"Error generating questions: {error_message}"
+                    # The deck is saved and generation queued without calling OpenAI in the request
+                    self.assertRedirects(
+                        response,
+                        reverse('main:deck_detail', kwargs={'url_path': tutor.url_path, 'pk': deck.pk}),
+                        fetch_redirect_response=False
                     )
-
-                    # Check that deck was not updated
+                    mock_openai.assert_not_called()
                     deck.refresh_from_db()
-                    self.assertEqual(deck.name, original_name)
+                    self.assertEqual(deck.name, data['name'])
+
+                    # The worker records the error and schedules a retry
+                    job, = GenerationJob.run_pending()
+                    self.assertEqual(job.status, GenerationJob.Status.PENDING)
+                    self.assertEqual(job.attempts, 1)
+                    self.assertEqual(job.error, error_message)
 
                     # Check existing flashcard remains unchanged
                     flashcards = deck.flashcards.all()
@@ -284,6 +284,37 @@ def test_deck_detail_view(authenticated_client, user, tutor):
     assert response.context['tutor'] == tutor
     assert response.context['deck'] == deck
 
+def test_deck_detail_conditional_get(authenticated_client, user, tutor):
+    deck = DeckFactory(owner=user, tutor=tutor)
+    url = reverse('main:deck_detail', kwargs={'url_path': tutor.url_path, 'pk': deck.pk})
+
+    etag = authenticated_client.get(url)['ETag']
+    with patch('main.views.deck_views.render') as render:
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    render.assert_not_called()
+
+    # A new card in the deck changes the page
+    FlashCard.objects.create(front='Q', back='A', user=user).decks.add(deck)
+    response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+def test_deck_detail_revalidates_after_login(client, user, tutor):
+    deck = DeckFactory(owner=user, tutor=tutor)
+    url = reverse('main:deck_detail', kwargs={'url_path': tutor.url_path, 'pk': deck.pk})
+    client.force_login(user)
+    etag = client.get(url)['ETag']
+
+    # Logging in again rotates the CSRF secret, so the cached page's token no longer works
+    client.logout()
+    client.force_login(user)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
 def test_unauthorized_access(client, tutor):
     user = UserFactory()
     deck = DeckFactory(owner=user, tutor=tutor)
@@ -336,13 +367,13 @@ def test_other_user_access(authenticated_client, user, tutor):
 
 @pytest.mark.django_db
 def test_generate_questions_model_method(user, tutor, mock_openai_response):
-    """Test the generate_and_save_flashcards method on Deck model"""
+    """Test the stream_flashcards and save_flashcards methods on Deck model"""
     deck = DeckFactory(owner=user, tutor=tutor, content="MY RESUME")
 
     with patch.object(Tutor, 'get_config', return_value=tutor_config()):
-        with patch('main.models.call_openai', return_value=json.dumps(mock_openai_response)):
+        with patch('main.models.stream_openai', side_effect=streamed(mock_openai_response)):
             # Test generating questions
-            created_cards = deck.generate_and_save_flashcards()
+            created_cards = deck.save_flashcards(list(deck.stream_flashcards()))
 
             # Verify cards were created
             assert len(created_cards) == 2
@@ -364,15 +395,16 @@ def test_generate_questions_endpoint(authenticated_client, user, tutor, mock_ope
     deck = DeckFactory(owner=user, tutor=tutor, content="MY RESUME")
 
     with patch.object(Tutor, 'get_config', return_value=tutor_config()):
-        with patch('main.models.call_openai', return_value=json.dumps(mock_openai_response)):
+        with patch('main.models.stream_openai', side_effect=streamed(mock_openai_response)):
             # Make request to generate questions
             response = authenticated_client.post(
                 reverse('main:api-deck-generate-questions', kwargs={'url_path': tutor.url_path, 'pk': deck.pk})
             )
 
-        # Verify successful response
-        assert response.status_code == 200
-        assert response.json()['message'] == 'Generated 2 new questions!'
+            # Verify the job was accepted, then run it
+            assert response.status_code == 202
+            assert response.json()['job']['status'] == 'pending'
+            GenerationJob.run_pending()
 
         # Verify cards were created
         flashcards = deck.flashcards.all()
@@ -389,15 +421,21 @@ def test_generate_questions_error_handling(authenticated_client, user, tutor):
     deck = DeckFactory(owner=user, tutor=tutor, content="MY RESUME")
 
     with patch.object(Tutor, 'get_config', return_value=tutor_config()):
-        with patch('main.models.call_openai', side_effect=Exception('API Error')):
+        with patch('main.models.stream_openai', side_effect=Exception('API Error')):
             # Make request to generate questions
             response = authenticated_client.post(
                 reverse('main:api-deck-generate-questions', kwargs={'url_path': tutor.url_path, 'pk': deck.pk})
             )
 
-            # Verify error response
-            assert response.status_code == 500
-            assert response.json()['message'] == 'Failed to generate questions'
+            assert response.status_code == 202
+            GenerationJob.run_pending()
+
+            # Verify the error is reported through the status endpoint
+            response = authenticated_client.get(
+                reverse('main:api-deck-generation-job', kwargs={'url_path': tutor.url_path, 'pk': deck.pk})
+            )
+            assert response.status_code == 200
+            assert response.json()['job']['error'] == 'API Error'
 
             # Verify no cards were created
             assert deck.flashcards.count() == 0
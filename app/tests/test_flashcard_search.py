@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import patch
+from django.urls import reverse
+from main import search
+from main.models import FlashCard
+from .factories import UserFactory, DeckFactory, FlashcardFactory
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture
+def deck():
+    return DeckFactory(owner=UserFactory())
+
+@pytest.fixture
+def find(client, deck):
+    client.force_login(deck.owner)
+    url = reverse('main:api-flashcard-search', kwargs={'deck_pk': deck.id})
+
+    def find(q, **params):
+        return client.get(url, {'q': q, **params})
+    return find
+
+def fronts(response):
+    return [card['front'] for card in response.json()['data']]
+
+@pytest.fixture(params=[search.POSTGRES, search.BASIC])
+def backend(request):
+    """Run against the tsvector search and the icontains fallback"""
+    with patch.dict(search._backends, {'default': request.param}):
+        yield request.param
+
+def test_search_ranks_front_matches_first_and_matches_prefixes(find, deck, backend):
+    FlashcardFactory(user=deck.owner, decks=[deck], front='Explain a stack', back='LIFO, unlike a queue')
+    FlashcardFactory(user=deck.owner, decks=[deck], front='What is a queue?', back='FIFO')
+    FlashcardFactory(user=deck.owner, decks=[deck], front='What is a heap?', back='A tree', front_notes='Priority queues use one')
+    FlashcardFactory(user=deck.owner, decks=[deck], front='What is a graph?', back='Nodes and edges')
+
+    response = find('que')
+
+    assert response.status_code == 200
+    assert fronts(response)[0] == 'What is a queue?'
+    assert sorted(fronts(response)) == ['Explain a stack', 'What is a heap?', 'What is a queue?']
+    assert response.json()['html'].count('flashcard-preview') == 3
+
+def test_search_follows_edits(find, deck, backend):
+    card = FlashcardFactory(user=deck.owner, decks=[deck], front='What is a queue?')
+
+    card.front = 'What is a deque?'
+    card.save()
+
+    assert fronts(find('deque')) == ['What is a deque?']
+    assert fronts(find('queue')) == []
+
+def test_search_vector_is_maintained_by_the_database(deck):
+    card = FlashcardFactory(user=deck.owner, decks=[deck], front='Binary search trees', back='Ordered')
+    FlashCard.objects.filter(pk=card.pk).update(back='Balanced by rotations')
+
+    # Updates that skip save() are indexed too, and review updates leave the vector alone
+    assert list(FlashCard.objects.search('rotation')) == [card]
+    card.refresh_from_db()
+    card.update_review('easy', 'front')
+    assert list(FlashCard.objects.search('binary')) == [card]
+
+def test_search_pages_and_scopes(find, deck):
+    other_deck = DeckFactory(owner=deck.owner)
+    for n in range(3):
+        FlashcardFactory(user=deck.owner, decks=[deck], front=f'Queue question {n}')
+    FlashcardFactory(user=deck.owner, decks=[other_deck], front='Queue in another deck')
+    FlashcardFactory(user=UserFactory(), front='Queue belonging to someone else')
+
+    first = find('queue', page_size=2).json()
+    second = find('queue', page_size=2, page=first['next_page']).json()
+    assert first['next_page'] == 2 and second['next_page'] is None
+    assert len({card['id'] for card in first['data'] + second['data']}) == 3
+
+    assert len(find('queue', scope='all').json()['data']) == 4
+    assert find('').status_code == 400
+    assert find('?!').json()['data'] == []
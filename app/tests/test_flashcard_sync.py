@@ -0,0 +1,94 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from main.models import FlashCardTombstone
+from main.sync import sync_cursor_at
+from .factories import UserFactory, DeckFactory, FlashcardFactory
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture(autouse=True)
+def no_sync_lag(settings):
+    settings.FLASHCARD_SYNC_LAG = 0
+
+@pytest.fixture
+def deck():
+    return DeckFactory(owner=UserFactory())
+
+@pytest.fixture
+def sync(client, deck):
+    client.force_login(deck.owner)
+    url = reverse('main:api-flashcard-sync', kwargs={'deck_pk': deck.id})
+
+    def sync(cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        return client.get(url, params)
+    return sync
+
+def card_ids(data):
+    return sorted(card['id'] for card in data['cards'])
+
+def test_sync_reports_only_changes_since_cursor(sync, deck):
+    kept, edited, deleted, removed = [FlashcardFactory(user=deck.owner, decks=[deck]) for _ in range(4)]
+    moved_in = FlashcardFactory(user=deck.owner)
+
+    data = sync().json()
+    assert card_ids(data) == sorted(str(card.id) for card in [kept, edited, deleted, removed])
+    assert data['deleted'] == [] and not data['has_more']
+
+    data = sync(data['cursor']).json()
+    assert data['cards'] == [] and data['deleted'] == []
+
+    edited.front = 'Edited'
+    edited.save()
+    deleted_id = deleted.id
+    deleted.delete()
+    deck.flashcards.remove(removed)
+    moved_in.decks.add(deck)
+
+    data = sync(data['cursor'], html='true').json()
+    assert card_ids(data) == sorted([str(edited.id), str(moved_in.id)])
+    assert 'Edited' in next(card['html'] for card in data['cards'] if card['id'] == str(edited.id))
+    assert sorted(data['deleted']) == sorted([str(deleted_id), str(removed.id)])
+
+def test_sync_pages_through_large_changes(sync, deck, settings):
+    settings.FLASHCARD_SYNC_PAGE_SIZE = 2
+    cards = [FlashcardFactory(user=deck.owner, decks=[deck]) for _ in range(5)]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        data = sync(cursor).json()
+        seen += [card['id'] for card in data['cards']]
+        cursor, pages = data['cursor'], pages + 1
+        if not data['has_more']:
+            break
+
+    assert pages == 3
+    assert sorted(seen) == sorted(str(card.id) for card in cards)
+
+def test_sync_holds_back_changes_inside_the_lag(sync, deck, settings):
+    cursor = sync_cursor_at(timezone.now() - timezone.timedelta(minutes=1))
+    card = FlashcardFactory(user=deck.owner, decks=[deck])
+
+    settings.FLASHCARD_SYNC_LAG = 30
+    data = sync(cursor).json()
+    assert data['cards'] == []
+
+    # The held-back change is still after the returned cursor
+    settings.FLASHCARD_SYNC_LAG = 0
+    assert card_ids(sync(data['cursor']).json()) == [str(card.id)]
+
+def test_sync_rejects_bad_and_expired_cursors(sync, settings):
+    assert sync('not-a-cursor').status_code == 400
+
+    settings.FLASHCARD_TOMBSTONE_TTL = 30
+    assert sync(sync_cursor_at(timezone.now() - timezone.timedelta(days=31))).status_code == 410
+
+def test_prune_drops_old_tombstones(deck):
+    FlashCardTombstone.record([(deck.id, FlashcardFactory().id)])
+    FlashCardTombstone.objects.update(deleted_at=timezone.now() - timezone.timedelta(days=40))
+    FlashCardTombstone.record([(deck.id, FlashcardFactory().id)])
+
+    assert FlashCardTombstone.prune() == 1
+    assert FlashCardTombstone.objects.count() == 1
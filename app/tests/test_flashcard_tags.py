@@ -0,0 +1,68 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from main.models import FlashCard
+from .factories import UserFactory, DeckFactory, FlashcardFactory
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture
+def deck(client):
+    deck = DeckFactory(owner=UserFactory())
+    client.force_login(deck.owner)
+    return deck
+
+def add_cards(deck, *tag_lists):
+    return [FlashcardFactory(user=deck.owner, decks=[deck], front=f'Card {i}', tags=tags) for i, tags in enumerate(tag_lists)]
+
+def test_list_filters_by_every_tag(client, deck):
+    add_cards(deck, ['behavioral', 'auto-generated'], ['behavioral'], ['technical', 'auto-generated'])
+    url = reverse('main:api-flashcard-list', kwargs={'deck_pk': deck.id})
+
+    one = client.get(url, {'tag': 'behavioral'}).json()['data']
+    both = client.get(f'{url}?tag=behavioral&tag=auto-generated').json()['data']
+
+    assert sorted(card['front'] for card in one) == ['Card 0', 'Card 1']
+    assert [card['front'] for card in both] == ['Card 0']
+
+def test_next_review_only_serves_tagged_cards(client, deck):
+    add_cards(deck, ['technical'], ['behavioral'])
+    url = reverse('main:api-flashcard-next-review', kwargs={'deck_pk': deck.id})
+
+    html = client.get(url, {'tag': 'behavioral'}).json()['html']
+    assert 'Card 1' in html
+    assert 'Card 0' not in html
+    assert 'No cards due for review!' in client.get(url, {'tag': 'missing'}).json()['html']
+
+def test_tag_facets_count_each_tag_in_one_query(client, deck, django_assert_num_queries):
+    add_cards(deck, ['behavioral', 'auto-generated'], ['behavioral', 'behavioral'], ['technical', 'auto-generated'], [])
+    other = DeckFactory(owner=deck.owner)
+    FlashcardFactory(user=deck.owner, decks=[other], tags=['behavioral'])
+
+    counts = FlashCard.objects.filter(decks__id=deck.id)
+    with django_assert_num_queries(1):
+        assert counts.tag_counts() == [('auto-generated', 2), ('behavioral', 2), ('technical', 1)]
+
+    url = reverse('main:api-flashcard-tags', kwargs={'deck_pk': deck.id})
+    assert client.get(url).json()['tags'][0] == {'tag': 'auto-generated', 'count': 2}
+    assert client.get(url, {'tag': 'technical'}).json()['tags'] == [
+        {'tag': 'auto-generated', 'count': 1}, {'tag': 'technical', 'count': 1},
+    ]
+
+def test_tag_facets_are_scoped_to_the_owner(client, deck):
+    add_cards(deck, ['behavioral'])
+    client.force_login(UserFactory())
+
+    response = client.get(reverse('main:api-flashcard-tags', kwargs={'deck_pk': deck.id}))
+
+    assert response.json()['tags'] == []
+
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='The tags index is Postgres only')
+def test_tag_filter_can_use_the_gin_index():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT indexdef FROM pg_indexes WHERE indexname = 'flashcard_tags_idx'")
+        assert 'jsonb_path_ops' in cursor.fetchone()[0]
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        sql, params = FlashCard.objects.with_tags(['behavioral']).query.sql_with_params()
+        cursor.execute(f'EXPLAIN {sql}', params)
+        assert 'flashcard_tags_idx' in ''.join(row[0] for row in cursor.fetchall())
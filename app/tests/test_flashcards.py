@@ -2,8 +2,15 @@ import pytest
 from django.urls import reverse
 from django.test import Client
 from .factories import UserFactory, FlashcardFactory, DeckFactory
-from main.models import FlashCard, User, Deck
+from main.models import FlashCard, User, Deck, ReviewStatus
+from django.utils import timezone
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 import json
+from unittest.mock import patch
+from django.template.loader import render_to_string
+from main.preview_cache import render_preview, preview_cache_stats, reset_preview_cache_stats
 
 pytestmark = pytest.mark.django_db
 
@@ -239,3 +246,312 @@ def test_flashcard_review_with_notes(authenticated_client, user):
     flashcard.refresh_from_db()
     assert flashcard.front_notes == 'Need to study this concept more'  # Front notes should be unchanged
     assert flashcard.back_notes == 'Good explanation, remember the example'
+
+def test_next_review_prefers_overdue_over_unreviewed(authenticated_client, user):
+    deck = DeckFactory(owner=user)
+    unreviewed = FlashcardFactory(user=user, decks=[deck])
+    overdue = FlashcardFactory(
+        user=user,
+        decks=[deck],
+        front_last_review=timezone.now() - timedelta(days=2),
+        front_interval=60,
+        back_last_review=timezone.now(),
+        back_interval=60 * 24,
+    )
+
+    url = reverse('main:api-flashcard-next-review', kwargs={'deck_pk': deck.id})
+    response = authenticated_client.get(url, {'reviewSide': 'either'})
+
+    assert response.status_code == 200
+    html = response.json()['html']
+    assert f'data-flashcard-id="{overdue.id}"' in html
+    assert 'data-flashcard-side="front"' in html
+    assert str(unreviewed.id) not in html
+
+def test_next_review_respects_review_side(authenticated_client, user):
+    deck = DeckFactory(owner=user)
+    card = FlashcardFactory(
+        user=user,
+        decks=[deck],
+        front_last_review=timezone.now(),
+        front_interval=60 * 24,
+    )
+
+    url = reverse('main:api-flashcard-next-review', kwargs={'deck_pk': deck.id})
+
+    response = authenticated_client.get(url, {'reviewSide': 'front'})
+    assert 'No cards due for review!' in response.json()['html']
+
+    response = authenticated_client.get(url, {'reviewSide': 'back'})
+    html = response.json()['html']
+    assert f'data-flashcard-id="{card.id}"' in html
+    assert 'data-flashcard-side="back"' in html
+
+def test_update_review_keeps_due_at_in_sync(user):
+    card = FlashcardFactory(user=user)
+    assert card.front_due_at is None
+
+    card.update_review(ReviewStatus.EASY, 'front')
+    card.refresh_from_db()
+
+    assert card.front_due_at == card.front_last_review + timedelta(minutes=card.front_interval)
+    assert card.back_due_at is None
+
+def test_flashcard_bulk_create(authenticated_client, user):
+    deck = DeckFactory(owner=user)
+    create_data = [
+        {'front': f'Question {i}', 'back': f'Answer {i}', 'tags': ['bulk'], 'decks': [str(deck.id)]}
+        for i in range(10)
+    ]
+
+    url = reverse('main:api-flashcard-list', kwargs={'deck_pk': deck.id})
+    with CaptureQueriesContext(connection) as queries:
+        response = authenticated_client.post(url, data=json.dumps(create_data), content_type='application/json')
+
+    # One insert for the cards and one for the deck links
+    inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+    assert len(inserts) == 2
+
+    assert response.status_code == 201
+    assert len(response.json()['data']) == 10
+    assert response.json()['html'].count('flashcard-preview') == 10
+    assert deck.flashcards.count() == 10
+    assert set(deck.flashcards.values_list('user', flat=True)) == {user.id}
+
+def test_flashcard_bulk_create_with_repeated_deck(authenticated_client, user):
+    deck = DeckFactory(owner=user)
+    create_data = [{'front': 'Question', 'back': 'Answer', 'decks': [str(deck.id), str(deck.id)]}]
+
+    url = reverse('main:api-flashcard-list', kwargs={'deck_pk': deck.id})
+    response = authenticated_client.post(url, data=json.dumps(create_data), content_type='application/json')
+
+    assert response.status_code == 201
+    assert deck.flashcards.count() == 1
+    assert list(deck.flashcards.get().decks.all()) == [deck]
+
+def test_save_flashcards_in_one_batch(user, django_assert_num_queries):
+    deck = DeckFactory(owner=user)
+    cards = [
+        {'question': f'Question {i}', 'suggested_answer': f'Answer {i}', 'category': 'Technical'}
+        for i in range(25)
+    ]
+
+    # Savepoint, card insert, through-row insert, savepoint release
+    with django_assert_num_queries(4):
+        created = deck.save_flashcards(cards)
+
+    assert len(created) == 25
+    assert deck.flashcards.filter(tags__contains=['auto-generated']).count() == 25
+
+def test_update_review_writes_only_that_side(user):
+    card = FlashcardFactory(user=user)
+    FlashCard.objects.filter(pk=card.pk).update(front='Changed elsewhere', back_interval=99)
+
+    with CaptureQueriesContext(connection) as queries:
+        card.update_review(ReviewStatus.HARD, 'front', notes='Tricky')
+
+    update, = queries.captured_queries
+    assert '"back_interval"' not in update['sql'] and '"front" =' not in update['sql']
+    card.refresh_from_db()
+    assert card.front == 'Changed elsewhere'
+    assert card.back_interval == 99
+    assert (card.front_review_count, card.front_notes) == (1, 'Tricky')
+
+def test_reset_and_replay_schedule_in_bulk(user, django_assert_num_queries):
+    deck = DeckFactory(owner=user)
+    cards = [FlashcardFactory(user=user, decks=[deck]) for _ in range(3)]
+    for card in cards:
+        card.update_review(ReviewStatus.EASY, 'front')
+
+    with django_assert_num_queries(1):
+        assert deck.flashcards.reset_schedule(sides=['front']) == 3
+    assert not deck.flashcards.filter(front_due_at__isnull=False).exists()
+    assert set(deck.flashcards.values_list('front_review_count', flat=True)) == {0}
+
+    # Replay needs one query to read the cards and one to write them back
+    FlashCard.objects.filter(pk=cards[0].pk).update(front_last_review=timezone.now())
+    histories = {cards[0].pk: ['easy', 'easy', 'easy']}
+    with django_assert_num_queries(2):
+        deck.flashcards.replay_schedule(histories, side='front')
+
+    replayed = FlashCard.objects.get(pk=cards[0].pk)
+    assert (replayed.front_repetitions, replayed.front_interval) == (3, 15)
+    assert replayed.front_due_at == replayed.front_last_review + timedelta(minutes=15)
+    assert FlashCard.objects.get(pk=cards[1].pk).front_repetitions == 0
+
+def test_review_batch_applies_reviews_in_time_order(authenticated_client, user):
+    deck = DeckFactory(owner=user)
+    first, second = FlashcardFactory(user=user, decks=[deck]), FlashcardFactory(user=user, decks=[deck])
+    other_user_card = FlashcardFactory()
+    start = timezone.now() - timedelta(hours=1)
+    reviews = [
+        # Sent out of order, the forgot has to be applied last
+        {'card_id': str(first.id), 'side': 'front', 'status': 'forgot', 'reviewed_at': (start + timedelta(minutes=20)).isoformat()},
+        {'card_id': str(first.id), 'side': 'front', 'status': 'easy', 'reviewed_at': start.isoformat(), 'latency_ms': 900},
+        {'card_id': str(first.id), 'side': 'front', 'status': 'easy', 'reviewed_at': (start + timedelta(minutes=10)).isoformat()},
+        {'card_id': str(second.id), 'side': 'back', 'status': 'hard', 'notes': 'Slow recall'},
+        {'card_id': str(other_user_card.id), 'side': 'front', 'status': 'easy'},
+    ]
+
+    url = reverse('main:api-flashcard-review-batch', kwargs={'deck_pk': deck.id})
+    with CaptureQueriesContext(connection) as queries:
+        response = authenticated_client.post(url, data=json.dumps(reviews), content_type='application/json')
+
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(data['updated_card_ids']) == sorted([str(first.id), str(second.id)])
+    assert data['missing_card_ids'] == [str(other_user_card.id)]
+    assert 'previews' not in data
+
+    # One SELECT for the cards and one UPDATE for all of them
+    card_queries = [q['sql'] for q in queries.captured_queries if '"main_flashcard"' in q['sql'] and 'INSERT' not in q['sql']]
+    assert [sql.split()[0] for sql in card_queries] == ['SELECT', 'UPDATE']
+
+    first.refresh_from_db()
+    assert (first.front_review_count, first.front_repetitions, first.front_interval) == (3, 0, 1)
+    assert first.front_last_review == start + timedelta(minutes=20)
+    assert first.front_due_at == first.front_last_review + timedelta(minutes=1)
+    second.refresh_from_db()
+    assert (second.back_review_count, second.back_notes) == (1, 'Slow recall')
+    assert second.front_review_count == 0
+    assert list(first.review_events.order_by('reviewed_at').values_list('status', 'latency_ms')) == [(2, 900), (2, None), (0, None)]
+
+def test_review_batch_skips_reviews_older_than_the_last(authenticated_client, user):
+    deck = DeckFactory(owner=user)
+    card = FlashcardFactory(user=user, decks=[deck])
+    reviewed_at = timezone.now() - timedelta(minutes=5)
+    url = reverse('main:api-flashcard-review-batch', kwargs={'deck_pk': deck.id})
+    authenticated_client.post(url, data=json.dumps([
+        {'card_id': str(card.id), 'side': 'front', 'status': 'easy', 'reviewed_at': reviewed_at.isoformat()},
+    ]), content_type='application/json')
+    card.refresh_from_db()
+    state = (card.front_review_count, card.front_repetitions, card.front_interval, card.front_due_at)
+
+    # A review queued offline before the one already applied, and a resend of that one
+    response = authenticated_client.post(url, data=json.dumps([
+        {'card_id': str(card.id), 'side': 'front', 'status': 'forgot', 'reviewed_at': (reviewed_at - timedelta(minutes=1)).isoformat()},
+        {'card_id': str(card.id), 'side': 'front', 'status': 'easy', 'reviewed_at': reviewed_at.isoformat()},
+    ]), content_type='application/json')
+
+    assert response.json()['updated_card_ids'] == []
+    assert response.json()['stale_card_ids'] == [str(card.id), str(card.id)]
+    card.refresh_from_db()
+    assert (card.front_review_count, card.front_repetitions, card.front_interval, card.front_due_at) == state
+    assert card.front_last_review == reviewed_at
+
+def test_review_batch_returns_previews_and_rejects_bad_items(authenticated_client, user):
+    deck = DeckFactory(owner=user)
+    card = FlashcardFactory(user=user, decks=[deck])
+    url = reverse('main:api-flashcard-review-batch', kwargs={'deck_pk': deck.id})
+
+    response = authenticated_client.post(f'{url}?previews=true', data=json.dumps([
+        {'card_id': str(card.id), 'side': 'front', 'status': 'easy'},
+    ]), content_type='application/json')
+    assert 'flashcard-preview' in response.json()['previews'][str(card.id)]
+
+    response = authenticated_client.post(url, data=json.dumps([
+        {'card_id': str(card.id), 'side': 'middle', 'status': 'easy'},
+    ]), content_type='application/json')
+    assert response.status_code == 400
+    card.refresh_from_db()
+    assert card.front_review_count == 1
+
+def test_flashcard_list_pages_by_keyset(authenticated_client, user):
+    deck = DeckFactory(owner=user)
+    now = timezone.now()
+    cards = [FlashcardFactory(user=user, decks=[deck]) for _ in range(7)]
+    # Mix reviewed and never-reviewed cards, with ties, so every null and tiebreak branch is used
+    FlashCard.objects.filter(pk__in=[cards[0].pk, cards[1].pk]).update(front_last_review=now)
+    FlashCard.objects.filter(pk=cards[2].pk).update(front_last_review=now - timedelta(hours=1), back_last_review=now)
+    FlashCard.objects.filter(pk=cards[3].pk).update(back_last_review=now)
+    expected = [str(pk) for pk in FlashCard.objects.filter(decks=deck).in_preview_order().values_list('id', flat=True)]
+
+    url = reverse('main:api-flashcard-list', kwargs={'deck_pk': deck.id})
+    seen, cursor = [], None
+    while True:
+        params = {'page_size': 3, **({'cursor': cursor} if cursor else {})}
+        data = authenticated_client.get(url, params).json()
+        assert len(data['data']) <= 3
+        assert data['html'].count('flashcard-preview') == len(data['data'])
+        seen += [card['id'] for card in data['data']]
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == expected
+    assert authenticated_client.get(url, {'cursor': 'garbage'}).status_code == 400
+
+def test_deck_detail_renders_first_page_only(authenticated_client, user, settings):
+    settings.FLASHCARD_PAGE_SIZE = 2
+    deck = DeckFactory(owner=user)
+    for _ in range(3):
+        FlashcardFactory(user=user, decks=[deck])
+
+    response = authenticated_client.get(reverse('main:deck_detail', kwargs={'url_path': deck.tutor.url_path, 'pk': deck.id}))
+
+    assert response.status_code == 200
+    assert len(response.context['flashcards']) == 2
+    assert response.context['next_page_cursor']
+
+def test_preview_cache_serves_unchanged_cards(authenticated_client, user):
+    reset_preview_cache_stats()
+    deck = DeckFactory(owner=user)
+    cards = [FlashcardFactory(user=user, decks=[deck]) for _ in range(3)]
+    url = reverse('main:api-flashcard-list', kwargs={'deck_pk': deck.id})
+
+    first = authenticated_client.get(url).json()['html']
+    assert preview_cache_stats()['misses'] == 3
+
+    # Reviewing a card re-renders only that card's preview
+    authenticated_client.post(
+        reverse('main:api-flashcard-review', kwargs={'deck_pk': deck.id, 'pk': cards[0].id}),
+        data=json.dumps({'status': 'easy', 'side': 'front'}), content_type='application/json'
+    )
+    reset_preview_cache_stats()
+    second = authenticated_client.get(url).json()['html']
+
+    assert preview_cache_stats() == {'hits': 3, 'misses': 0, 'hit_rate': 1.0}
+    assert second != first
+    assert second == ''.join(
+        render_to_string('main/_flashcard_preview.html', {'flashcard': card})
+        for card in FlashCard.objects.filter(decks=deck).in_preview_order()
+    )
+
+def test_preview_cache_rerenders_when_card_becomes_due(user):
+    card = FlashcardFactory(user=user)
+    card.update_review(ReviewStatus.EASY, 'front')
+    card.update_review(ReviewStatus.EASY, 'back')
+    assert 'bg-success' in render_preview(card)
+
+    # No write happens as time passes, the due status alone changes the preview
+    with patch('main.models.timezone.now', return_value=timezone.now() + timedelta(days=1)):
+        assert 'bg-warning' in render_preview(card)
+
+def test_flashcard_list_conditional_get(authenticated_client, user):
+    deck = DeckFactory(owner=user)
+    card = FlashcardFactory(user=user, decks=[deck])
+    url = reverse('main:api-flashcard-list', kwargs={'deck_pk': deck.id})
+
+    response = authenticated_client.get(url)
+    etag, last_modified = response['ETag'], response['Last-Modified']
+    assert 'no-cache' in response['Cache-Control']
+
+    # Nothing changed, so nothing is serialized or rendered
+    with patch('main.views.flashcard_views.render_previews') as render:
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert authenticated_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+    render.assert_not_called()
+
+    # A review changes the list
+    card.update_review(ReviewStatus.EASY, 'front')
+    response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    etag = response['ETag']
+
+    # So does the card falling due, though nothing is written
+    with patch('main.conditional.timezone.now', return_value=timezone.now() + timedelta(days=1)):
+        assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    # And so does a deletion
+    card.delete()
+    assert authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
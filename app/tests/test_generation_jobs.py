@@ -0,0 +1,180 @@
+import pytest
+import json
+import threading
+from unittest.mock import patch
+from django.utils import timezone
+from .factories import UserFactory, DeckFactory
+from .test_decks import streamed, tutor_config
+from main.models import GenerationJob, Tutor, FlashCard
+
+pytestmark = pytest.mark.django_db
+
+CARDS = [
+    {"question": "What is a queue?", "category": "Technical", "suggested_answer": "FIFO"},
+]
+
+@pytest.fixture
+def deck():
+    return DeckFactory(owner=UserFactory(), content="MY RESUME")
+
+def test_enqueue_reuses_pending_job(deck):
+    job = GenerationJob.enqueue(deck)
+    assert GenerationJob.enqueue(deck) == job
+
+    # Once a job is running, new content gets a fresh job
+    GenerationJob.claim_next()
+    assert GenerationJob.enqueue(deck) != job
+
+def test_run_pending_saves_cards(deck):
+    GenerationJob.enqueue(deck)
+
+    with patch.object(Tutor, 'get_config', return_value=tutor_config()):
+        with patch('main.models.stream_openai', side_effect=streamed(CARDS)):
+            job, = GenerationJob.run_pending()
+
+    assert job.status == GenerationJob.Status.SUCCEEDED
+    assert job.created_count == 1
+    assert job.finished_at is not None
+    assert deck.flashcards.get().front == "What is a queue?"
+
+def test_failed_job_retries_with_backoff_then_fails(deck, settings):
+    settings.GENERATION_JOB_RETRY_DELAY = 0
+    job = GenerationJob.enqueue(deck)
+    job.max_attempts = 2
+    job.save()
+
+    with patch.object(Tutor, 'get_config', return_value=tutor_config()):
+        with patch('main.models.stream_openai', side_effect=Exception('API Error')):
+            jobs = GenerationJob.run_pending()
+
+    assert [j.status for j in jobs] == [GenerationJob.Status.PENDING, GenerationJob.Status.FAILED]
+    job.refresh_from_db()
+    assert job.attempts == 2
+    assert job.error == 'API Error'
+    assert deck.flashcards.count() == 0
+
+def test_retry_waits_for_run_after(deck):
+    job = GenerationJob.enqueue(deck)
+    job.run_after = timezone.now() + timezone.timedelta(minutes=5)
+    job.save()
+
+    assert GenerationJob.claim_next() is None
+
+def test_reclaimed_attempt_is_discarded(deck):
+    GenerationJob.enqueue(deck)
+    job = GenerationJob.claim_next()
+
+    # Another worker reclaims the job while this attempt is still generating
+    GenerationJob.objects.filter(pk=job.pk).update(attempts=job.attempts + 1)
+
+    with patch.object(Tutor, 'get_config', return_value=tutor_config()):
+        with patch('main.models.stream_openai', side_effect=streamed(CARDS)):
+            job.run()
+
+    assert FlashCard.objects.count() == 0
+    assert GenerationJob.objects.get(pk=job.pk).status == GenerationJob.Status.RUNNING
+
+def test_stale_running_job_is_reclaimed(deck, settings):
+    settings.GENERATION_JOB_TIMEOUT = 60
+    GenerationJob.enqueue(deck)
+    job = GenerationJob.claim_next()
+    GenerationJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timezone.timedelta(minutes=5))
+
+    reclaimed = GenerationJob.claim_next()
+    assert reclaimed == job
+    assert reclaimed.attempts == 2
+
+def test_stale_job_out_of_attempts_is_failed(deck, settings):
+    settings.GENERATION_JOB_TIMEOUT = 60
+    GenerationJob.enqueue(deck)
+    job = GenerationJob.claim_next()
+    GenerationJob.objects.filter(pk=job.pk).update(
+        attempts=job.max_attempts, started_at=timezone.now() - timezone.timedelta(minutes=5)
+    )
+
+    assert GenerationJob.claim_next() is None
+    job.refresh_from_db()
+    assert job.status == GenerationJob.Status.FAILED
+    assert job.finished_at is not None
+    assert 'Timed out' in job.error
+
+def test_stream_flashcards_fans_out_chunks_and_dedupes(settings):
+    settings.FLASHCARD_GENERATION_CHUNK_TOKENS = 10
+    # One chunk at a time, so the first chunk's question is the one kept
+    settings.FLASHCARD_GENERATION_CONCURRENCY = 1
+    deck = DeckFactory(owner=UserFactory(), content="First paragraph of the resume\n\nSecond paragraph of the resume")
+    duplicate = dict(CARDS[0], question="What is a QUEUE")
+
+    with patch.object(Tutor, 'get_config', return_value=tutor_config()):
+        responses = lambda system, user, **kwargs: iter([json.dumps(CARDS if "First paragraph" in user else [duplicate])])
+        with patch('main.models.stream_openai', side_effect=responses) as mock_openai:
+            cards = list(deck.stream_flashcards())
+
+    assert mock_openai.call_count == 2
+    prompts = sorted(call.args[1] for call in mock_openai.call_args_list)
+    assert "First paragraph" in prompts[0] and "Second paragraph" not in prompts[0]
+    assert cards == CARDS
+
+def test_partial_chunk_failure_fails_the_job(settings):
+    settings.FLASHCARD_GENERATION_CHUNK_TOKENS = 10
+    settings.FLASHCARD_GENERATION_CONCURRENCY = 1
+    deck = DeckFactory(owner=UserFactory(), content="First paragraph of the resume\n\nSecond paragraph of the resume")
+    GenerationJob.enqueue(deck)
+
+    with patch.object(Tutor, 'get_config', return_value=tutor_config()):
+        with patch('main.models.stream_openai', side_effect=[Exception('API Error'), iter([json.dumps(CARDS)])]):
+            with pytest.raises(Exception, match='API Error'):
+                list(deck.stream_flashcards())
+
+        with patch('main.models.stream_openai', side_effect=[iter([json.dumps(CARDS)]), Exception('API Error')]):
+            job = GenerationJob.claim_next().run()
+
+        # Cards from the chunk that finished are kept, and the job goes back for a retry
+        assert job.status == GenerationJob.Status.PENDING
+        assert job.error == 'API Error'
+        assert job.created_count == 1
+
+        # The retry doesn't save the same question again
+        GenerationJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with patch('main.models.stream_openai', side_effect=streamed(CARDS)):
+            job = GenerationJob.claim_next().run()
+
+    assert job.status == GenerationJob.Status.SUCCEEDED
+    assert job.created_count == 1
+    assert list(deck.flashcards.values_list('front', flat=True)) == ["What is a queue?"]
+
+def test_stream_flashcards_yields_cards_as_they_arrive(deck):
+    deltas = ['[{"question": "What is a queue?", "category": "Technical", ', '"suggested_answer": "FIFO"}, ',
+              '{"question": "What is a QUEUE"}, {"question": "What is a stack?"}]']
+    rest_of_response = threading.Event()
+
+    def stream(*args, **kwargs):
+        yield from deltas[:2]
+        rest_of_response.wait(5)
+        yield deltas[2]
+
+    with patch.object(Tutor, 'get_config', return_value=tutor_config()):
+        with patch('main.models.stream_openai', side_effect=stream):
+            cards = deck.stream_flashcards()
+            # The first card is ready before the rest of the response arrives
+            assert next(cards) == CARDS[0]
+            rest_of_response.set()
+            received = [CARDS[0], *cards]
+
+    assert [card['question'] for card in received] == ["What is a queue?", "What is a stack?"]
+
+def test_job_pushes_each_card_as_it_streams_in(deck):
+    GenerationJob.enqueue(deck)
+    job = GenerationJob.claim_next()
+    cards = [CARDS[0], dict(CARDS[0], question="What is a stack?")]
+
+    with patch.object(Tutor, 'get_config', return_value=tutor_config()):
+        with patch('main.models.stream_openai', side_effect=streamed(cards)):
+            with patch('main.models.progress.publish_flashcards') as publish:
+                job = job.run()
+
+    assert job.status == GenerationJob.Status.SUCCEEDED
+    assert job.created_count == 2
+    assert [[card.front for card in call.args[1]] for call in publish.call_args_list] == [
+        ["What is a queue?"], ["What is a stack?"],
+    ]
@@ -0,0 +1,55 @@
+import json
+import pytest
+from unittest.mock import patch
+from main.models import FlashCard, Tutor
+from main.near_duplicates import NearDuplicateIndex, question_buckets, question_words, similarity
+from .factories import UserFactory, DeckFactory, FlashcardFactory
+from .test_decks import tutor_config
+
+def card(question):
+    return {'question': question, 'category': 'Technical', 'suggested_answer': 'An answer'}
+
+def test_paraphrased_questions_share_buckets():
+    first, second = 'Tell me about a challenging project you worked on?', 'Describe a challenging project you have worked on.'
+
+    assert similarity(question_words(first), question_words(second)) == 1.0
+    assert question_buckets(first) == question_buckets(second)
+    assert not set(question_buckets('What is a stack?')) & set(question_buckets('What is a queue?'))
+
+def test_index_finds_only_close_questions():
+    index = NearDuplicateIndex(threshold=0.6)
+    index.add('What are queues?')
+
+    assert index.find('What is a queue?') == 'What are queues?'
+    assert index.find('Implement a queue using two stacks') is None
+
+@pytest.mark.django_db
+def test_buckets_follow_question_edits():
+    flashcard = FlashcardFactory(front='What is a queue?')
+    assert flashcard.front_buckets == question_buckets('What is a queue?')
+
+    flashcard.front = 'What is a stack?'
+    flashcard.save(update_fields=['front'])
+    flashcard.refresh_from_db()
+    assert flashcard.front_buckets == question_buckets('What is a stack?')
+
+@pytest.mark.django_db
+def test_generated_cards_skip_near_duplicates_of_the_deck(django_assert_num_queries):
+    deck = DeckFactory(owner=UserFactory(), content='My resume')
+    FlashcardFactory(user=deck.owner, decks=[deck], front='Tell me about a challenging project you worked on?')
+    FlashcardFactory(user=deck.owner, front='What is a queue?')  # another deck
+    generated = [
+        card('Describe a challenging project you have worked on.'),
+        card('What is a queue?'),
+        card('What are queues?'),
+    ]
+
+    with django_assert_num_queries(1):
+        kept = deck.drop_near_duplicates(generated)
+    assert [c['question'] for c in kept] == ['What is a queue?']
+
+    with patch.object(Tutor, 'get_config', return_value=tutor_config()):
+        with patch('main.models.stream_openai', return_value=iter([json.dumps(generated)])):
+            created = deck.save_flashcards(list(deck.stream_flashcards()))
+    assert [c.front for c in created] == ['What is a queue?']
+    assert FlashCard.objects.filter(decks=deck).sharing_buckets(question_buckets('What are queues?')).count() == 1
@@ -0,0 +1,87 @@
+import json
+import time
+import pytest
+from datetime import datetime, timezone as dt_timezone
+from django.db import connection
+from django.urls import reverse
+from main.models import ReviewEvent, ReviewStatus
+from main.review_events import ReviewEventWriter, ensure_review_event_partitions
+from .factories import UserFactory, DeckFactory, FlashcardFactory
+
+@pytest.fixture
+def card():
+    user = UserFactory()
+    return FlashcardFactory(user=user, decks=[DeckFactory(owner=user)])
+
+@pytest.mark.django_db
+def test_review_endpoint_logs_event(client, card):
+    client.force_login(card.user)
+    url = reverse('main:api-flashcard-review', kwargs={'deck_pk': card.decks.first().id, 'pk': card.id})
+
+    response = client.post(url, data=json.dumps({'status': 'hard', 'side': 'back', 'latency_ms': 4200}), content_type='application/json')
+
+    assert response.status_code == 200
+    event = ReviewEvent.objects.get()
+    assert (event.card, event.user) == (card, card.user)
+    assert (event.side, event.status) == (ReviewEvent.Side.BACK, ReviewEvent.Status.HARD)
+    assert (event.ef_before, event.ef_after) == (250, 235)
+    assert (event.interval_before, event.interval_after) == (1, 1)
+    assert event.latency_ms == 4200
+    card.refresh_from_db()
+    assert event.reviewed_at == card.back_last_review
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='Partitioning is Postgres only')
+def test_review_events_are_routed_to_monthly_partitions(card):
+    now = datetime(2031, 5, 17, tzinfo=dt_timezone.utc)
+    assert ensure_review_event_partitions(months_ahead=1, now=now) == ['main_reviewevent_p203105', 'main_reviewevent_p203106']
+    assert ensure_review_event_partitions(months_ahead=1, now=now) == []
+
+    card.update_review(ReviewStatus.EASY).save()
+    event = card.update_review(ReviewStatus.EASY)
+    event.reviewed_at = now
+    event.save()
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT tableoid::regclass::text FROM main_reviewevent ORDER BY reviewed_at')
+        assert [row[0] for row in cursor.fetchall()] == ['main_reviewevent_default', 'main_reviewevent_p203105']
+
+@pytest.mark.django_db
+def test_events_in_the_default_partition_move_into_their_new_month(card):
+    now = datetime(2032, 2, 10, tzinfo=dt_timezone.utc)
+    event = card.update_review(ReviewStatus.EASY)
+    event.reviewed_at = now
+    event.save()
+
+    assert ensure_review_event_partitions(months_ahead=0, now=now) == ['main_reviewevent_p203202']
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT tableoid::regclass::text FROM main_reviewevent WHERE id = %s', [event.id])
+        assert cursor.fetchone()[0] == 'main_reviewevent_p203202'
+        cursor.execute("SELECT count(*) FROM pg_inherits WHERE inhrelid = 'main_reviewevent_default'::regclass")
+        assert cursor.fetchone()[0] == 1
+
+@pytest.mark.django_db(transaction=True)
+def test_writer_batches_events_off_the_request_path(card, settings, django_assert_num_queries):
+    settings.REVIEW_EVENT_ASYNC = True
+    settings.REVIEW_EVENT_BATCH_SIZE = 3
+    settings.REVIEW_EVENT_FLUSH_INTERVAL = 60
+    writer = ReviewEventWriter()
+    try:
+        events = [card.update_review(ReviewStatus.EASY) for _ in range(3)]
+
+        # Recording only touches the in-memory buffer
+        with django_assert_num_queries(0):
+            for event in events[:2]:
+                writer.record(event)
+        assert writer.pending() == 2
+
+        # A full batch wakes the background thread without waiting for the interval
+        writer.record(events[2])
+        deadline = time.monotonic() + 5
+        while ReviewEvent.objects.count() < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert ReviewEvent.objects.count() == 3
+        assert writer.written == 3
+    finally:
+        writer.stop()
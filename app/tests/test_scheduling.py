@@ -0,0 +1,50 @@
+import random
+import numpy as np
+from main import scheduling
+from main.scheduling import SideState, SM2Params, review, review_many, replay
+
+def test_review_follows_sm2():
+    state = scheduling.initial_state()
+
+    state = review(state, 'easy')
+    assert state == SideState(2.5, 1, 1)
+    state = review(state, 'hard')
+    assert state == SideState(2.35, 2, 6)
+    state = review(state, 'easy')
+    assert state == SideState(2.5, 3, 15)
+
+    # Forgetting resets progress and lowers the easiness factor
+    state = review(state, 'forgot')
+    assert state == SideState(2.2, 0, 1)
+
+def test_easiness_factor_is_clamped():
+    assert review(SideState(1.35, 4, 20), 'hard').easiness_factor == 1.3
+    assert review(SideState(1.4, 4, 20), 'forgot').easiness_factor == 1.3
+    assert review(SideState(2.45, 4, 20), 'easy').easiness_factor == 2.5
+
+def test_review_many_matches_review():
+    rng = random.Random(42)
+    states = [SideState(rng.uniform(1.3, 2.5), rng.randint(0, 6), rng.randint(1, 5000)) for _ in range(200)]
+    statuses = [rng.choice(['forgot', 'hard', 'easy', None]) for _ in states]
+
+    ef, reps, interval = review_many(
+        [s.easiness_factor for s in states],
+        [s.repetitions for s in states],
+        [s.interval for s in states],
+        [scheduling.GRADES.get(status, scheduling.NO_REVIEW) for status in statuses],
+    )
+
+    for i, (state, status) in enumerate(zip(states, statuses)):
+        expected = review(state, status) if status else state
+        assert np.isclose(ef[i], expected.easiness_factor)
+        assert (reps[i], interval[i]) == (expected.repetitions, expected.interval)
+
+def test_replay_rebuilds_schedules_under_new_params():
+    histories = [['easy', 'easy', 'easy'], ['easy', 'forgot'], []]
+
+    ef, reps, interval = replay(histories)
+    assert interval.tolist() == [15, 1, 1]
+    assert reps.tolist() == [3, 0, 0]
+
+    ef, reps, interval = replay(histories, SM2Params(second_interval=10))
+    assert interval.tolist() == [25, 1, 1]
@@ -0,0 +1,90 @@
+import json
+import pytest
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from django.test import Client, AsyncClient
+from django.urls import reverse
+from .factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+URL = reverse('main:text-ai-response-list')
+
+@pytest.fixture
+def client(client):
+    client.force_login(UserFactory())
+    return client
+
+def parse_events(body):
+    events = []
+    for raw in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in raw.split('\n'))
+        events.append((lines.get('event', 'message'), json.loads(lines['data'])))
+    return events
+
+def test_text_ai_response_requires_prompts(client):
+    response = client.post(URL, {'developer_prompt': 'Parse this'}, content_type='application/json')
+    assert response.status_code == 422
+
+def test_text_ai_response_returns_whole_completion(client):
+    # Under WSGI the pooled sync client is used rather than an async client per request loop
+    with patch('main.view_text_ai_response.call_openai', return_value='Parsed') as mock_openai:
+        response = client.post(URL, {'developer_prompt': 'Parse this', 'user_prompt': 'Doc'}, content_type='application/json')
+
+    assert response.status_code == 201
+    assert response.json() == {'response': 'Parsed'}
+    assert mock_openai.call_args.kwargs == {'cache': False, 'refresh': False}
+
+def test_text_ai_response_awaits_completion_under_asgi():
+    client = AsyncClient()
+    client.force_login(UserFactory())
+
+    with patch('main.view_text_ai_response.acall_openai', return_value='Parsed') as mock_openai:
+        response = async_to_sync(client.post)(URL, {'developer_prompt': 'Parse this', 'user_prompt': 'Doc'}, content_type='application/json')
+
+    assert response.json() == {'response': 'Parsed'}
+    mock_openai.assert_awaited_once()
+
+def test_text_ai_response_streams_server_sent_events(client):
+    with patch('main.view_text_ai_response.stream_openai', return_value=iter(['Par', 'sed'])):
+        response = client.post(URL, {'developer_prompt': 'Parse this', 'user_prompt': 'Doc', 'stream': True}, content_type='application/json')
+        body = b''.join(response.streaming_content).decode()
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/event-stream'
+    assert response['Cache-Control'] == 'no-cache'
+    assert parse_events(body) == [('message', {'delta': 'Par'}), ('message', {'delta': 'sed'}), ('done', {})]
+
+def test_text_ai_response_stream_reports_errors(client):
+    def failing_stream(*args):
+        yield 'Par'
+        raise Exception('API Error')
+
+    with patch('main.view_text_ai_response.stream_openai', side_effect=failing_stream):
+        response = client.post(URL, {'developer_prompt': 'Parse this', 'user_prompt': 'Doc', 'stream': True}, content_type='application/json')
+        body = b''.join(response.streaming_content).decode()
+
+    assert parse_events(body) == [('message', {'delta': 'Par'}), ('error', {'error': 'Failed to generate a response'})]
+
+def test_text_ai_response_requires_login():
+    response = Client().post(URL, {'developer_prompt': 'Parse this', 'user_prompt': 'Doc'}, content_type='application/json')
+    assert response.status_code == 403
+
+def test_text_ai_response_streams_asynchronously_under_asgi():
+    client = AsyncClient()
+    client.force_login(UserFactory())
+
+    async def stream(*args):
+        for delta in ['Par', 'sed']:
+            yield delta
+
+    async def post():
+        response = await client.post(URL, {'developer_prompt': 'Parse this', 'user_prompt': 'Doc', 'stream': True}, content_type='application/json')
+        return response, b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    with patch('main.view_text_ai_response.astream_openai', side_effect=stream):
+        response, body = async_to_sync(post)()
+
+    # Served from an async iterator, so no thread is held while waiting on OpenAI
+    assert response.is_async
+    assert parse_events(body) == [('message', {'delta': 'Par'}), ('message', {'delta': 'sed'}), ('done', {})]
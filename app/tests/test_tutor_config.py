@@ -0,0 +1,67 @@
+import os
+import json
+import pytest
+import yaml
+from main.tutor_config import TutorConfigStore, FrozenDict, apply_overrides
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / 'tutor.yaml'
+    path.write_text(yaml.dump({
+        'url-path': 'test-tutor',
+        'prompts': {
+            'generate_flashcards': {'system': 'Base system', 'user': 'Base user'},
+            'review_card': 'Review it',
+        },
+        'tools': {'create_flashcard': {'type': 'function'}},
+        'prompt-override-whitelist': ['prompts.generate_flashcards.system'],
+    }))
+    return str(path)
+
+def test_store_parses_once_per_mtime(config_file):
+    store = TutorConfigStore()
+
+    first = store.get(config_file)
+    second = store.get(config_file)
+
+    assert first is second
+    assert store.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+    # Editing the file bumps the mtime and forces a re-parse
+    with open(config_file, 'a') as f:
+        f.write('name: Edited\n')
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    third = store.get(config_file)
+    assert third['name'] == 'Edited'
+    assert store.misses == 2
+
+def test_base_config_is_read_only(config_file):
+    config = TutorConfigStore().get(config_file)
+
+    assert isinstance(config, FrozenDict)
+    with pytest.raises(TypeError):
+        config['prompts']['review_card'] = 'Mutated'
+    with pytest.raises(TypeError):
+        config['prompts'].update({'review_card': 'Mutated'})
+
+    # Still serialises like a plain dict
+    assert json.loads(json.dumps(config))['prompt-override-whitelist'] == ['prompts.generate_flashcards.system']
+
+def test_overrides_are_copy_on_write(config_file):
+    base = TutorConfigStore().get(config_file)
+
+    config = apply_overrides(base, {
+        'prompts.generate_flashcards.system': 'Custom system',
+        'session.instructions': 'New branch',
+    })
+
+    assert config['prompts']['generate_flashcards']['system'] == 'Custom system'
+    assert config['prompts']['generate_flashcards']['user'] == 'Base user'
+    assert config['session']['instructions'] == 'New branch'
+
+    # The shared base is untouched and untouched branches are shared, not copied
+    assert base['prompts']['generate_flashcards']['system'] == 'Base system'
+    assert 'session' not in base
+    assert config['tools'] is base['tools']
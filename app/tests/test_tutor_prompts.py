@@ -5,7 +5,9 @@ import os
 from django.test import Client
 from django.urls import reverse
 from .factories import UserFactory, TutorFactory
+from django.core.cache import cache
 from main.models import TutorPromptOverride, Tutor
+from main.tutor_config import user_config_cache_key
 
 pytestmark = pytest.mark.django_db
 
@@ -101,6 +103,66 @@ def test_non_whitelisted_overrides_not_applied(tutor, user):
     assert config['prompts']['generate_flashcards']['system'] == 'Custom system prompt', \
         'Whitelisted override should be applied'
 
+def test_user_config_cached_with_one_version_query(tutor, user, django_assert_num_queries):
+    """Test that a per-process cached config is served after checking the overrides' version"""
+    TutorPromptOverride.objects.create(
+        user=user,
+        tutor_url_path=tutor.url_path,
+        key='prompts.generate_flashcards.system',
+        value='Custom system prompt'
+    )
+    tutor.get_config(user)
+
+    with django_assert_num_queries(1):
+        config = tutor.get_config(user)
+    assert config['prompts']['generate_flashcards']['system'] == 'Custom system prompt'
+
+def test_user_config_cached_without_queries_in_shared_cache(tutor, user, monkeypatch, django_assert_num_queries):
+    """Test that a config in a shared cache is served with no queries, relying on signals to invalidate it"""
+    monkeypatch.setattr('main.models.user_config_cache_is_shared', lambda: True)
+    TutorPromptOverride.objects.create(
+        user=user,
+        tutor_url_path=tutor.url_path,
+        key='prompts.generate_flashcards.system',
+        value='Custom system prompt'
+    )
+    tutor.get_config(user)
+
+    with django_assert_num_queries(0):
+        config = tutor.get_config(user)
+    assert config['prompts']['generate_flashcards']['system'] == 'Custom system prompt'
+
+    TutorPromptOverride.objects.filter(user=user).first().delete()
+    assert tutor.get_config(user)['prompts']['generate_flashcards']['system'] == 'You are a helpful flashcard generator'
+
+def test_override_written_by_another_worker_is_seen(tutor, user):
+    """Test that a stale cache entry, e.g. in another worker's local memory, isn't served"""
+    tutor.get_config(user)
+    stale = cache.get(user_config_cache_key(tutor.url_path, user.pk))
+
+    TutorPromptOverride.objects.create(
+        user=user,
+        tutor_url_path=tutor.url_path,
+        key='prompts.generate_flashcards.system',
+        value='Custom system prompt'
+    )
+    cache.set(user_config_cache_key(tutor.url_path, user.pk), stale)
+
+    assert tutor.get_config(user)['prompts']['generate_flashcards']['system'] == 'Custom system prompt'
+
+def test_override_writes_invalidate_cached_config(authenticated_client, tutor, user):
+    """Test that updating or reverting an override through the view is reflected immediately"""
+    assert tutor.get_config(user)['prompts']['generate_flashcards']['system'] == 'You are a helpful flashcard generator'
+
+    url = reverse('main:update_prompt_override', kwargs={'url_path': tutor.url_path})
+    response = authenticated_client.post(url, {'key': 'prompts.generate_flashcards.system', 'value': 'Updated prompt'})
+    assert response.json()['status'] == 'created'
+    assert tutor.get_config(user)['prompts']['generate_flashcards']['system'] == 'Updated prompt'
+
+    response = authenticated_client.post(url, {'key': 'prompts.generate_flashcards.system', 'value': ''})
+    assert response.json()['status'] == 'deleted'
+    assert tutor.get_config(user)['prompts']['generate_flashcards']['system'] == 'You are a helpful flashcard generator'
+
 def teardown_module(module):
     """Clean up any temporary files created during testing"""
     # Clean up any .yaml files in the temp directory
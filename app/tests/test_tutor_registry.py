@@ -0,0 +1,71 @@
+import pytest
+from django.test import RequestFactory
+from main.middleware import TutorMiddleware
+from main.models import Tutor
+from main.tutor_registry import tutor_registry
+from django.urls import reverse
+from .factories import TutorFactory, DeckFactory, UserFactory
+
+pytestmark = pytest.mark.django_db
+
+def attach_tutor(path):
+    request = RequestFactory().get(path)
+    TutorMiddleware(lambda request: None)(request)
+    return request
+
+def test_registry_loads_once_until_a_tutor_changes(django_assert_num_queries):
+    tutor = TutorFactory(url_path='interview-coach')
+    assert tutor_registry.get('interview-coach') == tutor
+
+    with django_assert_num_queries(0):
+        assert tutor_registry.get('interview-coach') == tutor
+        assert tutor_registry.get('missing') is None
+        assert tutor_registry.only() == tutor
+
+    # Saving any tutor makes the registry reload
+    other = TutorFactory(url_path='language-coach')
+    assert tutor_registry.get('language-coach') == other
+    assert tutor_registry.only() is None
+
+    other.delete()
+    assert tutor_registry.get('language-coach') is None
+
+def test_registry_sees_tutors_changed_by_other_processes(settings):
+    settings.TUTOR_REGISTRY_CHECK_INTERVAL = 0
+    tutor = TutorFactory(url_path='interview-coach')
+    assert tutor_registry.only() == tutor
+
+    # bulk_create skips the signal, like a save made in another worker
+    Tutor.objects.bulk_create([Tutor(name='Language Coach', deck_name='Phrases', url_path='language-coach')])
+
+    assert tutor_registry.get('language-coach').name == 'Language Coach'
+    assert tutor_registry.only() is None
+
+def test_middleware_attaches_tutor_lazily(django_assert_num_queries):
+    tutor = TutorFactory(url_path='interview-coach')
+    tutor_registry.get('interview-coach')
+
+    with django_assert_num_queries(0):
+        request = attach_tutor('/tutors/interview-coach/')
+        assert request.tutor == tutor
+        assert request.tutor.url_path == 'interview-coach'
+
+    # The single tutor is used when the URL has no tutor path, even for unknown URLs
+    assert attach_tutor('/no-such-page/x/y/').tutor == tutor
+
+def test_unknown_tutor_is_none(client):
+    TutorFactory(url_path='interview-coach')
+    assert attach_tutor('/tutors/nope/decks/').tutor is None
+
+    user = UserFactory()
+    client.force_login(user)
+    deck = DeckFactory(owner=user)
+    url = reverse('main:deck_detail', kwargs={'url_path': 'nope', 'pk': deck.pk})
+    assert client.get(url).status_code == 404
+    assert client.head(url).status_code == 404
+
+def test_middleware_skips_lookup_when_unused(django_assert_num_queries):
+    TutorFactory(url_path='interview-coach')
+
+    with django_assert_num_queries(0):
+        attach_tutor('/static/js/index.js')
@@ -0,0 +1,130 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from unittest.mock import patch
+from django.urls import reverse
+from .factories import UserFactory, TutorFactory
+from main.models import Tutor
+from main.voice_sessions import VoiceSessionBroker, voice_session_broker
+
+SESSION_CONFIG = {'model': 'gpt-4o-realtime-preview', 'voice': 'alloy'}
+
+
+class RealtimeStandIn(BaseHTTPRequestHandler):
+    """Answers POST /v1/realtime/sessions like OpenAI, counting requests and connections"""
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is observable
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append((self.headers['Authorization'], body))
+        if self.server.status != 200:
+            payload = json.dumps({'error': 'Nope'}).encode()
+        else:
+            payload = json.dumps({
+                **body,
+                'id': f'sess_{len(self.server.requests)}',
+                'client_secret': {'value': f'ek_{len(self.server.requests)}', 'expires_at': int(time.time()) + self.server.ttl},
+            }).encode()
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def realtime_server(settings):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RealtimeStandIn)
+    server.requests, server.connections, server.status, server.ttl = [], 0, 200, 60
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.OPENAI_REALTIME_SESSIONS_URL = f'http://127.0.0.1:{server.server_address[1]}/v1/realtime/sessions'
+    settings.OPENAI_API_KEY = 'sk-test'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'Timed out waiting'
+        time.sleep(0.01)
+
+
+def test_broker_reuses_one_connection(realtime_server):
+    broker = VoiceSessionBroker()
+
+    first = broker.get('test-tutor', SESSION_CONFIG)
+    second = broker.get('test-tutor', SESSION_CONFIG)
+
+    assert (first['client_secret']['value'], second['client_secret']['value']) == ('ek_1', 'ek_2')
+    assert realtime_server.requests[0] == ('Bearer sk-test', SESSION_CONFIG)
+    assert realtime_server.connections == 1
+    assert broker.stats() == {'hits': 0, 'misses': 2, 'minted': 2, 'pooled': 0}
+
+
+def test_prewarmed_session_is_served_from_the_pool(realtime_server, settings):
+    settings.VOICE_SESSION_POOL_SIZE = 1
+    broker = VoiceSessionBroker()
+
+    assert broker.prewarm('test-tutor', SESSION_CONFIG)
+    wait_for(lambda: broker.stats()['pooled'] == 1)
+    # The pool is full, so another hint doesn't mint again
+    assert not broker.prewarm('test-tutor', SESSION_CONFIG)
+
+    # A different config, e.g. another user's overrides, gets its own session
+    assert broker.get('test-tutor', {**SESSION_CONFIG, 'instructions': 'Be brief'})['client_secret']['value'] == 'ek_2'
+    assert broker.get('test-tutor', SESSION_CONFIG)['client_secret']['value'] == 'ek_1'
+    assert broker.stats() == {'hits': 1, 'misses': 1, 'minted': 2, 'pooled': 0}
+
+
+def test_expiring_sessions_are_not_served(realtime_server, settings):
+    settings.VOICE_SESSION_MIN_TTL = 15
+    realtime_server.ttl = 10
+    broker = VoiceSessionBroker()
+
+    broker.prewarm('test-tutor', SESSION_CONFIG)
+    wait_for(lambda: len(realtime_server.requests) == 1 and not broker._warming)
+
+    assert broker.get('test-tutor', SESSION_CONFIG)['client_secret']['value'] == 'ek_2'
+    assert broker.stats()['hits'] == 0
+
+
+def test_mint_errors_raise(realtime_server):
+    realtime_server.status = 401
+
+    with pytest.raises(requests.HTTPError):
+        VoiceSessionBroker().get('test-tutor', SESSION_CONFIG)
+
+
+@pytest.mark.django_db
+def test_session_view_serves_brokered_session(client, realtime_server, settings):
+    settings.VOICE_SESSION_PREWARM = True
+    voice_session_broker.clear()
+    tutor = TutorFactory()
+    client.force_login(UserFactory())
+    url = reverse('main:api-voice-chat-session', kwargs={'tutor_path': tutor.url_path})
+    config = {'session': SESSION_CONFIG, 'tools': [], 'prompts': {}}
+
+    with patch.object(Tutor, 'get_config', return_value=config):
+        response = client.get(url, {'prewarm': 'true'})
+        assert response.status_code == 202
+        wait_for(lambda: voice_session_broker.stats()['pooled'] == 1)
+
+        data = client.get(url).json()
+
+    assert data['client_secret'] == 'ek_1'
+    assert data['voice'] == 'alloy'
+    assert voice_session_broker.stats()['hits'] == 1
+    voice_session_broker.clear()